@@ -8,9 +8,25 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
 
 import os
+import time
 
-from django.core.asgi import get_asgi_application
+# Отсчет времени запуска воркера (см. portal.warmup)
+started = time.perf_counter()
+
+from django.core.handlers.asgi import ASGIHandler  # noqa: E402
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'korochki_project.settings')
+# Настройки, зависящие от сервера (CONN_MAX_AGE)
+os.environ['KOROCHKI_SERVER'] = 'asgi'
+
+from portal.warmup import start  # noqa: E402
+
+# То же, что get_asgi_application(), плюс прогрев до первого запроса
+application = start(ASGIHandler, started)
+
+from django.conf import settings  # noqa: E402 — настройки доступны после setup()
+
+if settings.PORTAL_SERVE_ASSETS:
+    from portal.assets import AssetsASGIMiddleware
 
-application = get_asgi_application()
+    application = AssetsASGIMiddleware(application)
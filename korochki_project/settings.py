@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 from django.contrib.messages import constants as messages
 
@@ -42,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первым, чтобы время включало все остальные middleware (см. PORTAL_PROFILING)
+    'portal.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,7 +58,8 @@ ROOT_URLCONF = 'korochki_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени рендера для профилировщика
+        'BACKEND': 'portal.profiling.ProfilingDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -70,17 +74,140 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'korochki_project.wsgi.application'
 
+# Прогрев воркера до первого запроса: URL, шаблоны, валидаторы, соединения
+# с базой (portal.warmup). Время запуска по фазам пишется в лог portal.warmup.
+PORTAL_WARMUP = not DEBUG
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'portal.warmup': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
+# Профилирование запросов (portal.profiling): заголовок Server-Timing,
+# лог запросов дольше PORTAL_SLOW_REQUEST_MS и перцентили по именам URL
+# (последние PORTAL_PROFILING_WINDOW запросов; смотреть — manage.py perfstats).
+PORTAL_PROFILING = False
+PORTAL_SLOW_REQUEST_MS = 500
+PORTAL_PROFILING_WINDOW = 1000
+PORTAL_PROFILING_DIR = BASE_DIR / 'var' / 'perf'
+PORTAL_PROFILING_FLUSH_INTERVAL = 10
+
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# Процесс запущен через korochki_project/asgi.py
+KOROCHKI_ASGI = os.environ.get('KOROCHKI_SERVER') == 'asgi'
+
+# Параметры SQLite для работы под нагрузкой:
+# WAL — читатели не блокируют писателя; busy_timeout — ждать блокировку,
+# а не сразу падать с "database is locked"; synchronous=NORMAL безопасен в WAL;
+# mmap_size и cache_size (в КиБ при отрицательном значении) уменьшают чтение с диска.
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL;'
+    'PRAGMA busy_timeout=5000;'
+    'PRAGMA synchronous=NORMAL;'
+    'PRAGMA mmap_size=268435456;'
+    'PRAGMA cache_size=-65536;'
+    'PRAGMA temp_store=MEMORY;'
+)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # KOROCHKI_DB_PATH — другая база, например для нагрузочных тестов (seed_bench)
+        'NAME': os.environ.get('KOROCHKI_DB_PATH', BASE_DIR / 'db.sqlite3'),
+        # Постоянные соединения вместо переподключения на каждый запрос.
+        # Под ASGI каждый запрос выполняется в своем потоке и открывает
+        # свое соединение: постоянные соединения там только копятся
+        'CONN_MAX_AGE': 0 if KOROCHKI_ASGI else 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_PRAGMAS,
+            # BEGIN IMMEDIATE: блокировка на запись берется в начале транзакции,
+            # поэтому busy_timeout работает и для транзакций с чтением перед записью
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+}
+
+# Повторы записи при "database is locked" (portal.db.retry_on_locked)
+SQLITE_WRITE_RETRIES = 5
+SQLITE_WRITE_RETRY_DELAY = 0.05
+
+
+# Кэш. По умолчанию — LRU в памяти процесса, внешний сервис не нужен.
+# Для нескольких воркеров можно указать Redis/Memcached в том же формате.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'korochki',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
 
+# Алиас кэша, который использует портал
+PORTAL_CACHE_ALIAS = 'default'
+
+# Общий ли кэш для всех процессов сервера (Redis, Memcached, база).
+# LocMemCache у каждого процесса свой: сброс записи в одном воркере не
+# виден остальным, поэтому сессии и пользователи кэшируются только в общем.
+PORTAL_CACHE_SHARED = CACHES[PORTAL_CACHE_ALIAS]['BACKEND'] not in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Живые обновления заявок (portal.events): события между воркерами
+# пересылаются через Unix-сокеты в этом каталоге (None — только внутри
+# процесса). Поток SSE пингуется каждые PORTAL_EVENTS_HEARTBEAT секунд
+# и переоткрывается браузером через PORTAL_EVENTS_STREAM_TIMEOUT секунд.
+PORTAL_EVENTS_SOCKET_DIR = BASE_DIR / 'var' / 'events'
+PORTAL_EVENTS_HEARTBEAT = 15
+PORTAL_EVENTS_STREAM_TIMEOUT = 5 * 60
+
+# Ограничение частоты запросов (portal.ratelimit): для каждого
+# представления — корзины (ключ, емкость, период в секундах): всплеск до
+# "емкость" запросов, дальше в среднем "емкость" запросов за период.
+# Ключи: ip — адрес клиента, username — логин из формы, user — пользователь сессии.
+PORTAL_RATE_LIMITS = {
+    'login': [('ip', 20, 60), ('username', 5, 5 * 60)],
+    'register': [('ip', 5, 10 * 60)],
+    'create_application': [('user', 10, 60 * 60), ('ip', 30, 60 * 60)],
+    # Проверка логина/email на лету (GET) — против перебора существующих
+    'availability': [('ip', 60, 60)],
+}
+# Файл SQLite с корзинами, общий для всех процессов
+PORTAL_RATE_LIMIT_DB = BASE_DIR / 'var' / 'ratelimit.sqlite3'
+
+# Индекс логинов и email для проверки на лету (portal.availability)
+# сверяется со счетчиком пользователей в базе не чаще раза в столько секунд
+PORTAL_AVAILABILITY_CHECK_INTERVAL = 5
+
+# Очередь фоновых задач в базе (portal.jobs, manage.py run_worker).
+# Неудачная задача повторяется через PORTAL_JOB_RETRY_DELAY * 2^(n-1) секунд,
+# после PORTAL_JOB_MAX_ATTEMPTS попыток помечается ошибкой; задача, которую
+# воркер не закончил за PORTAL_JOB_TIMEOUT секунд, отдается другому воркеру.
+PORTAL_JOB_MAX_ATTEMPTS = 5
+PORTAL_JOB_RETRY_DELAY = 30
+PORTAL_JOB_TIMEOUT = 10 * 60
+# Письма о заявках копятся столько секунд и уходят одной сводкой
+PORTAL_NOTIFY_DELAY = 60
+
+# В режиме разработки письма выводятся в консоль воркера
+EMAIL_BACKEND = (
+    'django.core.mail.backends.console.EmailBackend' if DEBUG
+    else 'django.core.mail.backends.smtp.EmailBackend'
+)
+DEFAULT_FROM_EMAIL = 'noreply@korochki.est'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -100,9 +227,28 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Пул хеширования паролей для async-представлений (portal.hashing).
+# None — по числу ядер; при переполнении очереди запрос получает 503.
+PASSWORD_HASHING_WORKERS = None
+PASSWORD_HASHING_MAX_QUEUE = 256
+
 # Кастомная модель пользователя
 AUTH_USER_MODEL = 'portal.CustomUser'
 
+# Пользователь сессии берется из кэша (portal.backends)
+AUTHENTICATION_BACKENDS = ['portal.backends.CachedModelBackend']
+
+# При общем кэше сессии читаются из кэша, в базу только пишутся (cached_db);
+# с кэшем процесса — из базы: выход в одном воркере не был бы виден другим.
+# Без записи в базу: 'django.contrib.sessions.backends.signed_cookies'
+# или 'django.contrib.sessions.backends.cache' (при общем кэше вроде Redis).
+# Истекшие сессии удаляются командой purge_sessions.
+SESSION_ENGINE = (
+    'django.contrib.sessions.backends.cached_db' if PORTAL_CACHE_SHARED
+    else 'django.contrib.sessions.backends.db'
+)
+SESSION_CACHE_ALIAS = 'default'
+
 # Редиректы после входа/выхода
 LOGIN_REDIRECT_URL = '/profile/'
 LOGOUT_REDIRECT_URL = '/login/'
@@ -111,10 +257,29 @@ LOGIN_URL = '/login/'
 # Статические файлы (CSS, JS, изображения)
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / "static"]  # создай папку static в корне проекта
+STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Рабочий режим отдачи файлов (DEBUG = False):
+# collectstatic сохраняет файлы с хешем в имени и их .gz/.br копии
+# (brotli — необязательный пакет), а portal.assets отдает статику и медиа
+# прямо из wsgi.py/asgi.py с Cache-Control: immutable и поддержкой Range.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'portal.staticfiles.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+PORTAL_SERVE_ASSETS = not DEBUG
+PORTAL_MEDIA_MAX_AGE = 60 * 60
+
 
 MESSAGE_TAGS = {
     messages.DEBUG: 'alert-secondary',
@@ -19,7 +19,9 @@ urlpatterns = [
     ])),
     
     path('', include('portal.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
 
+# В рабочем режиме статику и медиа отдает portal.assets (см. wsgi.py/asgi.py)
 if settings.DEBUG:
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
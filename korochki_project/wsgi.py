@@ -8,9 +8,23 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/wsgi/
 """
 
 import os
+import time
 
-from django.core.wsgi import get_wsgi_application
+# Отсчет времени запуска воркера (см. portal.warmup)
+started = time.perf_counter()
+
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'korochki_project.settings')
 
-application = get_wsgi_application()
+from portal.warmup import start  # noqa: E402
+
+# То же, что get_wsgi_application(), плюс прогрев до первого запроса
+application = start(WSGIHandler, started)
+
+from django.conf import settings  # noqa: E402 — настройки доступны после setup()
+
+if settings.PORTAL_SERVE_ASSETS:
+    from portal.assets import AssetsWSGIMiddleware
+
+    application = AssetsWSGIMiddleware(application)
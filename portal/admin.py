@@ -1,10 +1,65 @@
-from django.contrib import admin
+from collections import defaultdict
+
+from django.contrib import admin, messages
+from django.contrib.admin.models import CHANGE, LogEntry
+from django.contrib.admin.utils import model_ngettext
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, Course, Application
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.db import transaction
+from django.forms import BaseModelFormSet, ModelChoiceField
+from django.http import HttpResponseRedirect
+from django.utils.translation import ngettext
+from .models import CustomUser, Course, Application, ArchivedApplication
+from .pagination import EstimatedCountPaginator
+from .search import search_applications, search_courses, search_users
+
+
+class PreloadedPkField(ModelChoiceField):
+    """
+    Поле id строки в форме списка: объект берется из выборки формсета,
+    а не отдельным запросом на каждую строку, как в ModelChoiceField.
+    """
+    def __init__(self, formset, *args, **kwargs):
+        self.formset = formset
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            obj = self.formset._existing_object(self.queryset.model._meta.pk.to_python(value))
+        except ValidationError:
+            obj = None
+        if obj is None:
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+        return obj
+
+
+class ListEditableFormSet(BaseModelFormSet):
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        field = form.fields[self._pk_field.name]
+        form.fields[self._pk_field.name] = PreloadedPkField(
+            self, field.queryset, initial=field.initial, required=False, widget=field.widget,
+        )
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Списки для больших таблиц: без точного COUNT(*) всей выборки
+    (см. EstimatedCountPaginator) и без второго COUNT для подписи
+    "из N" при фильтрах.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist_formset(self, request, **kwargs):
+        kwargs.setdefault('formset', ListEditableFormSet)
+        return super().get_changelist_formset(request, **kwargs)
 
 
 @admin.register(CustomUser)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(LargeTableAdmin, UserAdmin):
     list_display = ('username', 'full_name', 'email', 'phone', 'is_staff')
     search_fields = ('username', 'full_name', 'email', 'phone')
     fieldsets = (
@@ -20,18 +75,90 @@ class CustomUserAdmin(UserAdmin):
         }),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        # Полнотекстовый индекс вместо LIKE '%...%' по четырем полям
+        return search_users(queryset, search_term), False
+
 
 @admin.register(Course)
-class CourseAdmin(admin.ModelAdmin):
+class CourseAdmin(LargeTableAdmin):
     list_display = ('title', 'is_active')
     list_filter = ('is_active',)
     search_fields = ('title', 'description')
 
+    def get_search_results(self, request, queryset, search_term):
+        return search_courses(queryset, search_term), False
+
 
 @admin.register(Application)
-class ApplicationAdmin(admin.ModelAdmin):
+class ApplicationAdmin(LargeTableAdmin):
     list_display = ('id', 'user', 'course', 'status', 'desired_start_date', 'created_at')
     list_filter = ('status', 'payment_method', 'created_at')
+    list_select_related = ('user', 'course')
     search_fields = ('user__username', 'user__full_name', 'course__title')
     list_editable = ('status',)
-    readonly_fields = ('created_at',)
\ No newline at end of file
+    readonly_fields = ('created_at',)
+    # Поиск по пользователям и курсам вместо <select> со всеми строками
+    autocomplete_fields = ('user', 'course')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Ищет по пользователю, курсу и отзыву без JOIN и без дублей строк
+        return search_applications(queryset, search_term), False
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method == 'POST' and '_save' in request.POST:
+            response = self.save_list_editable(request)
+            if response is not None:
+                return response
+        return super().changelist_view(request, extra_context)
+
+    def save_list_editable(self, request):
+        """
+        Сохраняет статусы из списка пачкой: один UPDATE на статус через
+        ApplicationQuerySet.set_status (статистика, письма и кэш — тоже
+        пачкой) и одна вставка в журнал действий. При ошибках в форме
+        возвращает None — список с ошибками покажет стандартный обработчик.
+        """
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        FormSet = self.get_changelist_formset(request)
+        queryset = self._get_list_editable_queryset(request, FormSet.get_default_prefix())
+        formset = FormSet(request.POST, request.FILES, queryset=queryset.select_related('user', 'course'))
+        if not formset.is_valid():
+            return None
+        changed = [form for form in formset.forms if form.has_changed()]
+        by_status = defaultdict(list)
+        for form in changed:
+            by_status[form.cleaned_data['status']].append(form.instance.pk)
+        with transaction.atomic():
+            for status, ids in by_status.items():
+                Application.objects.filter(id__in=ids).set_status(status)
+            if changed:
+                LogEntry.objects.log_actions(
+                    request.user.pk,
+                    [form.instance for form in changed],
+                    CHANGE,
+                    [{'changed': {'fields': [str(Application._meta.get_field('status').verbose_name)]}}],
+                )
+        if changed:
+            self.message_user(request, ngettext(
+                '%(count)s %(name)s was changed successfully.',
+                '%(count)s %(name)s were changed successfully.',
+                len(changed),
+            ) % {'count': len(changed), 'name': model_ngettext(self.opts, len(changed))}, messages.SUCCESS)
+        return HttpResponseRedirect(request.get_full_path())
+
+
+@admin.register(ArchivedApplication)
+class ArchivedApplicationAdmin(LargeTableAdmin):
+    """Архив только для просмотра: заявки попадают сюда командой archive_applications"""
+    list_display = ('id', 'user', 'course', 'status', 'created_at', 'archived_at')
+    list_filter = ('payment_method', 'created_at')
+    list_select_related = ('user', 'course')
+    search_fields = ('user__username', 'course__title')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -1,5 +1,87 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate, pre_migrate
+
+
+def install_search_index(sender, using, **kwargs):
+    """
+    Пересоздает триггеры поиска после migrate: SQLite при изменении
+    таблицы пересоздает ее, и триггеры на ней пропадают.
+    """
+    from django.db import connections
+    from django.db.migrations.recorder import MigrationRecorder
+
+    from . import search
+
+    connection = connections[using]
+    if not search.is_available(connection):
+        return
+    applied = MigrationRecorder(connection).applied_migrations()
+    if ('portal', '0004_search_index') not in applied:
+        return
+    with connection.cursor() as cursor:
+        search.install(cursor)
+
+
+def install_counters(sender, using, **kwargs):
+    """Триггеры счетчиков изменений — по той же причине, что и триггеры поиска"""
+    from django.db import connections
+    from django.db.migrations.recorder import MigrationRecorder
+
+    from . import counters
+
+    connection = connections[using]
+    if not counters.is_available(connection):
+        return
+    applied = MigrationRecorder(connection).applied_migrations()
+    if ('portal', '0009_change_counters') not in applied:
+        return
+    with connection.cursor() as cursor:
+        counters.install(cursor)
+
+
+def drop_counters(sender, using, **kwargs):
+    from django.db import connections
+
+    from . import counters
+
+    connection = connections[using]
+    if counters.is_available(connection):
+        with connection.cursor() as cursor:
+            counters.drop(cursor)
+
+
+def drop_archive_view(sender, using, **kwargs):
+    from django.db import connections
+
+    from . import archive
+
+    with connections[using].cursor() as cursor:
+        archive.drop_view(cursor)
+
+
+def install_archive_view(sender, using, **kwargs):
+    """Создает представление заявок с архивом заново после migrate"""
+    from django.db import connections
+    from django.db.migrations.recorder import MigrationRecorder
+
+    from . import archive
+
+    connection = connections[using]
+    applied = MigrationRecorder(connection).applied_migrations()
+    if ('portal', '0008_application_archive') not in applied:
+        return
+    with connection.cursor() as cursor:
+        archive.install_view(cursor)
 
 
 class PortalConfig(AppConfig):
     name = 'portal'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        post_migrate.connect(install_search_index, sender=self)
+        pre_migrate.connect(drop_counters, sender=self)
+        post_migrate.connect(install_counters, sender=self)
+        pre_migrate.connect(drop_archive_view, sender=self)
+        post_migrate.connect(install_archive_view, sender=self)
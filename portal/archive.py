@@ -0,0 +1,76 @@
+"""
+Архив завершенных заявок.
+
+Команда archive_applications пачками переносит давно завершенные заявки
+из portal_application в portal_archivedapplication: рабочая таблица и ее
+индексы остаются небольшими. Архивные заявки по-прежнему видны в личном
+кабинете и учитываются в статистике; вместе с рабочими их читает модель
+UnifiedApplication — представление portal_application_all.
+"""
+from django.db import connection
+
+from .db import run_write
+from .models import Application, ArchivedApplication, UnifiedApplication
+
+
+COLUMNS = (
+    'id', 'user_id', 'course_id', 'desired_start_date', 'payment_method',
+    'status', 'created_at', 'feedback', 'updated_at',
+)
+
+
+def _view_sql(quote):
+    columns = ', '.join(quote(column) for column in COLUMNS)
+    return (
+        f'CREATE VIEW {quote(UnifiedApplication._meta.db_table)} AS '
+        f'SELECT {columns}, 0 AS {quote("archived")} FROM {quote(Application._meta.db_table)} '
+        f'UNION ALL '
+        f'SELECT {columns}, 1 FROM {quote(ArchivedApplication._meta.db_table)}'
+    )
+
+
+def drop_view(cursor):
+    """
+    Удаляет представление перед migrate: SQLite при изменении таблицы
+    пересоздает ее, а переименование новой таблицы не проходит, пока на
+    старую ссылается представление.
+    """
+    quote = cursor.db.ops.quote_name
+    cursor.execute(f'DROP VIEW IF EXISTS {quote(UnifiedApplication._meta.db_table)}')
+
+
+def install_view(cursor):
+    drop_view(cursor)
+    cursor.execute(_view_sql(cursor.db.ops.quote_name))
+
+
+def archive_batch(cutoff, batch_size):
+    """
+    Переносит в архив до batch_size завершенных заявок, не менявшихся
+    с cutoff. Возвращает id перенесенных заявок.
+
+    Сигналы не отправляются: команда работает в своем процессе, и сброс
+    кэша там не дошел бы до воркеров. Кабинет замечает перенос по числу
+    архивных заявок пользователя (portal.conditional.profile_state).
+    """
+    def move():
+        rows = list(
+            Application.objects.filter(
+                status=Application.Status.COMPLETED, updated_at__lt=cutoff,
+            ).order_by('updated_at').values(*COLUMNS)[:batch_size]
+        )
+        if not rows:
+            return []
+        ArchivedApplication.objects.bulk_create([ArchivedApplication(**row) for row in rows])
+        ids = [row['id'] for row in rows]
+        # Прямой DELETE: удаление через ORM отправило бы post_delete
+        # на каждую заявку и уменьшило бы статистику (архив в ней учитывается)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {connection.ops.quote_name(Application._meta.db_table)} '
+                f'WHERE id IN ({", ".join(["%s"] * len(ids))})',
+                ids,
+            )
+        return ids
+
+    return run_write(move)
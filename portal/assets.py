@@ -0,0 +1,332 @@
+"""
+Отдача статики и медиа в рабочем режиме (WSGI и ASGI middleware).
+
+Статика: индекс файлов STATIC_ROOT строится один раз при старте;
+по Accept-Encoding отдается готовая .br/.gz копия, файлы с хешем
+в имени (из манифеста collectstatic) — с Cache-Control: immutable.
+Медиа: файлы из MEDIA_ROOT с поддержкой Range (206 Partial Content).
+Файл передается через wsgi.file_wrapper / http.response.zerocopysend,
+если сервер это поддерживает (sendfile), иначе читается блоками.
+"""
+import asyncio
+import json
+import mimetypes
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+
+from django.conf import settings
+
+from .staticfiles import ENCODINGS
+
+
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'public, max-age=0, must-revalidate'
+TEXT_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class Asset:
+    def __init__(self, path, stat, content_type, cache_control, variants=None):
+        self.path = path
+        self.size = stat.st_size
+        self.mtime = int(stat.st_mtime)
+        self.content_type = content_type
+        self.cache_control = cache_control
+        # {'br': (путь, размер), 'gzip': ...}
+        self.variants = variants or {}
+        self.etag = f'"{self.size:x}-{self.mtime:x}"'
+
+    def variant_etag(self, encoding):
+        # Сжатая копия — другое представление, ETag у нее свой
+        return f'"{self.size:x}-{self.mtime:x}-{encoding}"'
+
+
+class AssetResponse:
+    """Что отправить: статус, заголовки и (путь, смещение, длина) файла"""
+
+    def __init__(self, status, headers, path=None, offset=0, length=0):
+        self.status = status
+        self.headers = headers
+        self.path = path
+        self.offset = offset
+        self.length = length
+
+
+def guess_content_type(path):
+    content_type, _ = mimetypes.guess_type(path)
+    content_type = content_type or 'application/octet-stream'
+    if content_type.startswith(TEXT_TYPES):
+        content_type += '; charset=utf-8'
+    return content_type
+
+
+def _immutable_names(root):
+    """Имена файлов с хешем из манифеста ManifestStaticFilesStorage"""
+    try:
+        with open(os.path.join(root, 'staticfiles.json'), encoding='utf-8') as fileobj:
+            return set(json.load(fileobj).get('paths', {}).values())
+    except (OSError, ValueError):
+        return set()
+
+
+def build_static_index(root, url_prefix):
+    index = {}
+    if not root or not os.path.isdir(root):
+        return index
+    immutable = _immutable_names(root)
+    for dirpath, dirnames, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(tuple(ENCODINGS.values())):
+                continue
+            path = os.path.join(dirpath, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            variants = {}
+            for encoding, suffix in ENCODINGS.items():
+                if os.path.isfile(path + suffix):
+                    variants[encoding] = (path + suffix, os.path.getsize(path + suffix))
+            index[url_prefix + name] = Asset(
+                path, os.stat(path), guess_content_type(path),
+                IMMUTABLE_CACHE_CONTROL if name in immutable else REVALIDATE_CACHE_CONTROL,
+                variants,
+            )
+    return index
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for part in header.split(','):
+        coding, *params = part.split(';')
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _parse_range(header, size):
+    """(начало, длина) для одного диапазона, None — отдать файл целиком, False — 416"""
+    match = _RANGE_RE.match(header.strip())
+    if not match or size == 0:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        length = min(int(end), size)
+        return (size - length, length) if length else False
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end - start + 1
+
+
+def _not_modified(asset, headers):
+    if_none_match = headers.get('if-none-match')
+    if if_none_match is not None:
+        etags = {asset.etag} | {asset.variant_etag(encoding) for encoding in asset.variants}
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return bool(etags & tags) or '*' in tags
+    if_modified_since = headers.get('if-modified-since')
+    if if_modified_since:
+        try:
+            return int(parsedate_to_datetime(if_modified_since).timestamp()) >= asset.mtime
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class AssetServer:
+    """Общая логика для WSGI и ASGI: путь запроса -> AssetResponse или None"""
+
+    def __init__(self, static_root=None, static_url=None, media_root=None, media_url=None):
+        self.static_url = static_url or settings.STATIC_URL
+        self.media_url = media_url if media_url is not None else settings.MEDIA_URL
+        self.media_root = os.path.realpath(media_root or settings.MEDIA_ROOT)
+        self.media_max_age = getattr(settings, 'PORTAL_MEDIA_MAX_AGE', 3600)
+        self.static_index = build_static_index(static_root or settings.STATIC_ROOT, self.static_url)
+
+    def find(self, path):
+        asset = self.static_index.get(path)
+        if asset is not None:
+            return asset
+        if self.media_url and path.startswith(self.media_url):
+            return self.find_media(path[len(self.media_url):])
+        return None
+
+    def find_media(self, name):
+        # Путь проверяется после realpath, чтобы ../ и симлинки не выводили за MEDIA_ROOT
+        path = os.path.realpath(os.path.join(self.media_root, name))
+        if not path.startswith(self.media_root + os.sep):
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if not os.path.isfile(path):
+            return None
+        return Asset(path, stat, guess_content_type(path), f'public, max-age={self.media_max_age}')
+
+    def respond(self, method, path, headers):
+        """headers — словарь с именами в нижнем регистре"""
+        if method not in ('GET', 'HEAD'):
+            return None
+        asset = self.find(path)
+        if asset is None:
+            return None
+
+        base_headers = [
+            ('Cache-Control', asset.cache_control),
+            ('Last-Modified', formatdate(asset.mtime, usegmt=True)),
+        ]
+        if asset.variants:
+            base_headers.append(('Vary', 'Accept-Encoding'))
+
+        accepted = _accepted_encodings(headers.get('accept-encoding', ''))
+        encoding = next((
+            encoding for encoding in ENCODINGS
+            if encoding in asset.variants and encoding in accepted
+        ), None)
+        etag = asset.variant_etag(encoding) if encoding else asset.etag
+        base_headers.append(('ETag', etag))
+        if _not_modified(asset, headers):
+            return AssetResponse(304, base_headers)
+
+        if encoding:
+            variant_path, size = asset.variants[encoding]
+            return AssetResponse(200, base_headers + [
+                ('Content-Type', asset.content_type),
+                ('Content-Encoding', encoding),
+                ('Content-Length', str(size)),
+            ], variant_path, 0, size)
+
+        response_headers = base_headers + [
+            ('Content-Type', asset.content_type),
+            ('Accept-Ranges', 'bytes'),
+        ]
+        byte_range = None
+        if 'range' in headers and headers.get('if-range', asset.etag) == asset.etag:
+            byte_range = _parse_range(headers['range'], asset.size)
+        if byte_range is False:
+            return AssetResponse(416, response_headers + [
+                ('Content-Range', f'bytes */{asset.size}'),
+                ('Content-Length', '0'),
+            ])
+        if byte_range:
+            start, length = byte_range
+            return AssetResponse(206, response_headers + [
+                ('Content-Range', f'bytes {start}-{start + length - 1}/{asset.size}'),
+                ('Content-Length', str(length)),
+            ], asset.path, start, length)
+        return AssetResponse(200, response_headers + [
+            ('Content-Length', str(asset.size)),
+        ], asset.path, 0, asset.size)
+
+
+STATUS_TEXT = {
+    200: '200 OK',
+    206: '206 Partial Content',
+    304: '304 Not Modified',
+    416: '416 Range Not Satisfiable',
+}
+
+
+def _read_range(fileobj, offset, length):
+    try:
+        fileobj.seek(offset)
+        while length > 0:
+            chunk = fileobj.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        fileobj.close()
+
+
+class AssetsWSGIMiddleware:
+    """Оборачивает WSGI-приложение Django: статика и медиа не доходят до Python-представлений"""
+
+    def __init__(self, application, server=None):
+        self.application = application
+        self.server = server or AssetServer()
+
+    def __call__(self, environ, start_response):
+        headers = {
+            key[5:].replace('_', '-').lower(): value
+            for key, value in environ.items() if key.startswith('HTTP_')
+        }
+        # PATH_INFO в WSGI — байты UTF-8, декодированные как latin-1
+        path = environ.get('PATH_INFO', '').encode('latin-1').decode('utf-8', 'replace')
+        response = self.server.respond(environ['REQUEST_METHOD'], path, headers)
+        if response is None:
+            return self.application(environ, start_response)
+
+        start_response(STATUS_TEXT[response.status], response.headers)
+        if response.path is None or environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        fileobj = open(response.path, 'rb')
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if file_wrapper is not None and response.offset == 0:
+            # Целый файл: сервер может отправить его через sendfile
+            return file_wrapper(fileobj, CHUNK_SIZE)
+        return _read_range(fileobj, response.offset, response.length)
+
+
+class AssetsASGIMiddleware:
+    """То же для ASGI; zero-copy через расширение http.response.zerocopysend"""
+
+    def __init__(self, application, server=None):
+        self.application = application
+        self.server = server or AssetServer()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.application(scope, receive, send)
+        headers = {
+            name.decode('latin-1').lower(): value.decode('latin-1')
+            for name, value in scope.get('headers', [])
+        }
+        response = self.server.respond(scope['method'], scope['path'], headers)
+        if response is None:
+            return await self.application(scope, receive, send)
+
+        await send({
+            'type': 'http.response.start',
+            'status': response.status,
+            'headers': [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in response.headers
+            ],
+        })
+        if response.path is None or scope['method'] == 'HEAD':
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        with open(response.path, 'rb') as fileobj:
+            if 'http.response.zerocopysend' in scope.get('extensions', {}):
+                await send({
+                    'type': 'http.response.zerocopysend',
+                    'file': fileobj.fileno(),
+                    'offset': response.offset,
+                    'count': response.length,
+                })
+                return
+            await asyncio.to_thread(fileobj.seek, response.offset)
+            remaining = response.length
+            while remaining > 0:
+                chunk = await asyncio.to_thread(fileobj.read, min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
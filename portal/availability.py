@@ -0,0 +1,149 @@
+"""
+Проверка, свободны ли логин и email (форма регистрации и профиля).
+
+Формы проверяют значение запросом по индексу LOWER(поле) — is_taken.
+Для подсказок на лету (probably_taken) в памяти процесса хранятся
+Bloom-фильтры нормализованных логинов и email всех пользователей:
+"нет в фильтре" — значение свободно без запроса к базе, "есть в фильтре"
+подтверждается запросом (ложные срабатывания, удаленные пользователи).
+
+Чтобы фильтр видел пользователей из других процессов, он сверяется
+со счетчиком portal.counters.USERS (его увеличивают триггеры на вставку
+и смену логина/email) не чаще раза в PORTAL_AVAILABILITY_CHECK_INTERVAL
+секунд. Новые пользователи дочитываются по id, а если счетчик ушел
+дальше (переименования, удаления), фильтр пересобирается целиком.
+Пользователи, сохраненные в этом процессе, добавляются сразу (portal.signals).
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db.models.functions import Lower
+
+from . import counters
+from .models import CustomUser
+
+
+FIELDS = ('username', 'email')
+ERROR_RATE = 0.01
+# Запас емкости под пользователей, добавленных до следующей пересборки
+GROWTH_FACTOR = 2
+MIN_CAPACITY = 1000
+
+
+def normalize(value):
+    # LOWER() в SQLite меняет регистр только у латиницы — логины и так
+    # латинские, а email с кириллицей в проверке просто не совпадут
+    return value.strip().lower()
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=ERROR_RATE):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        # Двойное хеширование: k позиций из двух половин одного дайджеста
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class AvailabilityIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filters = None
+        self._version = None
+        self._max_pk = 0
+        self._size = 0
+        self._capacity = 0
+        self._checked_at = 0
+
+    def _build(self):
+        # Счетчик читается до пользователей: изменение во время сборки
+        # даст расхождение при следующей сверке, а не потерю значения
+        version = counters.get_value(counters.USERS)
+        self._capacity = max(CustomUser.objects.count() * GROWTH_FACTOR, MIN_CAPACITY)
+        self._filters = {field: BloomFilter(self._capacity) for field in FIELDS}
+        self._max_pk = self._size = 0
+        self._add_users(CustomUser.objects.all())
+        self._version, self._checked_at = version, time.monotonic()
+
+    def _add_users(self, users):
+        added = 0
+        rows = users.order_by().values_list('pk', 'username', 'email')
+        for pk, username, email in rows.iterator(chunk_size=5000):
+            self._filters['username'].add(normalize(username))
+            self._filters['email'].add(normalize(email))
+            self._max_pk = max(self._max_pk, pk)
+            added += 1
+        self._size += added
+        return added
+
+    def _catch_up(self):
+        version = counters.get_value(counters.USERS)
+        self._checked_at = time.monotonic()
+        if version == self._version:
+            return
+        added = self._add_users(CustomUser.objects.filter(pk__gt=self._max_pk))
+        if added != version - self._version or self._size > self._capacity:
+            self._build()
+        else:
+            self._version = version
+
+    def filters(self):
+        interval = getattr(settings, 'PORTAL_AVAILABILITY_CHECK_INTERVAL', 5)
+        with self._lock:
+            if self._filters is None:
+                self._build()
+            elif time.monotonic() - self._checked_at >= interval:
+                self._catch_up()
+            return self._filters
+
+    def add(self, field, value):
+        with self._lock:
+            if self._filters is not None and value:
+                self._filters[field].add(normalize(value))
+
+    def might_contain(self, field, value):
+        return normalize(value) in self.filters()[field]
+
+    def reset(self):
+        with self._lock:
+            self._filters = None
+
+
+index = AvailabilityIndex()
+
+
+def is_taken(field, value, exclude_pk=None):
+    """Занят ли логин/email без учета регистра; exclude_pk — сам пользователь"""
+    if not value or not normalize(value):
+        return False
+    users = CustomUser.objects.alias(normalized=Lower(field)).filter(normalized=normalize(value))
+    if exclude_pk is not None:
+        users = users.exclude(pk=exclude_pk)
+    return users.exists()
+
+
+def probably_taken(field, value):
+    """
+    Для подсказок: промах фильтра — "свободно" без запроса, совпадение
+    подтверждается базой. Пользователь другого процесса может быть
+    не виден до PORTAL_AVAILABILITY_CHECK_INTERVAL секунд — при отправке
+    форма все равно проверит значение по базе.
+    """
+    if not value or not normalize(value):
+        return False
+    return index.might_contain(field, value) and is_taken(field, value)
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from .cache import get_cache
+from .hashing import acheck_password, amake_password
+
+
+USER_CACHE_TIMEOUT = 15 * 60
+
+
+def user_cache_key(user_id):
+    return f'portal:user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    get_cache().delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend, который берет пользователя сессии из кэша.
+
+    AuthenticationMiddleware вызывает get_user() на каждый запрос;
+    с кэшем это не требует запроса к базе. Запись сбрасывается при
+    сохранении/удалении пользователя и при выходе (см. portal.signals).
+
+    Только при общем кэше (PORTAL_CACHE_SHARED): в кэше процесса сброс
+    не дошел бы до других воркеров, и смена пароля или блокировка
+    пользователя там не действовали бы до истечения записи.
+    """
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        """
+        Как ModelBackend.aauthenticate, но пароль проверяется в пуле
+        portal.hashing: цикл событий не блокируется на PBKDF2.
+        Вызывается через django.contrib.auth.aauthenticate, который
+        при неудаче отправляет user_login_failed.
+        """
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = await UserModel._default_manager.aget_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Хешируем впустую, чтобы время ответа не выдавало существование логина
+            await amake_password(password)
+            return None
+        if await acheck_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def get_user(self, user_id):
+        if not settings.PORTAL_CACHE_SHARED:
+            return super().get_user(user_id)
+        cache = get_cache()
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
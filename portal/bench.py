@@ -0,0 +1,211 @@
+"""
+Нагрузочные замеры страниц портала (команда run_bench).
+
+Запросы выполняются тестовым клиентом Django внутри процесса, без
+HTTP-сервера: замер включает middleware, представление, ORM и шаблоны.
+"""
+import json
+import platform
+import statistics
+import threading
+import time
+from datetime import datetime
+
+import django
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from .models import Application, Course, CustomUser
+from .profiling import percentile
+
+
+# Сценарии: имя, имя URL, кто открывает страницу, строка запроса.
+# Пользователь — владелец заявок со средним их количеством.
+SCENARIOS = [
+    {'name': 'home', 'url': 'home', 'auth': None},
+    {'name': 'register', 'url': 'register', 'auth': None},
+    {'name': 'login', 'url': 'login', 'auth': None},
+    {'name': 'check_availability', 'url': 'check_availability', 'auth': None,
+     'query': 'username=bench_admin&email=free@example.com'},
+    {'name': 'profile', 'url': 'profile', 'auth': 'user'},
+    {'name': 'edit_profile', 'url': 'edit_profile', 'auth': 'user'},
+    {'name': 'create_application', 'url': 'create_application', 'auth': 'user'},
+    {'name': 'admin_dashboard', 'url': 'admin_dashboard', 'auth': 'admin'},
+    {'name': 'admin_dashboard_filtered', 'url': 'admin_dashboard', 'auth': 'admin',
+     'query': 'status=completed'},
+    {'name': 'admin_dashboard_search', 'url': 'admin_dashboard', 'auth': 'admin',
+     'query': 'q=иванов'},
+    {'name': 'export_csv', 'url': 'export_applications', 'auth': 'admin',
+     'query': 'format=csv&status=new'},
+]
+
+# URL, которые не открываются GET-запросом, и бесконечный поток событий
+SKIPPED_URLS = {'logout', 'bulk_status', 'application_events'}
+
+
+def uncovered_urls():
+    """Имена URL из portal/urls.py, для которых нет сценария"""
+    from . import urls
+
+    covered = {scenario['url'] for scenario in SCENARIOS} | SKIPPED_URLS
+    return sorted(pattern.name for pattern in urls.urlpatterns if pattern.name not in covered)
+
+
+def dataset_info():
+    return {
+        'users': CustomUser.objects.count(),
+        'courses': Course.objects.count(),
+        'applications': Application.objects.count(),
+    }
+
+
+def pick_users():
+    """Администратор и обычный пользователь с заявками"""
+    admin = CustomUser.objects.filter(is_superuser=True).order_by('id').first()
+    user = (
+        CustomUser.objects.filter(is_superuser=False, applications__isnull=False)
+        .order_by('id').first()
+    )
+    return {'admin': admin, 'user': user}
+
+
+def _client(user):
+    client = Client(HTTP_HOST='localhost')
+    if user is not None:
+        client.force_login(user)
+    return client
+
+
+def _consume(response):
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response.status_code
+
+
+def run_scenario(scenario, users, requests=200, warmup=20, concurrency=1):
+    url = reverse(scenario['url'])
+    if scenario.get('query'):
+        url = f'{url}?{scenario["query"]}'
+    user = users.get(scenario['auth']) if scenario['auth'] else None
+    if scenario['auth'] and user is None:
+        return {'skipped': f'нет пользователя для роли {scenario["auth"]}'}
+
+    client = _client(user)
+    for _ in range(warmup):
+        _consume(client.get(url))
+    # Считаем через execute_wrapper: connection.queries очищается
+    # в начале каждого запроса
+    queries = []
+
+    def count_query(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count_query):
+        status = _consume(client.get(url))
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    per_worker = max(1, requests // concurrency)
+
+    def worker():
+        worker_client = client if concurrency == 1 else _client(user)
+        local = []
+        failed = 0
+        for _ in range(per_worker):
+            started = time.perf_counter()
+            code = _consume(worker_client.get(url))
+            local.append((time.perf_counter() - started) * 1000)
+            if code >= 400:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors.append(failed)
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        worker()
+    else:
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'url': url,
+        'status': status,
+        'queries': len(queries),
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'mean_ms': statistics.fmean(latencies),
+        'p50_ms': percentile(latencies, 0.5),
+        'p90_ms': percentile(latencies, 0.9),
+        'p99_ms': percentile(latencies, 0.99),
+        'max_ms': latencies[-1],
+        'rps': len(latencies) / elapsed,
+    }
+
+
+def run(names=None, requests=200, warmup=20, concurrency=1, progress=None):
+    users = pick_users()
+    results = {}
+    # Замеряются представления, а не ограничитель частоты: все запросы
+    # идут с одного адреса и иначе получили бы 429
+    with override_settings(PORTAL_RATE_LIMITS={}):
+        for scenario in SCENARIOS:
+            if names and scenario['name'] not in names:
+                continue
+            results[scenario['name']] = run_scenario(scenario, users, requests, warmup, concurrency)
+            if progress:
+                progress(scenario['name'], results[scenario['name']])
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'requests': requests,
+            'concurrency': concurrency,
+            'dataset': dataset_info(),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=0.15, min_delta_ms=1.0):
+    """
+    Сравнивает результаты с эталоном. Регрессия — рост p50 или p90 больше
+    чем на threshold (доля) и больше min_delta_ms, рост числа SQL-запросов
+    или падение пропускной способности больше чем на threshold.
+    """
+    rows = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if not base or 'skipped' in result or 'skipped' in base:
+            continue
+        problems = []
+        for metric in ('p50_ms', 'p90_ms'):
+            delta = result[metric] - base[metric]
+            if delta > min_delta_ms and result[metric] > base[metric] * (1 + threshold):
+                problems.append(f'{metric} {base[metric]:.1f} → {result[metric]:.1f}')
+        if result['rps'] < base['rps'] * (1 - threshold):
+            problems.append(f'rps {base["rps"]:.0f} → {result["rps"]:.0f}')
+        if result['queries'] > base['queries']:
+            problems.append(f'SQL {base["queries"]} → {result["queries"]}')
+        rows.append({'name': name, 'baseline': base, 'current': result, 'regressions': problems})
+    return rows
+
+
+def load(path):
+    with open(path, encoding='utf-8') as fileobj:
+        return json.load(fileobj)
+
+
+def save(data, path):
+    with open(path, 'w', encoding='utf-8') as fileobj:
+        json.dump(data, fileobj, ensure_ascii=False, indent=2)
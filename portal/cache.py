@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import UnifiedApplication
+
+
+PROFILE_APPLICATIONS_TIMEOUT = 60 * 60
+ROW_FRAGMENT_TIMEOUT = 24 * 60 * 60
+
+# Шаблоны строк заявок по вариантам отображения
+ROW_TEMPLATES = {
+    'profile': 'portal/includes/profile_application_row.html',
+    'dashboard': 'portal/includes/dashboard_application_row.html',
+}
+
+
+def get_cache():
+    """Кэш портала (алиас задается настройкой PORTAL_CACHE_ALIAS)"""
+    return caches[getattr(settings, 'PORTAL_CACHE_ALIAS', 'default')]
+
+
+def profile_applications_key(user_id, state):
+    """
+    Ключ зависит от состояния заявок в базе (portal.conditional.profile_state),
+    а не от сброса по сигналам: изменения из других процессов (перенос
+    в архив, manage.py) тоже меняют ключ. Названия курсов входят в HTML,
+    поэтому в ключе и версия каталога.
+    """
+    from .catalog import get_catalog_version
+    last_modified = state['last_modified']
+    version = int(last_modified.timestamp() * 1_000_000) if last_modified else 0
+    return (
+        f'portal:profile_applications_html:{user_id}:{get_catalog_version()}:'
+        f'{state["count"]}:{state["archived"]}:{version}'
+    )
+
+
+def row_fragment_key(variant, application, catalog_version):
+    # После архивации id и версия заявки прежние, а строка другая
+    archived = int(application.archived)
+    return f'portal:row:{variant}:{application.id}:{application.version}:{archived}:{catalog_version}'
+
+
+def render_application_rows(applications, variant):
+    """
+    HTML строк заявок: [(заявка, html), ...] в исходном порядке.
+
+    Строки берутся из кэша одним get_many по ключу (id, версия, вариант,
+    версия каталога); рендерятся только новые или изменившиеся заявки.
+    """
+    from .catalog import get_catalog_version
+
+    cache = get_cache()
+    catalog_version = get_catalog_version()
+    keys = [row_fragment_key(variant, app, catalog_version) for app in applications]
+    cached = cache.get_many(keys)
+    missing = {}
+    template = None
+    for key, app in zip(keys, applications):
+        if key not in cached:
+            template = template or get_template(ROW_TEMPLATES[variant])
+            missing[key] = str(template.render({'app': app}))
+    if missing:
+        cache.set_many(missing, ROW_FRAGMENT_TIMEOUT)
+        cached.update(missing)
+    return [(app, mark_safe(cached[key])) for key, app in zip(keys, applications)]
+
+
+def get_profile_applications(user, state):
+    """
+    HTML списка заявок в личном кабинете.
+
+    Таблица собирается одним запросом с JOIN на курс (вместе с архивом,
+    см. portal.archive) и кэшируется до изменения заявок пользователя
+    (state — см. profile_applications_key); при промахе заново
+    рендерятся только изменившиеся строки. Форма отзыва на странице
+    одна общая: она содержит CSRF-токен и в кэш не попадает.
+    """
+    cache = get_cache()
+    key = profile_applications_key(user.pk, state)
+    html = cache.get(key)
+    if html is None:
+        applications = list(
+            UnifiedApplication.objects.filter(user=user).select_related('course')
+        )
+        html = str(render_to_string('portal/includes/profile_applications.html', {
+            'rows': render_application_rows(applications, 'profile'),
+        }))
+        cache.set(key, html, PROFILE_APPLICATIONS_TIMEOUT)
+    return mark_safe(html)
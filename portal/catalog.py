@@ -0,0 +1,133 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.safestring import mark_safe
+
+from . import counters
+from .cache import get_cache
+from .models import Course
+
+
+CATALOG_VERSION_KEY = 'portal:catalog:version'
+CATALOG_VERSION_TIMEOUT = 5
+CATALOG_TIMEOUT = 24 * 60 * 60
+
+
+class CatalogSnapshot:
+    """
+    Неизменяемый снимок каталога курсов.
+
+    courses — все курсы (для фильтров панели администратора),
+    active — только активные (для формы заявки),
+    json — активные курсы, уже сериализованные для скрипта страницы.
+    """
+
+    def __init__(self, version, courses):
+        self.version = version
+        self.courses = courses
+        self.active = [course for course in courses if course['is_active']]
+        self.by_id = {course['id']: course for course in courses}
+        data = {
+            course['id']: {
+                'title': course['title'],
+                'description': course['description'],
+            }
+            for course in self.active
+        }
+        self.json = mark_safe(
+            json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+            .replace('<', '\\u003C')
+            .replace('>', '\\u003E')
+            .replace('&', '\\u0026')
+        )
+
+    def active_choices(self):
+        return [(course['id'], course['title']) for course in self.active]
+
+    def all_choices(self):
+        return [(course['id'], course['title']) for course in self.courses]
+
+    def get_active(self, course_id):
+        course = self.by_id.get(course_id)
+        if course is None or not course['is_active']:
+            return None
+        return course
+
+    def as_instance(self, course_id):
+        """Course из снимка без обращения к базе"""
+        data = self.by_id[course_id]
+        course = Course(
+            id=data['id'],
+            title=data['title'],
+            description=data['description'],
+            is_active=data['is_active'],
+        )
+        course._state.adding = False
+        course._state.db = 'default'
+        return course
+
+
+def get_catalog_version():
+    """
+    Версия каталога — счетчик изменений курсов в базе (portal.counters).
+
+    Значение кэшируется на CATALOG_VERSION_TIMEOUT секунд: изменение
+    курса в другом процессе становится видно не позже чем через это время.
+    """
+    cache = get_cache()
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        version = counters.get_value(counters.CATALOG)
+        cache.set(CATALOG_VERSION_KEY, version, CATALOG_VERSION_TIMEOUT)
+    return version
+
+
+def bump_catalog_version():
+    """Курсы изменены в этом процессе — версия и снимок перечитываются сразу"""
+    global _local_snapshot
+    get_cache().delete(CATALOG_VERSION_KEY)
+    _local_snapshot = None
+
+
+def _catalog_key(version):
+    return f'portal:catalog:{version}'
+
+
+def _build_courses():
+    return [
+        {
+            'id': course.id,
+            'title': course.title,
+            'description': course.description,
+            'short_desc': course.short_description(),
+            'is_active': course.is_active,
+        }
+        for course in Course.objects.order_by('title', 'id')
+    ]
+
+
+_local_snapshot = None
+
+
+def get_catalog():
+    """
+    Возвращает текущий снимок каталога.
+
+    Снимок хранится в кэше под номером версии; версию увеличивают
+    триггеры базы на любое изменение курсов. В процессе дополнительно
+    держится последний снимок, чтобы не распаковывать его на каждый запрос.
+    """
+    global _local_snapshot
+    version = get_catalog_version()
+    snapshot = _local_snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    cache = get_cache()
+    courses = cache.get(_catalog_key(version))
+    if courses is None:
+        courses = _build_courses()
+        cache.set(_catalog_key(version), courses, CATALOG_TIMEOUT)
+    snapshot = CatalogSnapshot(version, courses)
+    _local_snapshot = snapshot
+    return snapshot
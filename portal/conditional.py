@@ -0,0 +1,113 @@
+"""
+Валидаторы для условных GET-запросов (ETag / Last-Modified).
+
+Валидатор собирается из дешевых маркеров изменений, которые видны
+в базе всем процессам: max(updated_at) заявок (по индексу), число заявок
+пользователя и архивных среди них или счетчик удалений заявок
+(portal.counters), версии каталога и пользователя. Если у клиента актуальная копия, представление
+не выполняется и ответ — 304 Not Modified.
+"""
+import hashlib
+
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max, Q
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from . import counters
+from .catalog import get_catalog_version
+from .models import Application, UnifiedApplication
+
+
+def user_version(user):
+    """Поля пользователя, которые видны на страницах (шапка, права)"""
+    return f'{user.pk}:{user.username}:{user.full_name}:{user.email}:{user.is_superuser}'
+
+
+def profile_state(request):
+    """
+    Заявки пользователя вместе с архивом одним запросом: число, сколько
+    из них в архиве, max(updated_at). Удаление меняет число, перенос
+    в архив — число архивных. Входит в ETag и в ключ кэша списка заявок
+    (portal.cache). Запоминается на запросе: condition() вызывает и
+    etag_func, и last_modified_func, а затем его использует представление.
+    """
+    if not hasattr(request, '_portal_profile_state'):
+        request._portal_profile_state = UnifiedApplication.objects.filter(
+            user_id=request.user.pk,
+        ).aggregate(
+            count=Count('id'),
+            archived=Count('id', filter=Q(archived=True)),
+            last_modified=Max('updated_at'),
+        )
+    return request._portal_profile_state
+
+
+def _dashboard_state(request):
+    # COUNT(*) по всей таблице дорог — удаления считает триггер
+    if not hasattr(request, '_portal_dashboard_state'):
+        request._portal_dashboard_state = {
+            'deleted': counters.get_value(counters.APPLICATIONS_DELETED),
+            'last_modified': Application.objects.aggregate(value=Max('updated_at'))['value'],
+        }
+    return request._portal_dashboard_state
+
+
+def _is_cacheable(request):
+    # Непоказанные сообщения (messages) выводятся на странице один раз
+    return request.method in ('GET', 'HEAD') and not len(get_messages(request))
+
+
+def _etag(request, *parts):
+    raw = '|'.join(str(part) for part in (
+        request.get_full_path(),
+        request.META.get('CSRF_COOKIE', ''),
+        user_version(request.user),
+        get_catalog_version(),
+        *parts,
+    ))
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def profile_etag(request, *args, **kwargs):
+    if not _is_cacheable(request):
+        return None
+    state = profile_state(request)
+    return _etag(request, state['last_modified'], state['count'], state['archived'])
+
+
+def profile_last_modified(request, *args, **kwargs):
+    if not _is_cacheable(request):
+        return None
+    return profile_state(request)['last_modified']
+
+
+def dashboard_etag(request, *args, **kwargs):
+    if not _is_cacheable(request):
+        return None
+    state = _dashboard_state(request)
+    return _etag(request, state['last_modified'], state['deleted'])
+
+
+def dashboard_last_modified(request, *args, **kwargs):
+    if not _is_cacheable(request):
+        return None
+    return _dashboard_state(request)['last_modified']
+
+
+def application_form_etag(request, *args, **kwargs):
+    if not _is_cacheable(request):
+        return None
+    return _etag(request)
+
+
+def conditional_page(etag_func, last_modified_func=None):
+    """
+    condition() + Cache-Control: private, no-cache — браузер хранит страницу,
+    но каждый раз переспрашивает сервер, а общие кэши ее не сохраняют.
+    """
+    def decorator(view_func):
+        return cache_control(private=True, no_cache=True)(
+            condition(etag_func=etag_func, last_modified_func=last_modified_func)(view_func)
+        )
+    return decorator
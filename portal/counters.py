@@ -0,0 +1,90 @@
+"""
+Счетчики изменений в базе (таблица portal_changecounter).
+
+Счетчики увеличивают триггеры SQLite, поэтому изменения из любого
+процесса — другого воркера, manage.py, админки, массового UPDATE или
+прямого SQL — видны всем процессам. Кэш процесса (LocMemCache) так
+не умеет: сброс ключа в одном воркере не виден остальным.
+
+Здесь же триггер, сдвигающий updated_at заявок при изменении
+пользователя: его данные выводятся в строках заявок.
+"""
+from django.db import connection
+
+from .models import ChangeCounter
+
+
+# Любое изменение курсов — новая версия каталога (portal.catalog)
+CATALOG = 'catalog'
+# Удаление заявки не меняет max(updated_at) — ETag панели (portal.conditional)
+APPLICATIONS_DELETED = 'applications_deleted'
+
+# Новые пользователи и смена логина/email — сверка фильтров portal.availability
+USERS = 'users'
+
+# Все триггеры модуля; pre_migrate удаляет их по префиксу
+TRIGGER_PREFIX = 'portal_counter_'
+
+_BUMP_SQL = (
+    "INSERT INTO portal_changecounter (name, value) VALUES ('{name}', 1) "
+    "ON CONFLICT (name) DO UPDATE SET value = value + 1;"
+)
+
+TRIGGERS_SQL = [
+    f"""CREATE TRIGGER IF NOT EXISTS portal_counter_course_ai AFTER INSERT ON portal_course BEGIN
+        {_BUMP_SQL.format(name=CATALOG)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS portal_counter_course_au AFTER UPDATE ON portal_course BEGIN
+        {_BUMP_SQL.format(name=CATALOG)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS portal_counter_course_ad AFTER DELETE ON portal_course BEGIN
+        {_BUMP_SQL.format(name=CATALOG)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS portal_counter_application_ad AFTER DELETE ON portal_application BEGIN
+        {_BUMP_SQL.format(name=APPLICATIONS_DELETED)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS portal_counter_user_ai AFTER INSERT ON portal_customuser BEGIN
+        {_BUMP_SQL.format(name=USERS)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS portal_counter_user_au
+    AFTER UPDATE OF username, email ON portal_customuser
+    WHEN old.username IS NOT new.username OR old.email IS NOT new.email BEGIN
+        {_BUMP_SQL.format(name=USERS)}
+    END""",
+    # Время в формате Django (микросекунды), иначе max(updated_at) сравнивал бы строки разной длины
+    """CREATE TRIGGER IF NOT EXISTS portal_counter_user_touch_au
+    AFTER UPDATE OF username, full_name, email ON portal_customuser
+    WHEN old.username IS NOT new.username OR old.full_name IS NOT new.full_name
+        OR old.email IS NOT new.email BEGIN
+        UPDATE portal_application SET updated_at = strftime('%Y-%m-%d %H:%M:%f000', 'now')
+        WHERE user_id = new.id;
+    END""",
+]
+
+
+def is_available(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def install(cursor):
+    """Создает триггеры, если их нет (вызывается после migrate)"""
+    for sql in TRIGGERS_SQL:
+        cursor.execute(sql)
+
+
+def drop(cursor):
+    """
+    Удаляет триггеры перед migrate: откат миграций может удалить таблицу
+    счетчиков раньше, чем триггеры, которые в нее пишут.
+    """
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+        [TRIGGER_PREFIX + '%'],
+    )
+    for (name,) in cursor.fetchall():
+        cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+
+def get_value(name):
+    value = ChangeCounter.objects.filter(name=name).values_list('value', flat=True).first()
+    return value or 0
@@ -0,0 +1,53 @@
+import functools
+import logging
+import random
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+
+logger = logging.getLogger(__name__)
+
+
+def is_locked_error(exc):
+    message = str(exc).lower()
+    return isinstance(exc, OperationalError) and ('locked' in message or 'busy' in message)
+
+
+def run_write(func, *args, **kwargs):
+    """
+    Выполняет запись в отдельной транзакции и повторяет ее,
+    если SQLite вернул "database is locked".
+
+    Внутри уже открытой транзакции повтор невозможен, поэтому
+    функция просто вызывается один раз.
+    """
+    if connection.in_atomic_block:
+        return func(*args, **kwargs)
+
+    attempts = getattr(settings, 'SQLITE_WRITE_RETRIES', 5)
+    delay = getattr(settings, 'SQLITE_WRITE_RETRY_DELAY', 0.05)
+    for attempt in range(1, attempts + 1):
+        try:
+            with transaction.atomic():
+                return func(*args, **kwargs)
+        except OperationalError as exc:
+            if not is_locked_error(exc) or attempt == attempts:
+                raise
+            logger.warning('База занята, повтор записи %s/%s', attempt, attempts)
+            # Экспоненциальная задержка со случайным разбросом
+            time.sleep(delay * 2 ** (attempt - 1) * (1 + random.random()))
+
+
+def retry_on_locked(func):
+    """Декоратор для функций записи, см. run_write"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return run_write(func, *args, **kwargs)
+    return wrapper
+
+
+async def arun_write(func, *args, **kwargs):
+    return await sync_to_async(run_write)(func, *args, **kwargs)
@@ -0,0 +1,244 @@
+"""
+Живые обновления заявок в личном кабинете (Server-Sent Events).
+
+Сигналы заявок после фиксации транзакции публикуют событие для
+владельца заявки: статус и готовый HTML строки. Событие раздается
+открытым потокам текущего процесса (Broker) и через датаграммы по
+Unix-сокетам в PORTAL_EVENTS_SOCKET_DIR — остальным воркерам на этой
+машине. Каждый процесс, у которого есть подписчики, слушает свой
+сокет <pid>.sock; процессы, которые только публикуют, сокет не создают.
+"""
+import asyncio
+import atexit
+import json
+import logging
+import os
+import socket
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .cache import render_application_rows
+from .models import Application
+
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 100
+# Догоняющие события после переподключения (по Last-Event-ID)
+CATCH_UP_LIMIT = 100
+RECONNECT_DELAY_MS = 3000
+MAX_DATAGRAM_SIZE = 64 * 1024
+
+
+def _offer(queue, event):
+    # Выполняется в цикле событий подписчика. Медленный клиент теряет
+    # самые старые события, а не задерживает остальных
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+class Broker:
+    """Подписки текущего процесса: user_id -> очереди открытых потоков"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, user_id):
+        subscription = (asyncio.get_running_loop(), asyncio.Queue(maxsize=QUEUE_SIZE))
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        fanout.listen()
+        return subscription
+
+    def unsubscribe(self, user_id, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[user_id]
+
+    def dispatch(self, user_id, event):
+        """Можно вызывать из любого потока"""
+        with self._lock:
+            subscriptions = list(self._subscribers.get(user_id, ()))
+        for subscription in subscriptions:
+            loop, queue = subscription
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:  # цикл событий уже закрыт
+                self.unsubscribe(user_id, subscription)
+
+
+class SocketFanout:
+    """Пересылка событий другим процессам через Unix-сокеты (SOCK_DGRAM)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._path = None
+        self._disabled = False
+
+    @property
+    def directory(self):
+        directory = getattr(settings, 'PORTAL_EVENTS_SOCKET_DIR', None)
+        if directory is None or self._disabled or not hasattr(socket, 'AF_UNIX'):
+            return None
+        return str(directory)
+
+    def listen(self):
+        """Открывает сокет процесса при первой подписке"""
+        directory = self.directory
+        if directory is None or self._path is not None:
+            return
+        with self._lock:
+            if self._path is not None:
+                return
+            path = os.path.join(directory, f'{os.getpid()}.sock')
+            try:
+                os.makedirs(directory, exist_ok=True)
+                if os.path.exists(path):
+                    os.unlink(path)
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                sock.bind(path)
+            except OSError:
+                # Например, Windows: без сокетов события доходят только
+                # до потоков этого процесса
+                logger.warning('Не удалось открыть сокет событий %s', path, exc_info=True)
+                self._disabled = True
+                return
+            self._path = path
+            atexit.register(self._cleanup, path)
+            threading.Thread(target=self._receive, args=(sock,), name='portal-events', daemon=True).start()
+
+    def _cleanup(self, path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def _receive(self, sock):
+        while True:
+            data = sock.recv(MAX_DATAGRAM_SIZE)
+            try:
+                message = json.loads(data)
+                broker.dispatch(message['user_id'], message['event'])
+            except (ValueError, KeyError):
+                logger.warning('Некорректное сообщение в сокете событий')
+
+    def send(self, user_id, event):
+        directory = self.directory
+        if directory is None:
+            return
+        try:
+            names = [name for name in os.listdir(directory) if name.endswith('.sock')]
+        except FileNotFoundError:
+            return
+        data = json.dumps({'user_id': user_id, 'event': event}).encode()
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            for name in names:
+                path = os.path.join(directory, name)
+                if path == self._path:
+                    continue
+                try:
+                    sock.sendto(data, path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Сокет остался от завершившегося воркера
+                    self._cleanup(path)
+                except OSError:
+                    logger.warning('Не удалось отправить событие в %s', path, exc_info=True)
+
+
+broker = Broker()
+fanout = SocketFanout()
+
+
+def publish(user_id, event):
+    broker.dispatch(user_id, event)
+    fanout.send(user_id, event)
+
+
+def application_events(applications):
+    """События с новым состоянием заявок (заявки — с select_related('course'))"""
+    return [
+        (app.user_id, {
+            'event': 'application',
+            'id': app.version,
+            'data': {
+                'id': app.id,
+                'status': app.status,
+                'status_display': app.get_status_display(),
+                'html': str(row),
+            },
+        })
+        for app, row in render_application_rows(applications, 'profile')
+    ]
+
+
+def publish_applications(application_ids):
+    """Вызывается после фиксации транзакции (см. portal.signals)"""
+    applications = list(
+        Application.objects.filter(id__in=application_ids).select_related('course')
+    )
+    for user_id, event in application_events(applications):
+        publish(user_id, event)
+
+
+def publish_application_deleted(user_id, application_id):
+    publish(user_id, {'event': 'application_deleted', 'data': {'id': application_id}})
+
+
+def missed_events(user_id, last_event_id):
+    """Заявки, измененные после события last_event_id (версии заявки)"""
+    try:
+        since = datetime.fromtimestamp(int(last_event_id) / 1_000_000, tz=timezone.utc)
+    except (TypeError, ValueError, OverflowError):
+        return []
+    applications = list(
+        Application.objects.filter(user_id=user_id, updated_at__gt=since)
+        .select_related('course').order_by('updated_at')[:CATCH_UP_LIMIT]
+    )
+    return [event for _, event in application_events(applications)]
+
+
+def format_event(event):
+    lines = []
+    if 'id' in event:
+        lines.append(f'id: {event["id"]}')
+    lines.append(f'event: {event["event"]}')
+    lines.append(f'data: {json.dumps(event["data"], ensure_ascii=False)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+async def stream(user_id, last_event_id=None):
+    """
+    Поток SSE для пользователя. Комментарий-пинг раз в
+    PORTAL_EVENTS_HEARTBEAT секунд не дает прокси закрыть соединение;
+    через PORTAL_EVENTS_STREAM_TIMEOUT поток завершается, и браузер
+    переподключается с Last-Event-ID.
+    """
+    heartbeat = getattr(settings, 'PORTAL_EVENTS_HEARTBEAT', 15)
+    timeout = getattr(settings, 'PORTAL_EVENTS_STREAM_TIMEOUT', 300)
+    subscription = broker.subscribe(user_id)
+    loop, queue = subscription
+    try:
+        yield f'retry: {RECONNECT_DELAY_MS}\n\n'
+        # Подписка оформлена до запроса, поэтому между ними ничего не теряется
+        if last_event_id:
+            for event in await sync_to_async(missed_events)(user_id, last_event_id):
+                yield format_event(event)
+        deadline = loop.time() + timeout
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                event = await asyncio.wait_for(queue.get(), min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(user_id, subscription)
@@ -0,0 +1,145 @@
+import csv
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Application
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+# (заголовок, поле для values_list)
+EXPORT_COLUMNS = [
+    ('ID', 'id'),
+    ('Логин', 'user__username'),
+    ('ФИО', 'user__full_name'),
+    ('Email', 'user__email'),
+    ('Телефон', 'user__phone'),
+    ('Курс', 'course__title'),
+    ('Дата начала', 'desired_start_date'),
+    ('Способ оплаты', 'payment_method'),
+    ('Статус', 'status'),
+    ('Дата создания', 'created_at'),
+    ('Отзыв', 'feedback'),
+]
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def export_headers():
+    return [header for header, _ in EXPORT_COLUMNS]
+
+
+def escape_formula(value):
+    """
+    Текст, который Excel или LibreOffice приняли бы за формулу
+    (=, +, -, @, табуляция, перевод строки в начале), выводится с апострофом.
+    """
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class ExportReader:
+    """
+    Строки выгрузки заявок пачками по chunk_size.
+
+    Данные читаются через values_list() без создания объектов моделей.
+    Каждая пачка — отдельный запрос с условием по ключу (created_at, id)
+    последней строки, как в keyset_paginate: между пачками не держится
+    открытый курсор, поэтому память не зависит от размера выборки, а пачки
+    можно читать из разных вызовов sync_to_async (aiter_csv).
+    """
+
+    def __init__(self, queryset, chunk_size=EXPORT_CHUNK_SIZE):
+        self.queryset = queryset.order_by('-created_at', '-id')
+        self.chunk_size = chunk_size
+        self.fields = [field for _, field in EXPORT_COLUMNS]
+        self.statuses = dict(Application.Status.choices)
+        self.payments = dict(Application.PaymentMethod.choices)
+        self._last = None
+        self._done = False
+
+    def _format(self, row):
+        values = dict(zip(self.fields, row))
+        values['status'] = self.statuses.get(values['status'], values['status'])
+        values['payment_method'] = self.payments.get(values['payment_method'], values['payment_method'])
+        values['created_at'] = timezone.localtime(values['created_at']).strftime('%d.%m.%Y %H:%M')
+        return [escape_formula(values[field]) for field in self.fields]
+
+    def next_batch(self):
+        """Следующая пачка строк; пустой список — выгрузка закончена"""
+        if self._done:
+            return []
+        queryset = self.queryset
+        if self._last is not None:
+            created_at, pk = self._last
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )
+        rows = list(queryset.values_list(*self.fields)[:self.chunk_size])
+        # Неполная пачка — последняя, лишний запрос не нужен
+        self._done = len(rows) < self.chunk_size
+        if rows:
+            last = dict(zip(self.fields, rows[-1]))
+            self._last = (last['created_at'], last['id'])
+        return [self._format(row) for row in rows]
+
+    def __iter__(self):
+        while batch := self.next_batch():
+            yield from batch
+
+
+def export_rows(queryset):
+    return iter(ExportReader(queryset))
+
+
+class Echo:
+    """Псевдо-буфер для csv.writer: write() просто возвращает строку"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_writer():
+    return csv.writer(Echo(), delimiter=';')
+
+
+def iter_csv(queryset):
+    writer = _csv_writer()
+    # BOM, чтобы Excel правильно открыл кириллицу
+    yield '\ufeff' + writer.writerow(export_headers())
+    for row in export_rows(queryset):
+        yield writer.writerow(row)
+
+
+async def aiter_csv(queryset):
+    """
+    То же, что iter_csv, для ASGI: синхронный итератор ASGIHandler
+    сначала читает целиком, а асинхронный отдает клиенту по пачке.
+    """
+    writer = _csv_writer()
+    yield '\ufeff' + writer.writerow(export_headers())
+    reader = ExportReader(queryset)
+    while batch := await sync_to_async(reader.next_batch)():
+        yield ''.join(writer.writerow(row) for row in batch)
+
+
+def write_xlsx(queryset, fileobj):
+    """
+    Пишет выгрузку в XLSX (нужен openpyxl).
+
+    Используется режим write_only: строки сразу уходят во временные
+    файлы openpyxl и не копятся в памяти.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Заявки')
+    sheet.append(export_headers())
+    for row in export_rows(queryset):
+        sheet.append(row)
+    workbook.save(fileobj)
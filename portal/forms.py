@@ -1,6 +1,11 @@
+from datetime import datetime, time, timedelta
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
+from django.utils import timezone
 from django.core.validators import MinLengthValidator
+from .availability import is_taken
+from .catalog import get_catalog
 from .models import CustomUser, Application, Course
 
 
@@ -8,6 +13,10 @@ from django.contrib.auth.forms import UserCreationForm
 from django import forms
 from django.core.exceptions import ValidationError
 
+USERNAME_TAKEN = 'Пользователь с таким логином уже существует.'
+EMAIL_TAKEN = 'Пользователь с таким Email уже существует.'
+
+
 class SimpleUserCreationForm(forms.ModelForm):
     """Упрощенная форма регистрации без подтверждения пароля"""
     password = forms.CharField(
@@ -36,6 +45,20 @@ class SimpleUserCreationForm(forms.ModelForm):
             'email': 'Email',
         }
     
+    # Без учета регистра, как и проверка на лету (portal.availability);
+    # точное совпадение дополнительно ловит уникальный индекс
+    def clean_username(self):
+        username = self.cleaned_data['username']
+        if is_taken('username', username):
+            raise ValidationError(USERNAME_TAKEN)
+        return username
+
+    def clean_email(self):
+        email = self.cleaned_data['email']
+        if is_taken('email', email):
+            raise ValidationError(EMAIL_TAKEN)
+        return email
+
     def save(self, commit=True):
         user = super().save(commit=False)
         user.set_password(self.cleaned_data["password"])
@@ -56,8 +79,47 @@ class CustomAuthenticationForm(AuthenticationForm):
         widget=forms.PasswordInput(attrs={'class': 'form-control'})
     )
 
+    def set_authenticated_user(self, user):
+        """
+        Передает результат уже выполненной (асинхронной) проверки пароля,
+        чтобы clean() не вызывал синхронный authenticate().
+        """
+        self._preauthenticated = True
+        self.user_cache = user
+
+    def clean(self):
+        if not getattr(self, '_preauthenticated', False):
+            return super().clean()
+        if self.cleaned_data.get('username') is not None and self.cleaned_data.get('password'):
+            if self.user_cache is None:
+                raise self.get_invalid_login_error()
+            self.confirm_login_allowed(self.user_cache)
+        return self.cleaned_data
+
+
+class CatalogCourseField(forms.TypedChoiceField):
+    """Выбор курса по снимку каталога вместо запроса к Course"""
+
+    def __init__(self, *args, active_only=True, **kwargs):
+        self.active_only = active_only
+        kwargs.setdefault('coerce', int)
+        super().__init__(*args, choices=self._choices_from_catalog, **kwargs)
+
+    def _choices_from_catalog(self):
+        catalog = get_catalog()
+        choices = catalog.active_choices() if self.active_only else catalog.all_choices()
+        return [('', '---------')] + choices
+
+    def clean(self, value):
+        course_id = super().clean(value)
+        if course_id in self.empty_values:
+            return None
+        return get_catalog().as_instance(course_id)
+
 
 class ApplicationForm(forms.ModelForm):
+    course = CatalogCourseField(label='Курс')
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['course'].widget.attrs.update({
@@ -65,6 +127,14 @@ class ApplicationForm(forms.ModelForm):
             'id': 'course-select',
             'onchange': 'showCourseDescription()'
         })
+
+    def clean_course(self):
+        # Снимок каталога может отставать от базы на время жизни версии:
+        # курс, закрытый только что, проверяется по самой таблице
+        course = self.cleaned_data['course']
+        if not Course.objects.filter(pk=course.pk, is_active=True).exists():
+            raise ValidationError('Запись на этот курс закрыта')
+        return course
     
     class Meta:
         model = Application
@@ -150,6 +220,12 @@ class UserProfileForm(forms.ModelForm):
             'email': 'Email',
         }
     
+    def clean_email(self):
+        email = self.cleaned_data['email']
+        if is_taken('email', email, exclude_pk=self.instance.pk):
+            raise ValidationError(EMAIL_TAKEN)
+        return email
+
     def clean(self):
         cleaned_data = super().clean()
         new_password = cleaned_data.get('new_password')
@@ -164,3 +240,83 @@ class UserProfileForm(forms.ModelForm):
         
         return cleaned_data
     
+
+
+class IdListField(forms.TypedMultipleChoiceField):
+    """Список id; набор допустимых значений заранее не известен"""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('coerce', int)
+        super().__init__(*args, **kwargs)
+
+    def valid_value(self, value):
+        return str(value).isdigit()
+
+
+class BulkStatusForm(forms.Form):
+    """Массовая смена статуса заявок"""
+    MAX_APPLICATIONS = 1000
+
+    application_ids = IdListField()
+    status = forms.ChoiceField(choices=Application.Status.choices)
+
+    def clean_application_ids(self):
+        ids = set(self.cleaned_data['application_ids'])
+        if len(ids) > self.MAX_APPLICATIONS:
+            raise ValidationError(f'Можно изменить не более {self.MAX_APPLICATIONS} заявок за раз')
+        return sorted(ids)
+
+
+class ApplicationFilterForm(forms.Form):
+    """Фильтры списка заявок в панели администратора"""
+    q = forms.CharField(
+        label='Поиск',
+        max_length=200,
+        required=False,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'type': 'search',
+            'placeholder': 'ФИО, логин, email, телефон, курс или отзыв',
+        })
+    )
+    status = forms.ChoiceField(
+        label='Статус',
+        choices=[('', 'Все статусы')] + Application.Status.choices,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    course = CatalogCourseField(
+        label='Курс',
+        active_only=False,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    date_from = forms.DateField(
+        label='Создана с',
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+    date_to = forms.DateField(
+        label='Создана по',
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+
+    def filter(self, queryset):
+        """
+        Применяет фильтры к выборке заявок (форма должна быть валидна).
+        Поисковая строка q здесь не учитывается — см. portal.search.
+        """
+        data = self.cleaned_data
+        if data.get('status'):
+            queryset = queryset.filter(status=data['status'])
+        if data.get('course'):
+            queryset = queryset.filter(course=data['course'])
+        # Границы дат переводим в datetime, чтобы условие попадало в индекс
+        if data.get('date_from'):
+            start = timezone.make_aware(datetime.combine(data['date_from'], time.min))
+            queryset = queryset.filter(created_at__gte=start)
+        if data.get('date_to'):
+            end = timezone.make_aware(datetime.combine(data['date_to'] + timedelta(days=1), time.min))
+            queryset = queryset.filter(created_at__lt=end)
+        return queryset
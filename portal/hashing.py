@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+
+logger = logging.getLogger(__name__)
+
+
+class HashingOverloaded(Exception):
+    """Очередь хеширования паролей переполнена"""
+
+
+class HashingExecutor:
+    """
+    Ограниченный пул для хеширования паролей из async-представлений.
+
+    PBKDF2 в hashlib отпускает GIL, поэтому потоки загружают все ядра,
+    а цикл событий продолжает обслуживать остальные запросы. Если в очереди
+    больше max_queue задач, новые сразу отклоняются (HashingOverloaded).
+    """
+
+    def __init__(self, max_workers=None, max_queue=None):
+        self.max_workers = max_workers or getattr(
+            settings, 'PASSWORD_HASHING_WORKERS', None
+        ) or os.cpu_count() or 1
+        self.max_queue = max_queue or getattr(settings, 'PASSWORD_HASHING_MAX_QUEUE', 256)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix='password-hashing'
+            )
+        return self._executor
+
+    def _done(self, future):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+
+    async def run(self, func, *args):
+        with self._lock:
+            if self.pending >= self.max_queue:
+                self.rejected += 1
+                logger.warning('Очередь хеширования переполнена (%s задач)', self.pending)
+                raise HashingOverloaded()
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+            executor = self._get_executor()
+        future = executor.submit(func, *args)
+        future.add_done_callback(self._done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self):
+        """Метрики очереди: в работе + ожидают, пик, выполнено, отклонено"""
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'pending': self.pending,
+                'queued': max(0, self.pending - self.max_workers),
+                'peak_pending': self.peak_pending,
+                'completed': self.completed,
+                'rejected': self.rejected,
+            }
+
+
+hashing_executor = HashingExecutor()
+
+
+async def amake_password(password):
+    return await hashing_executor.run(make_password, password)
+
+
+def _check_password(password, encoded):
+    """
+    check_password без сохранения пользователя: если хеш устарел,
+    новый возвращается вызывающему (тоже вычисляется в пуле).
+    """
+    upgraded = []
+    valid = check_password(password, encoded, lambda raw: upgraded.append(make_password(raw)))
+    return valid, upgraded[0] if upgraded else None
+
+
+async def acheck_password(user, password):
+    """
+    Проверка пароля в пуле. Обновленный хеш сохраняется здесь, а не
+    в потоке пула: там не должно открываться соединений с базой.
+    """
+    valid, upgraded = await hashing_executor.run(_check_password, password, user.password)
+    if upgraded:
+        user.password = upgraded
+        await user.asave(update_fields=['password'])
+    return valid
+
@@ -0,0 +1,189 @@
+"""
+Очередь фоновых задач в базе данных (без внешнего брокера).
+
+Задача добавляется в той же транзакции, что и изменение, которое ее
+вызвало: откат транзакции отменяет и задачу. Воркер (manage.py
+run_worker) забирает готовые задачи, выполняет их обработчиком,
+зарегистрированным через @register, и удаляет; при ошибке задача
+возвращается в очередь с экспоненциальной задержкой.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .db import run_write
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+# Обработчики: тип задачи -> функция(список payload задач одной пачки)
+HANDLERS = {}
+
+MAX_RETRY_DELAY = 60 * 60
+
+
+def register(kind):
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def new_job(kind, payload, key=None, batch_key=None, delay=0):
+    return Job(
+        kind=kind,
+        payload=payload,
+        key=key,
+        batch_key=batch_key,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def enqueue(jobs):
+    """
+    Добавляет задачи одним INSERT. Задача, ключ которой уже есть
+    среди ожидающих, пропускается (дедупликация).
+    """
+    if jobs:
+        Job.objects.bulk_create(jobs, ignore_conflicts=True)
+
+
+def retry_delay(attempts):
+    base = getattr(settings, 'PORTAL_JOB_RETRY_DELAY', 30)
+    delay = min(base * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+    return delay * (1 + random.random() / 2)
+
+
+def _ready(now):
+    # Задача, зависшая в работе дольше PORTAL_JOB_TIMEOUT (воркер упал), снова готова
+    timeout = timedelta(seconds=getattr(settings, 'PORTAL_JOB_TIMEOUT', 10 * 60))
+    return (
+        Q(status=Job.Status.PENDING, run_after__lte=now)
+        | Q(status=Job.Status.RUNNING, locked_at__lt=now - timeout)
+    )
+
+
+def claim(worker_id, limit):
+    """
+    Забирает до limit готовых задач вместе с остальными задачами их
+    пачек (даже если их время еще не наступило) и возвращает пачки:
+    [[задача, ...], ...].
+    """
+    token = f'{worker_id}:{uuid.uuid4().hex[:8]}'
+
+    def take():
+        now = timezone.now()
+        picked = list(
+            Job.objects.filter(_ready(now))
+            .order_by('run_after', 'id')
+            .values_list('id', 'batch_key')[:limit]
+        )
+        if not picked:
+            return 0
+        batch_keys = {batch_key for _, batch_key in picked if batch_key}
+        return Job.objects.filter(
+            Q(id__in=[job_id for job_id, _ in picked])
+            | Q(status=Job.Status.PENDING, batch_key__in=batch_keys)
+        ).filter(
+            Q(status=Job.Status.PENDING) | _ready(now)
+        ).update(
+            status=Job.Status.RUNNING,
+            locked_by=token,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+
+    if not run_write(take):
+        return []
+    batches = defaultdict(list)
+    for job in Job.objects.filter(locked_by=token).order_by('id'):
+        batches[job.kind, job.batch_key or f'job:{job.id}'].append(job)
+    return list(batches.values())
+
+
+def _fail(jobs, error):
+    """Возвращает задачи в очередь или, если попытки кончились, помечает ошибкой"""
+    max_attempts = getattr(settings, 'PORTAL_JOB_MAX_ATTEMPTS', 5)
+    now = timezone.now()
+    for job in jobs:
+        if job.attempts >= max_attempts:
+            Job.objects.filter(id=job.id).update(status=Job.Status.FAILED, last_error=error)
+            continue
+        try:
+            with transaction.atomic():
+                Job.objects.filter(id=job.id).update(
+                    status=Job.Status.PENDING,
+                    run_after=now + timedelta(seconds=retry_delay(job.attempts)),
+                    last_error=error,
+                )
+        except IntegrityError:
+            # Такая же задача уже снова в очереди — повтор не нужен
+            Job.objects.filter(id=job.id).delete()
+
+
+def execute(jobs):
+    """Выполняет пачку задач одного типа; вызывается в потоке воркера"""
+    kind = jobs[0].kind
+    ids = [job.id for job in jobs]
+    try:
+        handler = HANDLERS.get(kind)
+        if handler is None:
+            raise LookupError(f'Нет обработчика для задач "{kind}"')
+        handler([job.payload for job in jobs])
+    except Exception:
+        logger.exception('Ошибка задачи %s %s', kind, ids)
+        run_write(_fail, jobs, traceback.format_exc())
+        return False
+    else:
+        run_write(Job.objects.filter(id__in=ids).delete)
+        return True
+    finally:
+        close_old_connections()
+
+
+class Worker:
+    """
+    Цикл одного процесса: забирает пачки и выполняет их в пуле потоков.
+    Остановка (stop) дожидается выполняемых задач.
+    """
+
+    def __init__(self, threads=1, poll_interval=1.0):
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+        self.processed = 0
+        self.failed = 0
+
+    def stop(self):
+        self.stopping.set()
+
+    def run_once(self, executor):
+        batches = claim(self.worker_id, self.threads)
+        for ok in executor.map(execute, batches):
+            self.processed += 1
+            self.failed += not ok
+        return len(batches)
+
+    def run(self, once=False):
+        with ThreadPoolExecutor(self.threads, thread_name_prefix='portal-job') as executor:
+            while not self.stopping.is_set():
+                count = self.run_once(executor)
+                close_old_connections()
+                if once and not count:
+                    break
+                if not count:
+                    self.stopping.wait(self.poll_interval)
@@ -0,0 +1,54 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from portal.archive import archive_batch
+from portal.models import Application, ArchivedApplication
+
+
+class Command(BaseCommand):
+    help = 'Переносит давно завершенные заявки в архив пачками, не блокируя базу надолго'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, required=True, metavar='DAYS',
+                            help='Заявки, не менявшиеся столько дней после завершения')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--pause', type=float, default=0.05,
+                            help='Пауза между пачками, чтобы пропустить другие записи')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только посчитать заявки, ничего не переносить')
+
+    def handle(self, *args, **options):
+        if options['older_than'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--older-than и --batch-size должны быть положительными')
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+
+        if options['dry_run']:
+            count = Application.objects.filter(
+                status=Application.Status.COMPLETED, updated_at__lt=cutoff,
+            ).count()
+            self.stdout.write(f'К переносу в архив: {count}')
+            return
+
+        total = 0
+        while True:
+            ids = archive_batch(cutoff, options['batch_size'])
+            if not ids:
+                break
+            total += len(ids)
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Перенесено {total}')
+            time.sleep(options['pause'])
+        if total and connection.vendor == 'sqlite':
+            self.analyze()
+        self.stdout.write(self.style.SUCCESS(f'Перенесено в архив заявок: {total}'))
+
+    def analyze(self):
+        # После переноса в id рабочей таблицы дыры: свежая статистика нужна
+        # планировщику и оценке числа строк в админке (EstimatedCountPaginator)
+        with connection.cursor() as cursor:
+            for model in (Application, ArchivedApplication):
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
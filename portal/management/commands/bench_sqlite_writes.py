@@ -0,0 +1,88 @@
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from multiprocessing import Pool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+# Каждая транзакция сначала читает, потом пишет — как сохранение формы в Django.
+# В режиме DEFERRED такая транзакция получает SQLITE_BUSY при повышении
+# блокировки сразу, не дожидаясь busy_timeout.
+SCHEMA = 'CREATE TABLE IF NOT EXISTS bench (id INTEGER PRIMARY KEY, worker INTEGER, payload TEXT)'
+
+
+def _connect(path, mode):
+    conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+    if mode == 'production':
+        for pragma in settings.SQLITE_PRAGMAS.split(';'):
+            if pragma.strip():
+                conn.execute(pragma)
+    return conn
+
+
+def _worker(args):
+    path, mode, worker, writes = args
+    conn = _connect(path, mode)
+    begin = 'BEGIN IMMEDIATE' if mode == 'production' else 'BEGIN'
+    retries = settings.SQLITE_WRITE_RETRIES if mode == 'production' else 1
+    errors = 0
+    latencies = []
+    for _ in range(writes):
+        started = time.perf_counter()
+        for attempt in range(1, retries + 1):
+            try:
+                conn.execute(begin)
+                conn.execute('SELECT COUNT(*) FROM bench WHERE worker = ?', (worker,)).fetchone()
+                conn.execute('INSERT INTO bench (worker, payload) VALUES (?, ?)', (worker, 'x' * 200))
+                conn.execute('COMMIT')
+                break
+            except sqlite3.OperationalError:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                if attempt == retries:
+                    errors += 1
+                else:
+                    time.sleep(settings.SQLITE_WRITE_RETRY_DELAY * 2 ** (attempt - 1))
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+    return errors, latencies
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест конкурентной записи в SQLite: обычный режим против рабочего'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--writes', type=int, default=200, help='Записей на процесс')
+
+    def handle(self, *args, **options):
+        for mode in ('default', 'production'):
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'bench.sqlite3')
+                conn = _connect(path, mode)
+                conn.execute(SCHEMA)
+                conn.close()
+
+                started = time.perf_counter()
+                with Pool(options['workers']) as pool:
+                    results = pool.map(_worker, [
+                        (path, mode, worker, options['writes'])
+                        for worker in range(options['workers'])
+                    ])
+                elapsed = time.perf_counter() - started
+
+            errors = sum(result[0] for result in results)
+            latencies = sorted(lat for result in results for lat in result[1])
+            total = len(latencies)
+            p99 = latencies[min(total - 1, int(total * 0.99))]
+            self.stdout.write(
+                f'{mode:<10} записей: {total - errors}/{total}, '
+                f'ошибок "database is locked": {errors}, '
+                f'{(total - errors) / elapsed:.0f} записей/с, '
+                f'p50 {statistics.median(latencies) * 1000:.1f} мс, '
+                f'p99 {p99 * 1000:.1f} мс'
+            )
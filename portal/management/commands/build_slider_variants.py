@@ -0,0 +1,93 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portal.slider import (
+    IMAGE_EXTENSIONS,
+    MANIFEST_NAME,
+    VARIANT_WIDTHS,
+    VARIANTS_DIR,
+    slider_dir,
+    slider_manifest,
+)
+
+
+class Command(BaseCommand):
+    help = 'Готовит уменьшенные копии изображений слайдера (WebP + JPEG) и manifest.json'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--widths', type=int, nargs='+', default=list(VARIANT_WIDTHS),
+            help='Ширины копий в пикселях',
+        )
+        parser.add_argument('--quality', type=int, default=80, help='Качество сжатия')
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать копии, даже если они новее оригинала',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            from PIL import Image
+        except ImportError:
+            raise CommandError('Для подготовки изображений нужен Pillow: pip install Pillow')
+
+        source_dir = slider_dir()
+        if not os.path.isdir(source_dir):
+            raise CommandError(f'Папка {source_dir} не найдена')
+        target_dir = os.path.join(source_dir, VARIANTS_DIR)
+        os.makedirs(target_dir, exist_ok=True)
+
+        widths = sorted(set(options['widths']))
+        images = {}
+        for filename in sorted(os.listdir(source_dir)):
+            if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            source = os.path.join(source_dir, filename)
+            stem = os.path.splitext(filename)[0]
+            with Image.open(source) as original:
+                original.load()
+                width, height = original.size
+                rgb = original.convert('RGB')
+
+            variants = []
+            # Не увеличиваем изображение; самая большая копия — в размер оригинала
+            for target_width in [w for w in widths if w < width] + [width]:
+                target_height = round(height * target_width / width)
+                webp_name = f'{stem}-{target_width}.webp'
+                jpeg_name = f'{stem}-{target_width}.jpg'
+                webp_path = os.path.join(target_dir, webp_name)
+                jpeg_path = os.path.join(target_dir, jpeg_name)
+                if options['force'] or self._stale(source, webp_path, jpeg_path):
+                    resized = rgb.resize((target_width, target_height), Image.LANCZOS)
+                    resized.save(webp_path, 'WEBP', quality=options['quality'], method=6)
+                    resized.save(jpeg_path, 'JPEG', quality=options['quality'],
+                                 optimize=True, progressive=True)
+                variants.append({
+                    'width': target_width,
+                    'height': target_height,
+                    'webp': f'slider/{VARIANTS_DIR}/{webp_name}',
+                    'jpeg': f'slider/{VARIANTS_DIR}/{jpeg_name}',
+                })
+
+            images[filename] = {'width': width, 'height': height, 'variants': variants}
+            self.stdout.write(f'{filename}: {len(variants)} копий')
+
+        # Запись через rename меняет mtime папки — кэш слайдера пересоберется
+        manifest = os.path.join(source_dir, MANIFEST_NAME)
+        tmp = manifest + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            json.dump({'images': images}, fh, ensure_ascii=False, indent=2)
+        os.replace(tmp, manifest)
+        slider_manifest.clear()
+
+        self.stdout.write(self.style.SUCCESS(f'Готово: {len(images)} изображений'))
+
+    @staticmethod
+    def _stale(source, *targets):
+        source_mtime = os.path.getmtime(source)
+        return any(
+            not os.path.exists(target) or os.path.getmtime(target) < source_mtime
+            for target in targets
+        )
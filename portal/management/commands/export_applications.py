@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from portal.export import EXPORT_FORMATS, iter_csv, write_xlsx
+from portal.forms import ApplicationFilterForm
+from portal.models import Application, UnifiedApplication
+
+
+class Command(BaseCommand):
+    help = 'Выгружает заявки в CSV или XLSX с теми же фильтрами, что и панель администратора'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--output', '-o', help='Файл для записи (по умолчанию stdout, только CSV)')
+        parser.add_argument('--status', choices=Application.Status.values)
+        parser.add_argument('--course', type=int, help='id курса')
+        parser.add_argument('--date-from', help='Дата создания с (YYYY-MM-DD)')
+        parser.add_argument('--date-to', help='Дата создания по (YYYY-MM-DD)')
+        parser.add_argument('--include-archived', action='store_true',
+                            help='Вместе с заявками из архива (archive_applications)')
+
+    def handle(self, *args, **options):
+        filter_form = ApplicationFilterForm({
+            'status': options['status'] or '',
+            'course': options['course'] or '',
+            'date_from': options['date_from'] or '',
+            'date_to': options['date_to'] or '',
+        })
+        if not filter_form.is_valid():
+            raise CommandError(filter_form.errors.as_text())
+        model = UnifiedApplication if options['include_archived'] else Application
+        applications = filter_form.filter(model.objects.all())
+
+        if options['format'] == 'xlsx':
+            if not options['output']:
+                raise CommandError('Для XLSX укажите файл через --output')
+            try:
+                with open(options['output'], 'wb') as fh:
+                    write_xlsx(applications, fh)
+            except ImportError:
+                raise CommandError('Для выгрузки в XLSX нужен пакет openpyxl')
+            return
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as fh:
+                for chunk in iter_csv(applications):
+                    fh.write(chunk)
+        else:
+            for chunk in iter_csv(applications):
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,220 @@
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from portal import availability
+from portal.availability import normalize
+from portal.catalog import get_catalog
+from portal.models import ROLLUP_FIELDS, Application, CustomUser
+from portal.stats import record_rows_created
+
+
+USER_FIELDS = ('username', 'full_name', 'phone', 'email')
+
+
+def _init_worker():
+    # При запуске через spawn настройки Django нужно поднять заново
+    django.setup()
+
+
+def read_rows(path):
+    """
+    Построчно читает CSV или JSON Lines (один объект на строку).
+
+    Возвращает пары (номер строки, словарь); файл целиком в память не грузится.
+    """
+    with open(path, encoding='utf-8-sig', newline='') as fh:
+        if path.endswith(('.jsonl', '.ndjson', '.json')):
+            for line_no, line in enumerate(fh, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError as exc:
+                    yield line_no, exc
+        else:
+            # Первая строка CSV — заголовок
+            for line_no, row in enumerate(csv.DictReader(fh), start=2):
+                yield line_no, row
+
+
+class Command(BaseCommand):
+    help = (
+        'Массовый импорт пользователей и заявок из CSV/JSON Lines. '
+        'Колонки: username, full_name, phone, email, password, course, '
+        'desired_start_date, payment_method'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл .csv или .jsonl')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Процессов для хеширования паролей')
+        parser.add_argument('--checkpoint', help='Файл контрольной точки (по умолчанию <path>.checkpoint)')
+        parser.add_argument('--restart', action='store_true', help='Игнорировать контрольную точку')
+        parser.add_argument('--errors', help='CSV-отчет об ошибках (по умолчанию <path>.errors.csv)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'Файл {path} не найден')
+
+        self.checkpoint_path = options['checkpoint'] or f'{path}.checkpoint'
+        start_after = 0
+        if not options['restart'] and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding='utf-8') as fh:
+                start_after = json.load(fh)['line']
+            self.stdout.write(f'Продолжаем после строки {start_after}')
+
+        self.catalog = get_catalog()
+        self.course_by_title = {course['title']: course['id'] for course in self.catalog.courses}
+        self.field_map = {name: CustomUser._meta.get_field(name) for name in USER_FIELDS}
+        self.app_fields = {
+            name: Application._meta.get_field(name)
+            for name in ('desired_start_date', 'payment_method')
+        }
+
+        errors_path = options['errors'] or f'{path}.errors.csv'
+        created = failed = 0
+        rows = ((line_no, row) for line_no, row in read_rows(path) if line_no > start_after)
+
+        with open(errors_path, 'a', encoding='utf-8', newline='') as errors_fh, \
+                ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as pool:
+            errors = csv.writer(errors_fh)
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                valid, batch_errors = self.validate_batch(batch)
+                passwords = list(pool.map(
+                    make_password,
+                    [row['password'] for _, row in valid],
+                    chunksize=max(1, len(valid) // (options['workers'] * 4)),
+                ))
+                created += self.write_batch(valid, passwords)
+                for line_no, message in batch_errors:
+                    errors.writerow([line_no, message])
+                errors_fh.flush()
+                failed += len(batch_errors)
+                self.save_checkpoint(batch[-1][0])
+                self.stdout.write(f'Строка {batch[-1][0]}: создано {created}, ошибок {failed}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Импорт завершен: создано {created}, ошибок {failed} (см. {errors_path})'
+        ))
+
+    def validate_batch(self, batch):
+        """Проверка строк валидаторами моделей и на дубликаты — без записи в базу"""
+        valid, errors = [], []
+        parsed = []
+        for line_no, row in batch:
+            if isinstance(row, Exception):
+                errors.append((line_no, f'Некорректный JSON: {row}'))
+                continue
+            try:
+                parsed.append((line_no, self.clean_row(row)))
+            except ValidationError as exc:
+                errors.append((line_no, '; '.join(exc.messages)))
+
+        # Логин и email заняты без учета регистра — как при регистрации
+        taken_usernames = self.taken('username', [row['username'] for _, row in parsed])
+        taken_emails = self.taken('email', [row['email'] for _, row in parsed])
+        for line_no, row in parsed:
+            username, email = normalize(row['username']), normalize(row['email'])
+            if username in taken_usernames:
+                errors.append((line_no, f'Логин {row["username"]} уже занят'))
+            elif email in taken_emails:
+                errors.append((line_no, f'Email {row["email"]} уже занят'))
+            else:
+                taken_usernames.add(username)
+                taken_emails.add(email)
+                valid.append((line_no, row))
+        return valid, errors
+
+    def taken(self, field, values):
+        """Нормализованные значения field из values, уже занятые в базе"""
+        return set(
+            CustomUser.objects.annotate(normalized=Lower(field))
+            .filter(normalized__in={normalize(value) for value in values})
+            .values_list('normalized', flat=True)
+        )
+
+    def clean_row(self, row):
+        cleaned = {}
+        messages = []
+        for name, field in self.field_map.items():
+            try:
+                cleaned[name] = field.clean(str(row.get(name) or '').strip(), None)
+            except ValidationError as exc:
+                messages.extend(f'{name}: {message}' for message in exc.messages)
+
+        password = row.get('password') or ''
+        if len(password) < 8:
+            messages.append('password: минимум 8 символов')
+        cleaned['password'] = password
+
+        course = str(row.get('course') or '').strip()
+        course_id = int(course) if course.isdigit() else self.course_by_title.get(course)
+        if course_id is None or self.catalog.get_active(course_id) is None:
+            messages.append(f'course: курс {course!r} не найден или неактивен')
+        cleaned['course_id'] = course_id
+
+        for name, field in self.app_fields.items():
+            try:
+                cleaned[name] = field.clean(str(row.get(name) or '').strip(), None)
+            except ValidationError as exc:
+                messages.extend(f'{name}: {message}' for message in exc.messages)
+
+        if messages:
+            raise ValidationError(messages)
+        return cleaned
+
+    def write_batch(self, valid, passwords):
+        if not valid:
+            return 0
+        with transaction.atomic():
+            users = [
+                CustomUser(password=password, **{name: row[name] for name in USER_FIELDS})
+                for (_, row), password in zip(valid, passwords)
+            ]
+            CustomUser.objects.bulk_create(users, batch_size=len(users))
+            user_ids = dict(
+                CustomUser.objects.filter(
+                    username__in=[user.username for user in users]
+                ).values_list('username', 'id')
+            )
+            applications = Application.objects.bulk_create([
+                Application(
+                    user_id=user_ids[row['username']],
+                    course_id=row['course_id'],
+                    desired_start_date=row['desired_start_date'],
+                    payment_method=row['payment_method'],
+                )
+                for _, row in valid
+            ], batch_size=len(valid))
+            # bulk_create не отправляет post_save — счетчики обновляем сами
+            record_rows_created([
+                {field: getattr(app, field) for field in ROLLUP_FIELDS if field != 'id'}
+                for app in applications
+            ])
+        # По той же причине индекс занятых логинов пополняем сами
+        for user in users:
+            availability.index.add('username', user.username)
+            availability.index.add('email', user.email)
+        return len(valid)
+
+    def save_checkpoint(self, line_no):
+        tmp = f'{self.checkpoint_path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            json.dump({'line': line_no}, fh)
+        os.replace(tmp, self.checkpoint_path)
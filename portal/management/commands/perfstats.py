@@ -0,0 +1,52 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from portal.profiling import load_hashing_stats, load_samples, summarize
+
+
+class Command(BaseCommand):
+    help = 'Перцентили времени ответа по именам URL (данные ProfilingMiddleware)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=settings.PORTAL_PROFILING_DIR,
+                            help='Каталог с выборками воркеров')
+        parser.add_argument('--reset', action='store_true',
+                            help='Удалить накопленные выборки')
+
+    def handle(self, *args, **options):
+        directory = options['dir']
+        if options['reset']:
+            removed = 0
+            if os.path.isdir(directory):
+                for filename in os.listdir(directory):
+                    if filename.startswith('perf-'):
+                        os.remove(os.path.join(directory, filename))
+                        removed += 1
+            self.stdout.write(self.style.SUCCESS(f'Удалено файлов: {removed}'))
+            return
+
+        summary = summarize(load_samples(directory))
+        hashing = load_hashing_stats(directory)
+        if not summary and not hashing:
+            self.stdout.write('Данных нет: включите PORTAL_PROFILING и дайте поработать серверу')
+            return
+
+        if summary:
+            self.stdout.write(
+                f'{"URL":<32}{"запросов":>9}{"p50, мс":>10}{"p90, мс":>10}'
+                f'{"p99, мс":>10}{"max, мс":>10}{"SQL/запр":>10}{"SQL, мс":>9}'
+            )
+        for row in summary:
+            self.stdout.write(
+                f'{row["name"]:<32}{row["count"]:>9}{row["p50"]:>10.1f}{row["p90"]:>10.1f}'
+                f'{row["p99"]:>10.1f}{row["max"]:>10.1f}{row["queries"]:>10.1f}{row["sql_ms"]:>9.1f}'
+            )
+        if hashing:
+            self.stdout.write(
+                f'\nХеширование паролей ({hashing["processes"]} процессов, '
+                f'{hashing["workers"]} потоков): в очереди {hashing["queued"]}, '
+                f'в работе и в очереди {hashing["pending"]}, пик {hashing["peak_pending"]}, '
+                f'выполнено {hashing["completed"]}, отклонено {hashing["rejected"]}'
+            )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from portal import search
+
+
+class Command(BaseCommand):
+    help = 'Пересоздает полнотекстовый индекс (FTS5) пользователей, курсов и отзывов'
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError('Полнотекстовый индекс поддерживается только для SQLite')
+        with transaction.atomic(), connection.cursor() as cursor:
+            search.rebuild(cursor)
+            cursor.execute('SELECT COUNT(*) FROM portal_search')
+            total = cursor.fetchone()[0]
+        self.stdout.write(self.style.SUCCESS(f'Индекс пересоздан: {total} записей'))
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+from portal.models import ApplicationStat, UnifiedApplication
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает таблицу статистики заявок или сверяет ее с фактическими данными'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Только сверить счетчики, ничего не меняя')
+
+    def handle(self, *args, **options):
+        # Архивные заявки тоже входят в статистику
+        actual = {
+            (row['course_id'], row['status'], row['day'], row['payment_method']): row['total']
+            for row in UnifiedApplication.objects.order_by()
+            .annotate(day=TruncDate('created_at'))
+            .values('course_id', 'status', 'day', 'payment_method')
+            .annotate(total=Count('id'))
+        }
+        stored = {
+            (row['course_id'], row['status'], row['day'], row['payment_method']): row['count']
+            for row in ApplicationStat.objects.filter(count__gt=0)
+            .values('course_id', 'status', 'day', 'payment_method', 'count')
+        }
+
+        mismatches = [
+            (key, stored.get(key, 0), actual.get(key, 0))
+            for key in sorted(set(actual) | set(stored), key=str)
+            if stored.get(key, 0) != actual.get(key, 0)
+        ]
+
+        if options['check']:
+            for (course_id, status, day, payment_method), got, expected in mismatches[:50]:
+                self.stdout.write(
+                    f'{day} курс {course_id} {status}/{payment_method}: '
+                    f'в таблице {got}, фактически {expected}'
+                )
+            if mismatches:
+                raise CommandError(f'Расхождений: {len(mismatches)}')
+            self.stdout.write(self.style.SUCCESS('Статистика совпадает с данными'))
+            return
+
+        with transaction.atomic():
+            ApplicationStat.objects.all().delete()
+            ApplicationStat.objects.bulk_create([
+                ApplicationStat(
+                    course_id=course_id, status=status, day=day,
+                    payment_method=payment_method, count=total,
+                )
+                for (course_id, status, day, payment_method), total in actual.items()
+            ], batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(
+            f'Статистика пересчитана: {len(actual)} строк, исправлено расхождений: {len(mismatches)}'
+        ))
@@ -0,0 +1,81 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from portal import bench
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержки (p50/p90/p99) и пропускную способность страниц портала, '
+        'сохраняет результат в JSON и сравнивает с эталонным прогоном'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Куда сохранить результаты (JSON)')
+        parser.add_argument('--compare', metavar='BASELINE', help='Эталонный JSON для сравнения')
+        parser.add_argument('--input', help='Не запускать замеры, а сравнить готовый JSON с эталоном')
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            help='Только указанные сценарии (можно несколько раз)')
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на сценарий')
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--concurrency', type=int, default=1, help='Параллельных потоков')
+        parser.add_argument('--threshold', type=float, default=0.15,
+                            help='Допустимое ухудшение, доля (0.15 = 15%%)')
+        parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                            help='Меньшие изменения задержки считаются шумом')
+
+    def handle(self, *args, **options):
+        if options['input']:
+            if not options['compare']:
+                raise CommandError('--input используется вместе с --compare')
+            result = bench.load(options['input'])
+        else:
+            for name in bench.uncovered_urls():
+                self.stderr.write(f'Нет сценария для URL {name}')
+            self.stdout.write(f'Данные: {bench.dataset_info()}')
+            result = bench.run(
+                names=options['scenarios'],
+                requests=options['requests'],
+                warmup=options['warmup'],
+                concurrency=options['concurrency'],
+                progress=self.report,
+            )
+            if options['output']:
+                bench.save(result, options['output'])
+                self.stdout.write(self.style.SUCCESS(f'Результаты сохранены в {options["output"]}'))
+
+        if options['compare']:
+            self.compare(bench.load(options['compare']), result, options)
+
+    def report(self, name, result):
+        if 'skipped' in result:
+            self.stdout.write(f'{name:<26} пропущен: {result["skipped"]}')
+            return
+        line = (
+            f'{name:<26} HTTP {result["status"]}  SQL {result["queries"]:>3}  '
+            f'p50 {result["p50_ms"]:7.1f}  p90 {result["p90_ms"]:7.1f}  '
+            f'p99 {result["p99_ms"]:7.1f} мс  {result["rps"]:7.0f} запр/с'
+        )
+        if result['errors']:
+            line += f'  ошибок {result["errors"]}'
+        self.stdout.write(line)
+
+    def compare(self, baseline, current, options):
+        rows = bench.compare(baseline, current, options['threshold'], options['min_delta_ms'])
+        regressions = 0
+        for row in rows:
+            base, cur = row['baseline'], row['current']
+            change = (cur['p50_ms'] / base['p50_ms'] - 1) * 100 if base['p50_ms'] else 0
+            line = f'{row["name"]:<26} p50 {base["p50_ms"]:7.1f} → {cur["p50_ms"]:7.1f} мс ({change:+.0f}%)'
+            if row['regressions']:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(f'{line}  РЕГРЕССИЯ: {", ".join(row["regressions"])}'))
+            else:
+                self.stdout.write(line)
+        if baseline['meta'].get('dataset') != current['meta'].get('dataset'):
+            self.stderr.write(
+                f'Внимание: наборы данных различаются: {baseline["meta"].get("dataset")} '
+                f'и {current["meta"].get("dataset")}'
+            )
+        if regressions:
+            raise CommandError(f'Регрессий: {regressions}')
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
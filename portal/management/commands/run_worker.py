@@ -0,0 +1,64 @@
+import signal
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from portal.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди в базе (письма о заявках)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1,
+                            help='Число процессов-воркеров')
+        parser.add_argument('--threads', type=int, default=4,
+                            help='Потоков в каждом процессе')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Пауза (с) между проверками пустой очереди')
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить готовые задачи и выйти')
+
+    def handle(self, *args, **options):
+        if options['processes'] > 1 and not options['once']:
+            return self.supervise(options)
+
+        worker = Worker(options['threads'], options['poll_interval'])
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: worker.stop())
+        worker.run(once=options['once'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено пачек задач: {worker.processed}, с ошибкой: {worker.failed}'
+        ))
+
+    def supervise(self, options):
+        """Запускает дочерние воркеры и перезапускает упавшие"""
+        command = [
+            sys.executable, sys.argv[0], 'run_worker',
+            '--processes', '1',
+            '--threads', str(options['threads']),
+            '--poll-interval', str(options['poll_interval']),
+        ]
+        children = [subprocess.Popen(command) for _ in range(options['processes'])]
+        stopping = False
+
+        def stop(*args):
+            nonlocal stopping
+            stopping = True
+            for child in children:
+                child.terminate()
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, stop)
+        self.stdout.write(f'Запущено воркеров: {len(children)}')
+
+        while not stopping:
+            for index, child in enumerate(children):
+                if child.poll() is not None and not stopping:
+                    self.stderr.write(f'Воркер {child.pid} завершился с кодом {child.returncode}, перезапуск')
+                    children[index] = subprocess.Popen(command)
+            time.sleep(1)
+        for child in children:
+            child.wait()
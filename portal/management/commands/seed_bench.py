@@ -0,0 +1,219 @@
+import random
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.admin.models import LogEntry
+from django.contrib.auth.hashers import make_password
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from portal.catalog import bump_catalog_version
+from portal.models import Application, ApplicationStat, ArchivedApplication, Course, CustomUser
+
+
+# Готовые размеры набора: пользователи, заявки, курсы
+SCALES = {
+    'small': (1_000, 10_000, 20),
+    'medium': (10_000, 100_000, 50),
+    'large': (100_000, 1_000_000, 200),
+}
+
+BENCH_PASSWORD = 'bench-password'
+BENCH_ADMIN = 'bench_admin'
+
+LAST_NAMES = [
+    'Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров', 'Соколов',
+    'Михайлов', 'Новиков', 'Федоров', 'Морозов', 'Волков', 'Алексеев', 'Лебедев',
+    'Семенов', 'Егоров', 'Павлов', 'Козлов', 'Степанов', 'Николаев',
+]
+FIRST_NAMES = [
+    'Александр', 'Дмитрий', 'Максим', 'Сергей', 'Андрей', 'Алексей', 'Артем',
+    'Илья', 'Кирилл', 'Михаил', 'Анна', 'Мария', 'Елена', 'Ольга', 'Наталья',
+    'Ирина', 'Татьяна', 'Светлана', 'Юлия', 'Екатерина',
+]
+MIDDLE_NAMES = [
+    'Александрович', 'Дмитриевич', 'Сергеевич', 'Андреевич', 'Алексеевич',
+    'Ивановна', 'Петровна', 'Сергеевна', 'Николаевна', 'Михайловна',
+]
+COURSE_TOPICS = [
+    'Python', 'Django', 'JavaScript', 'SQL', 'Бухгалтерский учет', '1С',
+    'Охрана труда', 'Английский язык', 'Графический дизайн', 'Excel',
+    'Управление проектами', 'Маркетинг', 'Педагогика', 'Электробезопасность',
+    'Сетевое администрирование', 'Кадровое делопроизводство',
+]
+COURSE_LEVELS = ['для начинающих', 'базовый', 'продвинутый', 'интенсив', 'повышение квалификации']
+FEEDBACK = [
+    'Отличный курс, всем рекомендую',
+    'Преподаватель объясняет понятно, много практики',
+    'Материал полезный, но хотелось бы больше заданий',
+    'Удобное расписание, спасибо организаторам',
+    'Курс слишком быстрый для начинающих',
+]
+
+# Доли статусов в зависимости от возраста заявки (дней): новые заявки
+# в основном в статусе «Новая», старые — «Обучение завершено»
+STATUS_BY_AGE = [
+    (14, [(Application.Status.NEW, 0.8), (Application.Status.IN_PROGRESS, 0.2)]),
+    (90, [(Application.Status.NEW, 0.2), (Application.Status.IN_PROGRESS, 0.6),
+          (Application.Status.COMPLETED, 0.2)]),
+    (None, [(Application.Status.NEW, 0.05), (Application.Status.IN_PROGRESS, 0.15),
+            (Application.Status.COMPLETED, 0.8)]),
+]
+
+
+def insert_rows(cursor, model, fields, rows):
+    """Многострочная вставка без ORM: auto_now_add и сигналы не срабатывают"""
+    model_fields = [model._meta.get_field(name) for name in fields]
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        connection.ops.quote_name(model._meta.db_table),
+        ', '.join(connection.ops.quote_name(field.column) for field in model_fields),
+        ', '.join(['%s'] * len(model_fields)),
+    )
+    cursor.executemany(sql, [
+        [field.get_db_prep_save(value, connection) for field, value in zip(model_fields, row)]
+        for row in rows
+    ])
+
+
+def pick_status(rng, age_days):
+    for max_age, weights in STATUS_BY_AGE:
+        if max_age is None or age_days <= max_age:
+            statuses, probabilities = zip(*weights)
+            return rng.choices(statuses, probabilities)[0]
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими данными для нагрузочных тестов. '
+        'Запускать на отдельной базе: KOROCHKI_DB_PATH=var/bench.sqlite3'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=SCALES, default='small')
+        parser.add_argument('--users', type=int, help='Число пользователей (вместо --scale)')
+        parser.add_argument('--applications', type=int, help='Число заявок')
+        parser.add_argument('--courses', type=int, help='Число курсов')
+        parser.add_argument('--days', type=int, default=730, help='Период дат создания заявок')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42, help='Начальное значение генератора')
+        parser.add_argument('--force', action='store_true',
+                            help='Разрешить запуск на основной базе проекта')
+
+    def handle(self, *args, **options):
+        db_path = Path(settings.DATABASES['default']['NAME']).resolve()
+        if db_path == (Path(settings.BASE_DIR) / 'db.sqlite3').resolve() and not options['force']:
+            raise CommandError(
+                'seed_bench удаляет все заявки, курсы и пользователей. '
+                'Укажите отдельную базу через KOROCHKI_DB_PATH или добавьте --force'
+            )
+
+        users, applications, courses = SCALES[options['scale']]
+        users = options['users'] or users
+        applications = options['applications'] or applications
+        courses = options['courses'] or courses
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            self.clear()
+            course_ids = self.create_courses(courses)
+            user_ids = self.create_users(users)
+            self.create_applications(applications, user_ids, course_ids, options['days'])
+        self.stdout.write('Пересчет статистики...')
+        call_command('rebuild_stats', stdout=self.stdout)
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - started:.1f} с: пользователей {users}, '
+            f'заявок {applications}, курсов {courses}. '
+            f'Администратор {BENCH_ADMIN} / {BENCH_PASSWORD}'
+        ))
+
+    def clear(self):
+        # Прямые DELETE: через ORM удаление миллиона заявок грузит их все в память
+        models = [
+            Application, ArchivedApplication, ApplicationStat, Course, LogEntry, Session,
+            CustomUser.groups.through, CustomUser.user_permissions.through, CustomUser,
+        ]
+        with connection.cursor() as cursor:
+            for model in models:
+                cursor.execute(f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)}')
+
+    def create_courses(self, count):
+        rows = []
+        for i in range(1, count + 1):
+            topic = self.rng.choice(COURSE_TOPICS)
+            level = self.rng.choice(COURSE_LEVELS)
+            rows.append((
+                f'{topic} ({level}) №{i}',
+                f'Программа курса «{topic}», уровень: {level}. ' * 3,
+                self.rng.random() < 0.9,
+            ))
+        with connection.cursor() as cursor:
+            insert_rows(cursor, Course, ('title', 'description', 'is_active'), rows)
+        return list(Course.objects.values_list('id', flat=True))
+
+    def create_users(self, count):
+        password = make_password(BENCH_PASSWORD)
+        now = timezone.now()
+        fields = (
+            'password', 'is_superuser', 'username', 'first_name', 'last_name', 'email',
+            'is_staff', 'is_active', 'date_joined', 'full_name', 'phone',
+        )
+        with connection.cursor() as cursor:
+            insert_rows(cursor, CustomUser, fields, [(
+                password, True, BENCH_ADMIN, '', '', 'admin@bench.local',
+                True, True, now, 'Администратор', '89990000000',
+            )])
+            for start in range(0, count, self.batch_size):
+                rows = []
+                for i in range(start, min(start + self.batch_size, count)):
+                    full_name = ' '.join((
+                        self.rng.choice(LAST_NAMES), self.rng.choice(FIRST_NAMES),
+                        self.rng.choice(MIDDLE_NAMES),
+                    ))
+                    rows.append((
+                        password, False, f'user{i:07d}', '', '', f'user{i:07d}@bench.local',
+                        False, True, now - timedelta(days=self.rng.randint(0, 1000)),
+                        full_name, f'8{self.rng.randint(9000000000, 9999999999)}',
+                    ))
+                insert_rows(cursor, CustomUser, fields, rows)
+                self.stdout.write(f'Пользователи: {min(start + self.batch_size, count)}/{count}')
+        return list(CustomUser.objects.filter(is_superuser=False).values_list('id', flat=True))
+
+    def create_applications(self, count, user_ids, course_ids, days):
+        if not user_ids or not course_ids:
+            raise CommandError('Нужен хотя бы один пользователь и один курс')
+        now = timezone.now()
+        fields = (
+            'user', 'course', 'desired_start_date', 'payment_method',
+            'status', 'created_at', 'updated_at', 'feedback',
+        )
+        # Популярность курсов неравномерная (закон Ципфа)
+        course_weights = [1 / rank for rank in range(1, len(course_ids) + 1)]
+        with connection.cursor() as cursor:
+            for start in range(0, count, self.batch_size):
+                size = min(self.batch_size, count - start)
+                rows = []
+                for course_id in self.rng.choices(course_ids, course_weights, k=size):
+                    # Свежих заявок больше, чем старых
+                    age = min(days, int(self.rng.expovariate(3 / days) if days else 0))
+                    created_at = now - timedelta(days=age, seconds=self.rng.randint(0, 86399))
+                    status = pick_status(self.rng, age)
+                    feedback = None
+                    if status == Application.Status.COMPLETED and self.rng.random() < 0.3:
+                        feedback = self.rng.choice(FEEDBACK)
+                    rows.append((
+                        self.rng.choice(user_ids), course_id,
+                        (created_at + timedelta(days=self.rng.randint(7, 60))).date(),
+                        Application.PaymentMethod.CASH if self.rng.random() < 0.7
+                        else Application.PaymentMethod.PHONE,
+                        status, created_at, created_at, feedback,
+                    ))
+                insert_rows(cursor, Application, fields, rows)
+                self.stdout.write(f'Заявки: {start + size}/{count}')
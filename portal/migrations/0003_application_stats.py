@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-17 12:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0002_application_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('new', 'Новая'), ('in_progress', 'Идет обучение'), ('completed', 'Обучение завершено')], max_length=15, verbose_name='Статус')),
+                ('day', models.DateField(verbose_name='День')),
+                ('payment_method', models.CharField(choices=[('cash', 'Наличными'), ('phone', 'Перевод по номеру телефона')], max_length=10, verbose_name='Способ оплаты')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='portal.course', verbose_name='Курс')),
+            ],
+            options={
+                'verbose_name': 'Статистика заявок',
+                'verbose_name_plural': 'Статистика заявок',
+                'indexes': [models.Index(fields=['day'], name='application_stat_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('course', 'status', 'day', 'payment_method'), name='application_stat_unique')],
+            },
+        ),
+    ]
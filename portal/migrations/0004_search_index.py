@@ -0,0 +1,98 @@
+# Generated by Django 6.0 on 2026-10-17 14:20
+
+from django.db import migrations
+
+
+# SQL на момент этой миграции. Модуль portal.search не импортируется:
+# его дальнейшие изменения не должны менять уже примененную миграцию.
+# Актуальные триггеры ставит post_migrate (portal.apps.install_search_index).
+CREATE_TABLE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS portal_search USING fts5("
+    "title, body, tokenize='unicode61 remove_diacritics 2')"
+)
+
+TRIGGERS_SQL = [
+    """CREATE TRIGGER IF NOT EXISTS portal_search_user_ai AFTER INSERT ON portal_customuser BEGIN
+        INSERT INTO portal_search(rowid, title, body) VALUES (new.id * 4, new.full_name || ' ' || new.username, new.email || ' ' || new.phone || ' ' || replace(replace(replace(replace(replace(new.phone, '(', ''), ')', ''), '-', ''), ' ', ''), '+', ''));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS portal_search_user_au
+    AFTER UPDATE OF username, full_name, email, phone ON portal_customuser BEGIN
+        DELETE FROM portal_search WHERE rowid = old.id * 4;
+        INSERT INTO portal_search(rowid, title, body) VALUES (new.id * 4, new.full_name || ' ' || new.username, new.email || ' ' || new.phone || ' ' || replace(replace(replace(replace(replace(new.phone, '(', ''), ')', ''), '-', ''), ' ', ''), '+', ''));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS portal_search_user_ad AFTER DELETE ON portal_customuser BEGIN
+        DELETE FROM portal_search WHERE rowid = old.id * 4;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS portal_search_course_ai AFTER INSERT ON portal_course BEGIN
+        INSERT INTO portal_search(rowid, title, body) VALUES (new.id * 4 + 1, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS portal_search_course_au
+    AFTER UPDATE OF title, description ON portal_course BEGIN
+        DELETE FROM portal_search WHERE rowid = old.id * 4 + 1;
+        INSERT INTO portal_search(rowid, title, body) VALUES (new.id * 4 + 1, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS portal_search_course_ad AFTER DELETE ON portal_course BEGIN
+        DELETE FROM portal_search WHERE rowid = old.id * 4 + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS portal_search_application_ai AFTER INSERT ON portal_application
+    WHEN coalesce(new.feedback, '') <> '' BEGIN
+        INSERT INTO portal_search(rowid, title, body) VALUES (new.id * 4 + 2, '', new.feedback);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS portal_search_application_au
+    AFTER UPDATE OF feedback ON portal_application BEGIN
+        DELETE FROM portal_search WHERE rowid = old.id * 4 + 2;
+        INSERT INTO portal_search(rowid, title, body)
+            SELECT new.id * 4 + 2, '', new.feedback WHERE coalesce(new.feedback, '') <> '';
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS portal_search_application_ad AFTER DELETE ON portal_application BEGIN
+        DELETE FROM portal_search WHERE rowid = old.id * 4 + 2;
+    END""",
+]
+
+REBUILD_SQL = [
+    'DELETE FROM portal_search',
+    "INSERT INTO portal_search(rowid, title, body) SELECT id * 4, full_name || ' ' || username, email || ' ' || phone || ' ' || replace(replace(replace(replace(replace(phone, '(', ''), ')', ''), '-', ''), ' ', ''), '+', '') FROM portal_customuser",
+    'INSERT INTO portal_search(rowid, title, body) SELECT id * 4 + 1, title, description FROM portal_course',
+    "INSERT INTO portal_search(rowid, title, body) SELECT id * 4 + 2, '', feedback FROM portal_application WHERE coalesce(feedback, '') <> ''",
+]
+
+TRIGGER_NAMES = [
+    'portal_search_user_ai',
+    'portal_search_user_au',
+    'portal_search_user_ad',
+    'portal_search_course_ai',
+    'portal_search_course_au',
+    'portal_search_course_ad',
+    'portal_search_application_ai',
+    'portal_search_application_au',
+    'portal_search_application_ad',
+]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(CREATE_TABLE_SQL)
+        for sql in TRIGGERS_SQL + REBUILD_SQL:
+            cursor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for name in TRIGGER_NAMES:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute('DROP TABLE IF EXISTS portal_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0003_application_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-17 12:16
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def init_updated_at(apps, schema_editor):
+    # Для существующих заявок датой изменения считаем дату создания
+    Application = apps.get_model('portal', 'Application')
+    Application.objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0004_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunPython(init_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['updated_at'], name='application_updated_idx'),
+        ),
+    ]
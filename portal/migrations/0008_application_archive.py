@@ -0,0 +1,57 @@
+# Generated by Django 6.0 on 2026-10-17 12:39
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0007_user_lower_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnifiedApplication',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('desired_start_date', models.DateField(verbose_name='Желаемая дата начала')),
+                ('payment_method', models.CharField(choices=[('cash', 'Наличными'), ('phone', 'Перевод по номеру телефона')], max_length=10, verbose_name='Способ оплаты')),
+                ('status', models.CharField(choices=[('new', 'Новая'), ('in_progress', 'Идет обучение'), ('completed', 'Обучение завершено')], max_length=15, verbose_name='Статус')),
+                ('created_at', models.DateTimeField(verbose_name='Дата создания')),
+                ('feedback', models.TextField(blank=True, null=True, verbose_name='Отзыв')),
+                ('updated_at', models.DateTimeField(verbose_name='Дата изменения')),
+                ('archived', models.BooleanField(verbose_name='В архиве')),
+            ],
+            options={
+                'verbose_name': 'Заявка (с архивом)',
+                'verbose_name_plural': 'Заявки (с архивом)',
+                'db_table': 'portal_application_all',
+                'ordering': ['-created_at'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedApplication',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('desired_start_date', models.DateField(verbose_name='Желаемая дата начала')),
+                ('payment_method', models.CharField(choices=[('cash', 'Наличными'), ('phone', 'Перевод по номеру телефона')], max_length=10, verbose_name='Способ оплаты')),
+                ('status', models.CharField(choices=[('new', 'Новая'), ('in_progress', 'Идет обучение'), ('completed', 'Обучение завершено')], max_length=15, verbose_name='Статус')),
+                ('created_at', models.DateTimeField(verbose_name='Дата создания')),
+                ('feedback', models.TextField(blank=True, null=True, verbose_name='Отзыв')),
+                ('updated_at', models.DateTimeField(verbose_name='Дата изменения')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата архивации')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_applications', to='portal.course', verbose_name='Курс')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_applications', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Архивная заявка',
+                'verbose_name_plural': 'Архивные заявки',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='archived_app_user_idx'), models.Index(fields=['-created_at', '-id'], name='archived_app_created_idx')],
+            },
+        ),
+    ]
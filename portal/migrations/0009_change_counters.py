@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:55
+
+from django.db import migrations, models
+
+
+# Триггеры ставит post_migrate (portal.apps.install_counters); при откате
+# их нужно удалить раньше таблицы, иначе запись в таблицы с триггерами
+# будет падать. Удаляются все по префиксу, как в portal.counters.drop:
+# набор триггеров со временем растет, а миграция остается прежней
+TRIGGER_PREFIX = 'portal_counter_'
+
+
+def drop_counter_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+            [TRIGGER_PREFIX + '%'],
+        )
+        for (name,) in cursor.fetchall():
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0008_application_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCounter',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Счетчик')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Значение')),
+            ],
+            options={
+                'verbose_name': 'Счетчик изменений',
+                'verbose_name_plural': 'Счетчики изменений',
+            },
+        ),
+        migrations.RunPython(migrations.RunPython.noop, drop_counter_triggers),
+    ]
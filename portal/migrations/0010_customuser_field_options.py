@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:16
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Валидаторы, подсказки и сообщения полей пользователя, которые были
+    в models.py без миграции еще до 0002. Схему базы не меняет.
+    """
+
+    dependencies = [
+        ('portal', '0009_change_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='email',
+            field=models.EmailField(help_text='pochta@mail.ru', max_length=254, unique=True, verbose_name='Email'),
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='full_name',
+            field=models.CharField(help_text='Иванов Иван Иванович', max_length=200, validators=[django.core.validators.RegexValidator(message='ФИО должно содержать только буквы, пробелы, дефисы и апострофы', regex="^[A-Za-zА-Яа-яЁё\\s\\-\\']+$")], verbose_name='ФИО'),
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='phone',
+            field=models.CharField(max_length=20, validators=[django.core.validators.RegexValidator(message='Введите номер телефона (10-15 цифр)', regex='^[\\d\\s\\-\\+\\(\\)]{10,15}$')], verbose_name='Телефон'),
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='username',
+            field=models.CharField(error_messages={'unique': 'Пользователь с таким логином уже существует.'}, help_text='Минимум 6 символов', max_length=150, unique=True, validators=[django.core.validators.RegexValidator(message='Логин должен начинаться с буквы и содержать только латинские буквы, цифры и _, минимум 6 символа', regex='^[a-zA-Z][a-zA-Z0-9_]{5,}$'), django.core.validators.MinLengthValidator(3)]),
+        ),
+    ]
@@ -1,4 +1,7 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Lower
+from django.dispatch import Signal
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator, MinLengthValidator
 from django.utils.translation import gettext_lazy as _
@@ -55,6 +58,11 @@ class CustomUser(AbstractUser):
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
+        indexes = [
+            # Проверка занятости без учета регистра (portal.availability)
+            models.Index(Lower('username'), name='user_username_lower_idx'),
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+        ]
 
 
 class Course(models.Model):
@@ -90,6 +98,40 @@ class Course(models.Model):
     
 
 
+# Отправляется после массового UPDATE заявок, который не вызывает post_save.
+# Аргументы: rows — прежние значения измененных заявок (словари с полями
+# ROLLUP_FIELDS), fields — словарь новых значений.
+applications_updated = Signal()
+
+ROLLUP_FIELDS = ('id', 'user_id', 'course_id', 'status', 'payment_method', 'created_at')
+
+
+class ApplicationQuerySet(models.QuerySet):
+    def set_status(self, status):
+        """
+        Меняет статус выбранных заявок одним UPDATE в транзакции.
+
+        Возвращает прежние значения заявок, статус которых изменился.
+        """
+        with transaction.atomic():
+            rows = list(
+                self.exclude(status=status)
+                .select_for_update()
+                .order_by()
+                .values(*ROLLUP_FIELDS)
+            )
+            if rows:
+                Application.objects.filter(
+                    id__in=[row['id'] for row in rows]
+                ).update(status=status, updated_at=timezone.now())
+                applications_updated.send(
+                    sender=Application,
+                    rows=rows,
+                    fields={'status': status},
+                )
+        return rows
+
+
 class Application(models.Model):
     class Status(models.TextChoices):
         NEW = 'new', 'Новая'
@@ -141,11 +183,267 @@ class Application(models.Model):
         null=True,
         verbose_name='Отзыв'
     )
+
+    # Меняется при любом изменении заявки (и при массовом UPDATE,
+    # см. ApplicationQuerySet.set_status) — версия для кэша строк
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
+
+    objects = ApplicationQuerySet.as_manager()
+
+    # Заявки из архива — ArchivedApplication и UnifiedApplication
+    archived = False
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_original()
+        return instance
+
+    @property
+    def version(self):
+        """Версия заявки для ключей кэша (микросекунды updated_at)"""
+        if self.updated_at is None:
+            return 0
+        return int(self.updated_at.timestamp() * 1_000_000)
+
+    def remember_original(self):
+        """Запоминает значения, от которых зависят счетчики статистики"""
+        self._original = {
+            'course_id': self.__dict__.get('course_id'),
+            'status': self.__dict__.get('status'),
+            'payment_method': self.__dict__.get('payment_method'),
+            'created_at': self.__dict__.get('created_at'),
+        }
     
     def __str__(self):
-        return f"Заявка #{self.id} - {self.course.title} ({self.user.username})"
+        # Связанные объекты — только уже загруженные (select_related):
+        # иначе каждая строка в админке и в журнале действий — два запроса
+        course = self.course.title if Application.course.is_cached(self) else f'курс #{self.course_id}'
+        user = self.user.username if Application.user.is_cached(self) else f'пользователь #{self.user_id}'
+        return f"Заявка #{self.id} - {course} ({user})"
     
     class Meta:
         verbose_name = 'Заявка'
         verbose_name_plural = 'Заявки'
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='application_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='application_status_idx'),
+            models.Index(fields=['user', '-created_at'], name='application_user_idx'),
+            models.Index(fields=['updated_at'], name='application_updated_idx'),
+        ]
+
+
+class ApplicationStat(models.Model):
+    """
+    Счетчик заявок в разрезе курс × статус × день × способ оплаты.
+
+    Обновляется инкрементально сигналами Application (portal.stats),
+    сверяется и пересчитывается командой rebuild_stats.
+    """
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        verbose_name='Курс',
+        related_name='stats'
+    )
+    status = models.CharField(
+        max_length=15,
+        choices=Application.Status.choices,
+        verbose_name='Статус'
+    )
+    day = models.DateField(verbose_name='День')
+    payment_method = models.CharField(
+        max_length=10,
+        choices=Application.PaymentMethod.choices,
+        verbose_name='Способ оплаты'
+    )
+    count = models.IntegerField(default=0, verbose_name='Количество')
+
+    def __str__(self):
+        return f"{self.day} {self.course_id}/{self.status}/{self.payment_method}: {self.count}"
+
+    class Meta:
+        verbose_name = 'Статистика заявок'
+        verbose_name_plural = 'Статистика заявок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['course', 'status', 'day', 'payment_method'],
+                name='application_stat_unique',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='application_stat_day_idx'),
+        ]
+
+class ChangeCounter(models.Model):
+    """
+    Счетчик изменений, общий для всех процессов (см. portal.counters).
+    Увеличивается триггерами базы, а не сигналами.
+    """
+    name = models.CharField(max_length=50, primary_key=True, verbose_name='Счетчик')
+    value = models.BigIntegerField(default=0, verbose_name='Значение')
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+    class Meta:
+        verbose_name = 'Счетчик изменений'
+        verbose_name_plural = 'Счетчики изменений'
+
+
+class Job(models.Model):
+    """
+    Фоновая задача (очередь в базе, см. portal.jobs и manage.py run_worker).
+
+    key — ключ дедупликации: пока задача с таким ключом ждет выполнения,
+    такая же не добавляется. batch_key — задачи с одинаковым ключом
+    выполняются одной пачкой (например, одно письмо-сводка пользователю).
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Ожидает'
+        RUNNING = 'running', 'Выполняется'
+        FAILED = 'failed', 'Ошибка'
+
+    kind = models.CharField(max_length=50, verbose_name='Тип')
+    payload = models.JSONField(default=dict, verbose_name='Данные')
+    key = models.CharField(max_length=200, null=True, blank=True, verbose_name='Ключ дедупликации')
+    batch_key = models.CharField(max_length=200, null=True, blank=True, verbose_name='Ключ пачки')
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name='Статус'
+    )
+    attempts = models.IntegerField(default=0, verbose_name='Попыток')
+    run_after = models.DateTimeField(default=timezone.now, verbose_name='Выполнить после')
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name='Воркер')
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name='Взята в работу')
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=models.Q(status='pending'),
+                name='job_pending_key_unique',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_ready_idx'),
+            models.Index(fields=['batch_key'], name='job_batch_idx'),
+            models.Index(fields=['locked_by'], name='job_locked_by_idx'),
+        ]
+
+
+class ArchivedApplication(models.Model):
+    """
+    Завершенная заявка, перенесенная из Application командой
+    archive_applications. id, даты и отзыв сохраняются как были.
+    """
+    id = models.IntegerField(primary_key=True, verbose_name='ID')
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='archived_applications'
+    )
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        verbose_name='Курс',
+        related_name='archived_applications'
+    )
+    desired_start_date = models.DateField(verbose_name='Желаемая дата начала')
+    payment_method = models.CharField(
+        max_length=10,
+        choices=Application.PaymentMethod.choices,
+        verbose_name='Способ оплаты'
+    )
+    status = models.CharField(
+        max_length=15,
+        choices=Application.Status.choices,
+        verbose_name='Статус'
+    )
+    created_at = models.DateTimeField(verbose_name='Дата создания')
+    feedback = models.TextField(blank=True, null=True, verbose_name='Отзыв')
+    updated_at = models.DateTimeField(verbose_name='Дата изменения')
+    archived_at = models.DateTimeField(default=timezone.now, verbose_name='Дата архивации')
+
+    archived = True
+
+    @property
+    def version(self):
+        return int(self.updated_at.timestamp() * 1_000_000)
+
+    def __str__(self):
+        return f"Архивная заявка #{self.id}"
+
+    class Meta:
+        verbose_name = 'Архивная заявка'
+        verbose_name_plural = 'Архивные заявки'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='archived_app_user_idx'),
+            models.Index(fields=['-created_at', '-id'], name='archived_app_created_idx'),
+        ]
+
+
+class UnifiedApplication(models.Model):
+    """
+    Заявки вместе с архивом: представление portal_application_all
+    (UNION ALL двух таблиц, см. portal.archive). Только для чтения.
+    """
+    id = models.IntegerField(primary_key=True, verbose_name='ID')
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        verbose_name='Пользователь',
+        related_name='+'
+    )
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        verbose_name='Курс',
+        related_name='+'
+    )
+    desired_start_date = models.DateField(verbose_name='Желаемая дата начала')
+    payment_method = models.CharField(
+        max_length=10,
+        choices=Application.PaymentMethod.choices,
+        verbose_name='Способ оплаты'
+    )
+    status = models.CharField(
+        max_length=15,
+        choices=Application.Status.choices,
+        verbose_name='Статус'
+    )
+    created_at = models.DateTimeField(verbose_name='Дата создания')
+    feedback = models.TextField(blank=True, null=True, verbose_name='Отзыв')
+    updated_at = models.DateTimeField(verbose_name='Дата изменения')
+    archived = models.BooleanField(verbose_name='В архиве')
+
+    @property
+    def version(self):
+        return int(self.updated_at.timestamp() * 1_000_000)
+
+    def __str__(self):
+        return f"Заявка #{self.id}"
+
+    class Meta:
+        managed = False
+        db_table = 'portal_application_all'
+        verbose_name = 'Заявка (с архивом)'
+        verbose_name_plural = 'Заявки (с архивом)'
+        ordering = ['-created_at']
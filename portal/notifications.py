@@ -0,0 +1,104 @@
+"""
+Письма об изменениях заявок. Отправляются воркером (portal.jobs), а не
+в запросе: представление только добавляет задачу в очередь.
+
+Изменения статуса копятся PORTAL_NOTIFY_DELAY секунд и уходят одним
+письмом-сводкой на пользователя; о новых заявках администраторы
+получают такую же общую сводку.
+"""
+from django.conf import settings
+from django.core.mail import send_mail
+from django.template.loader import render_to_string
+
+from .jobs import enqueue, new_job, register
+from .models import Application, CustomUser
+
+
+STATUS_CHANGED = 'status_changed'
+NEW_APPLICATIONS = 'new_applications'
+
+
+def _delay():
+    return getattr(settings, 'PORTAL_NOTIFY_DELAY', 60)
+
+
+def notify_status_changed(rows):
+    """
+    rows — заявки с полями id и user_id (см. ApplicationQuerySet.set_status).
+    Одна задача на пользователя: массовая смена статуса — один INSERT.
+    """
+    by_user = {}
+    for row in rows:
+        by_user.setdefault(row['user_id'], []).append(row['id'])
+    enqueue([
+        new_job(
+            STATUS_CHANGED,
+            {'application_ids': ids},
+            # Одинаковое ожидающее уведомление не дублируется
+            key=f'status:{user_id}:{",".join(map(str, sorted(ids)))}',
+            batch_key=f'status:user:{user_id}',
+            delay=_delay(),
+        )
+        for user_id, ids in by_user.items()
+    ])
+
+
+def notify_new_application(application):
+    enqueue([
+        new_job(
+            NEW_APPLICATIONS,
+            {'application_id': application.id},
+            key=f'new_application:{application.id}',
+            batch_key=NEW_APPLICATIONS,
+            delay=_delay(),
+        ),
+    ])
+
+
+def _applications(ids):
+    # Удаленные заявки просто не попадают в письмо
+    return list(
+        Application.objects.filter(id__in=ids)
+        .select_related('user', 'course')
+        .order_by('-created_at')
+    )
+
+
+@register(STATUS_CHANGED)
+def send_status_digest(payloads):
+    """
+    Сводка по пачке задач одного пользователя. Статус в письме — текущий,
+    поэтому несколько смен одной заявки дают одну строку.
+    """
+    by_user = {}
+    ids = {app_id for payload in payloads for app_id in payload['application_ids']}
+    for app in _applications(ids):
+        by_user.setdefault(app.user, []).append(app)
+    for user, applications in by_user.items():
+        send_mail(
+            'Изменился статус ваших заявок',
+            render_to_string('portal/emails/status_digest.txt', {
+                'user': user, 'applications': applications,
+            }),
+            None,
+            [user.email],
+        )
+
+
+@register(NEW_APPLICATIONS)
+def send_new_applications_digest(payloads):
+    applications = _applications({payload['application_id'] for payload in payloads})
+    recipients = list(
+        CustomUser.objects.filter(is_superuser=True, is_active=True)
+        .exclude(email='').values_list('email', flat=True)
+    )
+    if not applications or not recipients:
+        return
+    send_mail(
+        f'Новые заявки: {len(applications)}',
+        render_to_string('portal/emails/new_applications.txt', {
+            'applications': applications,
+        }),
+        None,
+        recipients,
+    )
@@ -0,0 +1,131 @@
+import base64
+from datetime import datetime
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+
+
+class CursorError(ValueError):
+    """Некорректный или поддельный курсор"""
+
+
+def encode_cursor(created_at, pk):
+    raw = f'{created_at.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, pk = base64.urlsafe_b64decode(padded).decode().split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise CursorError(cursor) from exc
+
+
+class KeysetPage:
+    """Страница выборки, упорядоченной по (-created_at, -id)"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+
+def keyset_paginate(queryset, after=None, before=None, per_page=50):
+    """
+    Курсорная пагинация по (created_at, id) от новых к старым.
+
+    Вместо OFFSET используется условие по последнему ключу страницы,
+    поэтому стоимость запроса не зависит от номера страницы.
+    Выполняется ровно один запрос (per_page + 1 строка).
+    """
+    if before:
+        created_at, pk = decode_cursor(before)
+        rows = list(
+            queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+            ).order_by('created_at', 'id')[:per_page + 1]
+        )
+        has_more = len(rows) > per_page
+        items = rows[:per_page][::-1]
+        prev_cursor = encode_cursor(items[0].created_at, items[0].id) if has_more else None
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id) if items else None
+        return KeysetPage(items, next_cursor, prev_cursor)
+
+    queryset = queryset.order_by('-created_at', '-id')
+    if after:
+        created_at, pk = decode_cursor(after)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+    rows = list(queryset[:per_page + 1])
+    items = rows[:per_page]
+    next_cursor = None
+    if len(rows) > per_page:
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+    prev_cursor = None
+    if after and items:
+        prev_cursor = encode_cursor(items[0].created_at, items[0].id)
+    return KeysetPage(items, next_cursor, prev_cursor)
+
+
+def estimated_table_rows(model, using):
+    """
+    Примерное число строк таблицы без COUNT(*): из статистики SQLite
+    (sqlite_stat1, ее собирают ANALYZE и PRAGMA optimize), а без нее —
+    наибольший id. Оценка бывает и больше, и меньше фактической.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone():
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+                row = cursor.fetchone()
+                if row:
+                    return int(row[0].split()[0])
+    if model._meta.pk.get_internal_type() in ('AutoField', 'BigAutoField', 'IntegerField'):
+        return model._default_manager.using(using).aggregate(value=Max('pk'))['value'] or 0
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор списков админки для больших таблиц.
+
+    Точное число строк считается только до exact_limit (COUNT по подзапросу
+    с LIMIT — стоимость ограничена). Если строк больше, для выборки без
+    фильтров берется оценка estimated_table_rows, а с фильтрами — предел:
+    на последних страницах список может оказаться короче или пустым.
+    """
+    exact_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        counted = queryset[:self.exact_limit + 1].count()
+        if counted <= self.exact_limit:
+            return counted
+        if not queryset.query.has_filters():
+            estimate = estimated_table_rows(queryset.model, queryset.db)
+            if estimate is not None:
+                return max(estimate, counted)
+        return counted
@@ -0,0 +1,291 @@
+"""
+Профилирование запросов (включается настройкой PORTAL_PROFILING).
+
+ProfilingMiddleware считает SQL-запросы и их время, время шаблонов,
+представления и размер ответа, отдает их в заголовке Server-Timing,
+пишет в лог медленные запросы с повторяющимися SQL и копит по каждому
+имени URL последние длительности. Выборки периодически сохраняются
+в PORTAL_PROFILING_DIR (по файлу на процесс) вместе с метриками пула
+хеширования паролей, их читает команда perfstats.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates, Template
+
+from .hashing import hashing_executor
+
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('portal_request_profile', default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.view_started = None
+        self.view_time = None
+        self.total_time = None
+        self.size = None
+
+    def add_query(self, sql, duration):
+        self.queries.append(sql)
+        self.sql_time += duration
+
+    def duplicates(self, limit=5):
+        """Самые частые повторяющиеся запросы — признак N+1"""
+        return [
+            (sql, count)
+            for sql, count in Counter(self.queries).most_common(limit)
+            if count > 1
+        ]
+
+    def server_timing(self):
+        parts = [
+            f'db;dur={self.sql_time * 1000:.1f};desc="SQL x{len(self.queries)}"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+        ]
+        if self.view_time is not None:
+            parts.append(f'view;dur={self.view_time * 1000:.1f}')
+        parts.append(f'total;dur={self.total_time * 1000:.1f}')
+        if self.size is not None:
+            parts.append(f'size;desc="{self.size}"')
+        return ', '.join(parts)
+
+
+def _query_wrapper(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_query(sql, time.perf_counter() - started)
+
+
+def _install_query_wrapper(connection, **kwargs):
+    # Обертка одна на все соединения; без активного профиля она ничего не делает
+    if _query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_query_wrapper)
+
+
+class ProfiledTemplate(Template):
+    def render(self, context=None, request=None):
+        profile = _current.get()
+        if profile is None:
+            return super().render(context, request)
+        # Вложенный render_to_string не должен учитываться дважды
+        profile.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile.template_depth -= 1
+            if not profile.template_depth:
+                profile.template_time += time.perf_counter() - started
+
+
+class ProfilingDjangoTemplates(DjangoTemplates):
+    """Шаблонизатор Django, который засекает время рендера для профилировщика"""
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return ProfiledTemplate(super().get_template(template_name).template, self)
+
+
+def percentile(values, fraction):
+    """Перцентиль по ближайшему рангу для отсортированного списка"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class PerfStats:
+    """Последние длительности запросов по именам URL (скользящее окно)"""
+
+    def __init__(self, window=None, directory=None, flush_interval=None):
+        self.window = window or getattr(settings, 'PORTAL_PROFILING_WINDOW', 1000)
+        self.directory = directory or getattr(settings, 'PORTAL_PROFILING_DIR', None)
+        self.flush_interval = flush_interval or getattr(settings, 'PORTAL_PROFILING_FLUSH_INTERVAL', 10)
+        self.samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def record(self, name, profile):
+        with self._lock:
+            self.samples[name].append(
+                (profile.total_time * 1000, len(profile.queries), profile.sql_time * 1000)
+            )
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'perf-{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as fileobj:
+                json.dump({
+                    'samples': {name: list(rows) for name, rows in self.samples.items()},
+                    'hashing': hashing_executor.stats(),
+                }, fileobj)
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.exception('Не удалось сохранить статистику профилирования в %s', path)
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+
+perf_stats = PerfStats()
+
+
+def _load_worker_files(directory):
+    if not directory or not os.path.isdir(directory):
+        return
+    for filename in sorted(os.listdir(directory)):
+        if not (filename.startswith('perf-') and filename.endswith('.json')):
+            continue
+        try:
+            with open(os.path.join(directory, filename), encoding='utf-8') as fileobj:
+                yield json.load(fileobj)
+        except (OSError, ValueError):
+            continue
+
+
+def load_samples(directory):
+    """Объединяет выборки всех процессов: {url_name: [(total_ms, queries, sql_ms), ...]}"""
+    merged = defaultdict(list)
+    for data in _load_worker_files(directory):
+        for name, rows in data.get('samples', {}).items():
+            merged[name].extend(tuple(row) for row in rows)
+    return merged
+
+
+def load_hashing_stats(directory):
+    """Суммарные метрики пула хеширования по всем процессам (None, если данных нет)"""
+    total = None
+    for data in _load_worker_files(directory):
+        stats = data.get('hashing')
+        if not stats:
+            continue
+        if total is None:
+            total = {'processes': 0, 'workers': 0, 'pending': 0, 'queued': 0,
+                     'peak_pending': 0, 'completed': 0, 'rejected': 0}
+        total['processes'] += 1
+        for key in ('workers', 'pending', 'queued', 'completed', 'rejected'):
+            total[key] += stats[key]
+        total['peak_pending'] = max(total['peak_pending'], stats['peak_pending'])
+    return total
+
+
+def summarize(samples):
+    """Перцентили времени ответа и среднее число запросов по каждому имени URL"""
+    summary = []
+    for name, rows in samples.items():
+        durations = sorted(row[0] for row in rows)
+        summary.append({
+            'name': name,
+            'count': len(rows),
+            'p50': percentile(durations, 0.5),
+            'p90': percentile(durations, 0.9),
+            'p99': percentile(durations, 0.99),
+            'max': durations[-1],
+            'queries': sum(row[1] for row in rows) / len(rows),
+            'sql_ms': sum(row[2] for row in rows) / len(rows),
+        })
+    return sorted(summary, key=lambda row: row['p90'], reverse=True)
+
+
+class ProfilingMiddleware:
+    """
+    Ставится первым в MIDDLEWARE; работает, только если PORTAL_PROFILING = True.
+    Поддерживает как синхронные, так и async-представления.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PORTAL_PROFILING', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'PORTAL_SLOW_REQUEST_MS', 500)
+        connection_created.connect(_install_query_wrapper, dispatch_uid='portal_profiling')
+        for connection in connections.all(initialized_only=True):
+            _install_query_wrapper(connection)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = _current.get()
+        if profile is not None:
+            profile.view_started = time.perf_counter()
+
+    def finish(self, request, response, profile):
+        finished = time.perf_counter()
+        profile.total_time = finished - profile.started
+        if profile.view_started is not None:
+            # Время представления без рендера шаблонов
+            profile.view_time = max(0.0, finished - profile.view_started - profile.template_time)
+        if not response.streaming:
+            profile.size = len(response.content)
+        response['Server-Timing'] = profile.server_timing()
+
+        match = getattr(request, 'resolver_match', None)
+        name = (match.view_name if match else None) or 'unresolved'
+        perf_stats.record(name, profile)
+
+        if profile.total_time * 1000 >= self.slow_ms:
+            lines = [
+                f'  {count}x {sql}' for sql, count in profile.duplicates()
+            ]
+            logger.warning(
+                'Медленный запрос %s %s (%s): %.0f мс, SQL %d шт. / %.0f мс, шаблоны %.0f мс%s',
+                request.method, request.path, name,
+                profile.total_time * 1000, len(profile.queries), profile.sql_time * 1000,
+                profile.template_time * 1000,
+                ('\nПовторяющиеся запросы:\n' + '\n'.join(lines)) if lines else '',
+            )
+        return response
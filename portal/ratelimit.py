@@ -0,0 +1,223 @@
+"""
+Ограничение частоты запросов (token bucket) для входа, регистрации и
+создания заявок.
+
+Корзины хранятся в отдельном файле SQLite (PORTAL_RATE_LIMIT_DB), общем
+для всех процессов-воркеров: одна проверка — одна короткая транзакция
+без обращения к основной базе. Декоратор rate_limit отклоняет запрос
+с 429 до того, как представление начнет хешировать пароль или читать
+базу. Если файл корзин занят или недоступен, лимиты считаются в памяти
+процесса (LocalBucketStore): ограничение слабее, но не снимается.
+"""
+import functools
+import logging
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.http import HttpResponse
+
+
+logger = logging.getLogger(__name__)
+
+# Сколько ждать блокировку файла корзин; при превышении — корзины процесса.
+# Короткое: для async-представлений проверка выполняется в цикле событий
+BUSY_TIMEOUT = 0.1
+# Корзины, не менявшиеся сутки, удаляются (примерно раз в CLEANUP_EVERY проверок)
+STALE_AFTER = 24 * 60 * 60
+CLEANUP_EVERY = 1000
+
+SCHEMA_SQL = '''
+CREATE TABLE IF NOT EXISTS bucket (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID
+'''
+
+# Пополнение с момента прошлого запроса, не больше емкости, минус токен.
+# Отклоненный запрос тоже расходует токен, но не ниже -1: перебор
+# не продлевает блокировку бесконечно
+TAKE_SQL = '''
+INSERT INTO bucket (key, tokens, updated_at) VALUES (:key, :capacity - 1, :now)
+ON CONFLICT (key) DO UPDATE SET
+    tokens = max(min(:capacity, tokens + (:now - updated_at) * :rate) - 1, -1),
+    updated_at = :now
+RETURNING tokens
+'''
+
+
+class BucketStore:
+    """Корзины в файле SQLite; соединение — свое у каждого потока"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            # Состояние корзин не обязано переживать сбой питания
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(SCHEMA_SQL)
+            self._local.connection = connection
+        return connection
+
+    def take(self, buckets, now=None):
+        """
+        Берет по токену из каждой корзины [(ключ, емкость, токенов в секунду)].
+        Возвращает 0, если запрос разрешен, иначе — через сколько секунд
+        повторить.
+        """
+        now = time.time() if now is None else now
+        connection = self._connection()
+        retry_after = 0
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            for key, capacity, rate in buckets:
+                tokens, = connection.execute(TAKE_SQL, {
+                    'key': key, 'capacity': capacity, 'rate': rate, 'now': now,
+                }).fetchone()
+                retry_after = max(retry_after, _retry_after(tokens, rate))
+            if random.randrange(CLEANUP_EVERY) == 0:
+                connection.execute('DELETE FROM bucket WHERE updated_at < ?', (now - STALE_AFTER,))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return retry_after
+
+
+def _retry_after(tokens, rate):
+    if tokens >= 0:
+        return 0
+    # Нужен целый токен: от tokens до 1 после списания
+    return math.ceil((1 - tokens) / rate)
+
+
+class LocalBucketStore:
+    """
+    Те же корзины (см. TAKE_SQL) в памяти процесса — на время, пока файл
+    корзин недоступен. Лимит тогда действует в каждом процессе отдельно.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def take(self, buckets, now=None):
+        now = time.time() if now is None else now
+        retry_after = 0
+        with self._lock:
+            for key, capacity, rate in buckets:
+                tokens, updated_at = self._buckets.get(key, (capacity, now))
+                tokens = max(min(capacity, tokens + (now - updated_at) * rate) - 1, -1)
+                self._buckets[key] = (tokens, now)
+                retry_after = max(retry_after, _retry_after(tokens, rate))
+            if random.randrange(CLEANUP_EVERY) == 0:
+                self._buckets = {
+                    key: value for key, value in self._buckets.items()
+                    if value[1] >= now - STALE_AFTER
+                }
+        return retry_after
+
+
+local_store = LocalBucketStore()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store():
+    path = str(settings.PORTAL_RATE_LIMIT_DB)
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.setdefault(path, BucketStore(path))
+    return store
+
+
+def client_ip(request):
+    # За прокси REMOTE_ADDR должен выставлять сам сервер (например,
+    # gunicorn --forwarded-allow-ips), заголовкам клиента не доверяем
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def bucket_value(request, kind):
+    """Значение ключа корзины или None, если для запроса его нет"""
+    if kind == 'ip':
+        return client_ip(request)
+    if kind == 'username':
+        username = request.POST.get('username', '').strip().lower()
+        return username or None
+    if kind == 'user':
+        # Из сессии (обычно из кэша), без загрузки пользователя
+        return request.session.get(SESSION_KEY)
+    raise ValueError(f'Неизвестный ключ ограничения: {kind}')
+
+
+def check(request, name):
+    """0 — запрос разрешен, иначе Retry-After в секундах"""
+    rules = getattr(settings, 'PORTAL_RATE_LIMITS', {}).get(name)
+    if not rules:
+        return 0
+    buckets = []
+    for kind, capacity, period in rules:
+        value = bucket_value(request, kind)
+        if value is not None:
+            buckets.append((f'{name}:{kind}:{value}', capacity, capacity / period))
+    if not buckets:
+        return 0
+    try:
+        return get_store().take(buckets)
+    except sqlite3.OperationalError:
+        # Файл корзин занят или недоступен: пропускать всех нельзя (перебор
+        # паролей), отказывать всем тоже — считаем в памяти процесса
+        logger.warning('Файл корзин недоступен, лимиты в памяти процесса', exc_info=True)
+        return local_store.take(buckets)
+
+
+def _limited_response(retry_after):
+    response = HttpResponse(
+        f'Слишком много попыток. Повторите через {retry_after} с.', status=429,
+    )
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def rate_limit(name, methods=('POST',)):
+    """
+    Ограничивает частоту запросов к представлению по правилам
+    PORTAL_RATE_LIMITS[name]. Ставится внешним декоратором: отказ не
+    требует ни хеширования пароля, ни загрузки пользователя из базы.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            async def wrapper(request, *args, **kwargs):
+                if request.method in methods:
+                    retry_after = check(request, name)
+                    if retry_after:
+                        return _limited_response(retry_after)
+                return await view_func(request, *args, **kwargs)
+
+            markcoroutinefunction(wrapper)
+        else:
+            def wrapper(request, *args, **kwargs):
+                if request.method in methods:
+                    retry_after = check(request, name)
+                    if retry_after:
+                        return _limited_response(retry_after)
+                return view_func(request, *args, **kwargs)
+
+        return functools.wraps(view_func)(wrapper)
+    return decorator
@@ -0,0 +1,243 @@
+"""
+Полнотекстовый поиск по пользователям, курсам и отзывам (SQLite FTS5).
+
+Все сущности лежат в одной виртуальной таблице portal_search;
+rowid = id * 4 + вид сущности. Индекс обновляется триггерами базы,
+поэтому bulk_create и UPDATE через QuerySet тоже попадают в поиск.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+
+KIND_USER = 0
+KIND_COURSE = 1
+KIND_APPLICATION = 2
+
+# unicode61 приводит к нижнему регистру любые буквы, включая кириллицу
+CREATE_TABLE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS portal_search USING fts5("
+    "title, body, tokenize='unicode61 remove_diacritics 2')"
+)
+
+_PHONE_DIGITS = (
+    "replace(replace(replace(replace(replace({phone}, '(', ''), ')', ''), '-', ''), ' ', ''), '+', '')"
+)
+
+_USER_VALUES = (
+    "new.id * 4, new.full_name || ' ' || new.username, "
+    "new.email || ' ' || new.phone || ' ' || " + _PHONE_DIGITS.format(phone='new.phone')
+)
+_COURSE_VALUES = "new.id * 4 + 1, new.title, new.description"
+_APPLICATION_VALUES = "new.id * 4 + 2, '', new.feedback"
+
+TRIGGERS_SQL = [
+    # Пользователи
+    f"""CREATE TRIGGER IF NOT EXISTS portal_search_user_ai AFTER INSERT ON portal_customuser BEGIN
+        INSERT INTO portal_search(rowid, title, body) VALUES ({_USER_VALUES});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS portal_search_user_au
+    AFTER UPDATE OF username, full_name, email, phone ON portal_customuser BEGIN
+        DELETE FROM portal_search WHERE rowid = old.id * 4;
+        INSERT INTO portal_search(rowid, title, body) VALUES ({_USER_VALUES});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS portal_search_user_ad AFTER DELETE ON portal_customuser BEGIN
+        DELETE FROM portal_search WHERE rowid = old.id * 4;
+    END""",
+    # Курсы
+    f"""CREATE TRIGGER IF NOT EXISTS portal_search_course_ai AFTER INSERT ON portal_course BEGIN
+        INSERT INTO portal_search(rowid, title, body) VALUES ({_COURSE_VALUES});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS portal_search_course_au
+    AFTER UPDATE OF title, description ON portal_course BEGIN
+        DELETE FROM portal_search WHERE rowid = old.id * 4 + 1;
+        INSERT INTO portal_search(rowid, title, body) VALUES ({_COURSE_VALUES});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS portal_search_course_ad AFTER DELETE ON portal_course BEGIN
+        DELETE FROM portal_search WHERE rowid = old.id * 4 + 1;
+    END""",
+    # Отзывы к заявкам (в индекс попадают только непустые)
+    f"""CREATE TRIGGER IF NOT EXISTS portal_search_application_ai AFTER INSERT ON portal_application
+    WHEN coalesce(new.feedback, '') <> '' BEGIN
+        INSERT INTO portal_search(rowid, title, body) VALUES ({_APPLICATION_VALUES});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS portal_search_application_au
+    AFTER UPDATE OF feedback ON portal_application BEGIN
+        DELETE FROM portal_search WHERE rowid = old.id * 4 + 2;
+        INSERT INTO portal_search(rowid, title, body)
+            SELECT {_APPLICATION_VALUES} WHERE coalesce(new.feedback, '') <> '';
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS portal_search_application_ad AFTER DELETE ON portal_application BEGIN
+        DELETE FROM portal_search WHERE rowid = old.id * 4 + 2;
+    END""",
+]
+
+REBUILD_SQL = [
+    "DELETE FROM portal_search",
+    "INSERT INTO portal_search(rowid, title, body) SELECT "
+    + _USER_VALUES.replace('new.', '') + " FROM portal_customuser",
+    "INSERT INTO portal_search(rowid, title, body) SELECT "
+    + _COURSE_VALUES.replace('new.', '') + " FROM portal_course",
+    "INSERT INTO portal_search(rowid, title, body) SELECT "
+    + _APPLICATION_VALUES.replace('new.', '')
+    + " FROM portal_application WHERE coalesce(feedback, '') <> ''",
+]
+
+# Вес совпадения в названии выше, чем в описании/контактах
+RANK_SQL = 'bm25(portal_search, 5.0, 1.0)'
+
+
+def is_available(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def install(cursor):
+    """Создает таблицу и триггеры, если их нет (вызывается после migrate)"""
+    cursor.execute(CREATE_TABLE_SQL)
+    for sql in TRIGGERS_SQL:
+        cursor.execute(sql)
+
+
+def rebuild(cursor):
+    install(cursor)
+    for sql in REBUILD_SQL:
+        cursor.execute(sql)
+
+
+def build_match(query):
+    """
+    Превращает пользовательский ввод в запрос FTS5: каждое слово в кавычках
+    с поиском по префиксу, слова объединяются через AND.
+    """
+    tokens = re.findall(r'\w+', query or '')
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def _ids_sql(kind):
+    return (
+        'SELECT rowid / 4 FROM portal_search '
+        f'WHERE portal_search MATCH %s AND rowid %% 4 = {kind}'
+    )
+
+
+def search_users(queryset, query):
+    match = build_match(query)
+    if match is None:
+        return queryset
+    if not is_available():
+        return queryset.filter(
+            Q(username__icontains=query) | Q(full_name__icontains=query)
+            | Q(email__icontains=query) | Q(phone__icontains=query)
+        )
+    return queryset.filter(pk__in=RawSQL(_ids_sql(KIND_USER), [match]))
+
+
+def search_courses(queryset, query):
+    match = build_match(query)
+    if match is None:
+        return queryset
+    if not is_available():
+        return queryset.filter(Q(title__icontains=query) | Q(description__icontains=query))
+    return queryset.filter(pk__in=RawSQL(_ids_sql(KIND_COURSE), [match]))
+
+
+def search_applications(queryset, query):
+    """Заявки, у которых совпал пользователь, курс или отзыв"""
+    match = build_match(query)
+    if match is None:
+        return queryset
+    if not is_available():
+        return queryset.filter(
+            Q(user__username__icontains=query) | Q(user__full_name__icontains=query)
+            | Q(course__title__icontains=query) | Q(feedback__icontains=query)
+        )
+    return queryset.filter(
+        Q(user_id__in=RawSQL(_ids_sql(KIND_USER), [match]))
+        | Q(course_id__in=RawSQL(_ids_sql(KIND_COURSE), [match]))
+        | Q(pk__in=RawSQL(_ids_sql(KIND_APPLICATION), [match]))
+    )
+
+
+def ranked_application_ids(queryset, query, limit, offset=0):
+    """
+    id заявок из queryset, отсортированные по релевантности (bm25).
+
+    Заявка получает лучший ранг из совпадений ее пользователя, курса и отзыва.
+    """
+    match = build_match(query)
+    if match is None:
+        return []
+    if not is_available():
+        return list(
+            search_applications(queryset, query)
+            .order_by('-created_at', '-id')
+            .values_list('id', flat=True)[offset:offset + limit]
+        )
+
+    scope_sql, scope_params = queryset.order_by().values('id').query.sql_with_params()
+    sql = f"""
+        WITH hits AS (
+            SELECT rowid, {RANK_SQL} AS rank FROM portal_search WHERE portal_search MATCH %s
+        )
+        SELECT id FROM (
+            SELECT a.id AS id, h.rank AS rank FROM hits h
+                JOIN portal_application a ON a.user_id = h.rowid / 4
+                WHERE h.rowid %% 4 = {KIND_USER}
+            UNION ALL
+            SELECT a.id, h.rank FROM hits h
+                JOIN portal_application a ON a.course_id = h.rowid / 4
+                WHERE h.rowid %% 4 = {KIND_COURSE}
+            UNION ALL
+            SELECT h.rowid / 4, h.rank FROM hits h
+                WHERE h.rowid %% 4 = {KIND_APPLICATION}
+        )
+        WHERE id IN ({scope_sql})
+        GROUP BY id
+        ORDER BY MIN(rank), id DESC
+        LIMIT %s OFFSET %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, *scope_params, limit, offset])
+        return [row[0] for row in cursor.fetchall()]
+
+
+class SearchPage:
+    """Страница результатов поиска (OFFSET-пагинация по номеру страницы)"""
+
+    def __init__(self, items, number, has_next):
+        self.items = items
+        self.number = number
+        self.has_next = has_next
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_previous(self):
+        return self.number > 1
+
+    @property
+    def next_page_number(self):
+        return self.number + 1
+
+    @property
+    def previous_page_number(self):
+        return self.number - 1
+
+
+def search_page(queryset, query, page=1, per_page=50):
+    """
+    Ранжированная страница заявок: один запрос за id и один за сами строки.
+    """
+    ids = ranked_application_ids(queryset, query, per_page + 1, (page - 1) * per_page)
+    has_next = len(ids) > per_page
+    ids = ids[:per_page]
+    objects = queryset.in_bulk(ids)
+    return SearchPage([objects[pk] for pk in ids if pk in objects], page, has_next)
@@ -0,0 +1,93 @@
+from django.contrib.auth.signals import user_logged_out
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import availability, events, notifications, stats
+from .backends import invalidate_cached_user
+from .catalog import bump_catalog_version
+from .models import (
+    Application, ArchivedApplication, Course, CustomUser, applications_updated,
+)
+
+
+# Объявлен до application_saved_stats: тот после подсчета перезаписывает
+# _original, а здесь по нему определяется смена статуса
+@receiver(post_save, sender=Application)
+def application_saved_notify(sender, instance, created, raw=False, **kwargs):
+    """Письма ставятся в очередь в той же транзакции (portal.notifications)"""
+    if raw:
+        return
+    if created:
+        notifications.notify_new_application(instance)
+        return
+    original = getattr(instance, '_original', None)
+    if original and original['status'] is not None and original['status'] != instance.status:
+        notifications.notify_status_changed([{'id': instance.pk, 'user_id': instance.user_id}])
+
+
+@receiver(post_save, sender=Application)
+def application_saved_stats(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        stats.record_application_saved(instance, created)
+
+
+@receiver(post_delete, sender=Application)
+def application_deleted_stats(sender, instance, **kwargs):
+    stats.record_application_deleted(instance)
+
+
+@receiver(applications_updated)
+def applications_bulk_changed(sender, rows, fields, **kwargs):
+    stats.record_rows_updated(rows, fields)
+    if 'status' in fields:
+        notifications.notify_status_changed(rows)
+    ids = [row['id'] for row in rows]
+    transaction.on_commit(lambda: events.publish_applications(ids))
+
+
+@receiver(post_delete, sender=ArchivedApplication)
+def archived_application_deleted(sender, instance, **kwargs):
+    """Архивные заявки учитываются в статистике, пока не удалены"""
+    stats.record_application_deleted(instance)
+
+
+@receiver(post_save, sender=Application)
+def application_saved_event(sender, instance, raw=False, **kwargs):
+    """Живое обновление строки в личном кабинете владельца (portal.events)"""
+    if not raw:
+        transaction.on_commit(lambda: events.publish_applications([instance.pk]))
+
+
+@receiver(post_delete, sender=Application)
+def application_deleted_event(sender, instance, **kwargs):
+    user_id, application_id = instance.user_id, instance.pk
+    transaction.on_commit(lambda: events.publish_application_deleted(user_id, application_id))
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def course_changed(sender, instance, **kwargs):
+    """Новая версия каталога курсов после фиксации транзакции"""
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def user_changed(sender, instance, **kwargs):
+    """Профиль, пароль или права изменились — кэш пользователя устарел"""
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=CustomUser)
+def user_saved_availability(sender, instance, raw=False, **kwargs):
+    """Новый логин/email сразу занят в индексе этого процесса"""
+    if not raw:
+        availability.index.add('username', instance.username)
+        availability.index.add('email', instance.email)
+
+
+@receiver(user_logged_out)
+def user_logged_out_handler(sender, request, user, **kwargs):
+    if user is not None:
+        invalidate_cached_user(user.pk)
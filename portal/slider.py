@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+MANIFEST_NAME = 'manifest.json'
+VARIANTS_DIR = 'variants'
+VARIANT_WIDTHS = (480, 960, 1440)
+MAX_SLIDES = 4
+
+# Заглушки на случай, если папка слайдера пуста
+FALLBACK_IMAGES = [
+    'slider/image08.webp',
+    'slider/image09.webp',
+    'slider/image10.webp',
+    'slider/image11.jpg',
+]
+
+
+def slider_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'slider')
+
+
+def manifest_path():
+    return os.path.join(slider_dir(), MANIFEST_NAME)
+
+
+def _media_url(path):
+    return f'{settings.MEDIA_URL}{path}'
+
+
+def _srcset(variants, key):
+    return ', '.join(
+        f'{_media_url(variant[key])} {variant["width"]}w'
+        for variant in variants
+        if variant.get(key)
+    )
+
+
+def build_slides():
+    """
+    Собирает список слайдов для главной страницы.
+
+    Если командой build_slider_variants подготовлен manifest.json,
+    для каждого изображения отдаются уменьшенные копии (srcset) и размеры.
+    """
+    path = slider_dir()
+    manifest = {}
+    try:
+        with open(manifest_path(), encoding='utf-8') as fh:
+            manifest = json.load(fh).get('images', {})
+    except (OSError, ValueError):
+        pass
+
+    filenames = []
+    if os.path.isdir(path):
+        filenames = sorted(
+            name for name in os.listdir(path)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+    images = [f'slider/{name}' for name in filenames] or FALLBACK_IMAGES
+
+    slides = []
+    for image in images[:MAX_SLIDES]:
+        entry = manifest.get(os.path.basename(image), {})
+        variants = entry.get('variants', [])
+        fallback = variants[-1]['jpeg'] if variants else image
+        slides.append({
+            'src': _media_url(fallback),
+            'width': entry.get('width'),
+            'height': entry.get('height'),
+            'srcset_webp': _srcset(variants, 'webp'),
+            'srcset_jpeg': _srcset(variants, 'jpeg'),
+        })
+    return slides
+
+
+class SliderManifest:
+    """
+    Кэш списка слайдов в памяти процесса.
+
+    Список пересобирается только при изменении mtime папки слайдера,
+    а сам stat выполняется не чаще раза в check_interval секунд.
+    """
+
+    def __init__(self, check_interval=5.0):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._slides = None
+        self._mtime = None
+        self._checked_at = 0.0
+
+    def _current_mtime(self):
+        try:
+            return os.stat(slider_dir()).st_mtime_ns
+        except OSError:
+            return None
+
+    def get(self):
+        now = time.monotonic()
+        if self._slides is not None and now - self._checked_at < self.check_interval:
+            return self._slides
+        with self._lock:
+            mtime = self._current_mtime()
+            if self._slides is None or mtime != self._mtime:
+                self._slides = build_slides()
+                self._mtime = mtime
+            self._checked_at = now
+            return self._slides
+
+    def clear(self):
+        with self._lock:
+            self._slides = None
+
+
+slider_manifest = SliderManifest()
+
+
+def get_slider_images():
+    return slider_manifest.get()
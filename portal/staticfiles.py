@@ -0,0 +1,63 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него создаются только .gz
+    brotli = None
+
+
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.js', '.mjs', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ico', '.ttf', '.otf',
+}
+# Сжатая копия, которая экономит меньше 5%, не сохраняется
+MIN_COMPRESSION_RATIO = 0.95
+
+ENCODINGS = {
+    'br': '.br',
+    'gzip': '.gz',
+}
+
+
+def compress_file(path):
+    """Создает рядом с файлом .gz (и .br, если установлен brotli); возвращает их пути"""
+    with open(path, 'rb') as fileobj:
+        data = fileobj.read()
+    variants = [('.gz', lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', lambda raw: brotli.compress(raw, quality=11)))
+
+    created = []
+    for suffix, compress in variants:
+        compressed = compress(data)
+        if len(compressed) >= len(data) * MIN_COMPRESSION_RATIO:
+            continue
+        with open(path + suffix, 'wb') as fileobj:
+            fileobj.write(compressed)
+        created.append(path + suffix)
+    return created
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage, который при collectstatic дополнительно
+    сохраняет сжатые копии (gzip и brotli) для отдачи без сжатия на лету
+    (см. portal.assets).
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not isinstance(processed, Exception):
+                names.add(name)
+                if hashed_name:
+                    names.add(hashed_name)
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS and self.exists(name):
+                compress_file(self.path(name))
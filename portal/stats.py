@@ -0,0 +1,126 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import Application, ApplicationStat
+
+
+def stat_key(course_id, status, created_at, payment_method):
+    return (course_id, status, timezone.localdate(created_at), payment_method)
+
+
+def apply_deltas(deltas):
+    """Прибавляет к счетчикам словарь {(course_id, status, day, payment_method): delta}"""
+    for (course_id, status, day, payment_method), delta in deltas.items():
+        if not delta:
+            continue
+        lookup = {
+            'course_id': course_id,
+            'status': status,
+            'day': day,
+            'payment_method': payment_method,
+        }
+        if ApplicationStat.objects.filter(**lookup).update(count=F('count') + delta):
+            continue
+        if delta < 0:
+            # Строки нет (например, курс удаляется каскадом) — уменьшать нечего
+            continue
+        try:
+            with transaction.atomic():
+                ApplicationStat.objects.create(count=delta, **lookup)
+        except IntegrityError:
+            # Строку успел создать параллельный запрос
+            ApplicationStat.objects.filter(**lookup).update(count=F('count') + delta)
+
+
+def record_application_saved(application, created):
+    deltas = defaultdict(int)
+    current = stat_key(
+        application.course_id, application.status,
+        application.created_at, application.payment_method,
+    )
+    original = getattr(application, '_original', None)
+    if created or original is None or original['created_at'] is None:
+        deltas[current] += 1
+    else:
+        previous = stat_key(
+            original['course_id'], original['status'],
+            original['created_at'], original['payment_method'],
+        )
+        if previous != current:
+            deltas[previous] -= 1
+            deltas[current] += 1
+    apply_deltas(deltas)
+    application.remember_original()
+
+
+def record_application_deleted(application):
+    original = getattr(application, '_original', None) or {}
+    apply_deltas({
+        stat_key(
+            original.get('course_id') or application.course_id,
+            original.get('status') or application.status,
+            original.get('created_at') or application.created_at,
+            original.get('payment_method') or application.payment_method,
+        ): -1,
+    })
+
+
+def record_rows_updated(rows, fields):
+    """Массовое изменение: rows — прежние значения, fields — новые"""
+    deltas = defaultdict(int)
+    for row in rows:
+        new = {**row, **fields}
+        deltas[stat_key(row['course_id'], row['status'], row['created_at'], row['payment_method'])] -= 1
+        deltas[stat_key(new['course_id'], new['status'], new['created_at'], new['payment_method'])] += 1
+    apply_deltas(deltas)
+
+
+def record_rows_created(rows):
+    """Для bulk_create, который не отправляет post_save"""
+    deltas = defaultdict(int)
+    for row in rows:
+        deltas[stat_key(row['course_id'], row['status'], row['created_at'], row['payment_method'])] += 1
+    apply_deltas(deltas)
+
+
+def dashboard_stats(days=30):
+    """Сводка для панели администратора; читает только таблицу счетчиков"""
+    from .catalog import get_catalog
+
+    catalog = get_catalog()
+    stats = ApplicationStat.objects.filter(count__gt=0)
+    statuses = dict(Application.Status.choices)
+    payments = dict(Application.PaymentMethod.choices)
+
+    by_status = [
+        {'label': statuses.get(row['status'], row['status']), 'total': row['total']}
+        for row in stats.values('status').annotate(total=Sum('count')).order_by('status')
+    ]
+    by_payment = [
+        {'label': payments.get(row['payment_method'], row['payment_method']), 'total': row['total']}
+        for row in stats.values('payment_method').annotate(total=Sum('count')).order_by('payment_method')
+    ]
+    by_course = [
+        {
+            'label': catalog.by_id.get(row['course_id'], {}).get('title', f'#{row["course_id"]}'),
+            'total': row['total'],
+        }
+        for row in stats.values('course_id').annotate(total=Sum('count')).order_by('-total')
+    ]
+    since = timezone.localdate() - timedelta(days=days - 1)
+    by_day = list(
+        stats.filter(day__gte=since)
+        .values('day').annotate(total=Sum('count')).order_by('day')
+    )
+    return {
+        'total': sum(row['total'] for row in by_status),
+        'by_status': by_status,
+        'by_payment': by_payment,
+        'by_course': by_course,
+        'by_day': by_day,
+        'days': days,
+    }
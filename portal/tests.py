@@ -1,3 +1,1233 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import sqlite3
+import tempfile
+from collections import Counter
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.apps import apps
+from django.contrib.auth import aauthenticate
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import caches
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import F, Max, Sum
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils import timezone
+
+from . import availability, events, jobs, ratelimit, search, slider, urls, warmup
+from .apps import PortalConfig
+from .assets import (
+    IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, AssetServer, AssetsASGIMiddleware, _parse_range,
+)
+from .backends import CachedModelBackend
+from .catalog import bump_catalog_version, get_catalog, get_catalog_version
+from .export import ExportReader, aiter_csv, export_headers, export_rows, iter_csv, write_xlsx
+from .forms import ApplicationForm
+from .hashing import acheck_password, hashing_executor
+from .models import Application, ApplicationStat, Course, CustomUser, Job, UnifiedApplication
+from .profiling import PerfStats, ProfilingMiddleware, load_hashing_stats, load_samples, summarize
+from .pagination import CursorError, decode_cursor, encode_cursor, keyset_paginate
+from .staticfiles import CompressedManifestStaticFilesStorage
+from .stats import record_rows_created
+
+
+# Бюджет SQL-запросов для каждого представления portal.views.
+# Запрос выполняется на двух объемах данных (SIZES), число запросов должно
+# совпасть и не превышать budget. Кэш и индекс логинов перед запросом
+# очищаются, то есть бюджет — для холодного кэша.
+#   auth   — кто выполняет запрос: None, 'user' (владелец заявок) или 'admin'
+#   method — 'get' (по умолчанию) или 'post'
+#   data   — функция (тест) -> параметры запроса
+#   name   — подпись варианта, если у представления их несколько
+QUERY_BUDGETS = [
+    {'url': 'home', 'budget': 0},
+    {'url': 'register', 'budget': 0},
+    {'url': 'register', 'method': 'post', 'budget': 5, 'data': lambda test: {
+        'username': 'newstudent', 'full_name': 'Новый Студент', 'phone': '89001112233',
+        'email': 'new@example.com', 'password': 'password123',
+    }},
+    {'url': 'check_availability', 'name': 'свободны', 'budget': 3, 'data': lambda test: {
+        'username': 'freename', 'email': 'free@example.com',
+    }},
+    {'url': 'check_availability', 'name': 'заняты', 'budget': 5, 'data': lambda test: {
+        'username': test.student.username.upper(), 'email': test.student.email,
+    }},
+    {'url': 'login', 'budget': 0},
+    {'url': 'login', 'method': 'post', 'budget': 5, 'data': lambda test: {
+        'username': test.student.username, 'password': 'password123',
+    }},
+    {'url': 'logout', 'auth': 'user', 'budget': 4},
+    {'url': 'profile', 'auth': 'user', 'budget': 5},
+    {'url': 'profile', 'auth': 'user', 'method': 'post', 'budget': 5, 'data': lambda test: {
+        'application_id': test.student_application.id, 'feedback': 'Спасибо за курс',
+    }},
+    # Тестовый клиент — WSGI, поэтому поток не открывается (204)
+    {'url': 'application_events', 'auth': 'user', 'budget': 2},
+    {'url': 'edit_profile', 'auth': 'user', 'budget': 2},
+    {'url': 'create_application', 'auth': 'user', 'budget': 4},
+    {'url': 'create_application', 'auth': 'user', 'method': 'post', 'budget': 9, 'data': lambda test: {
+        'course': test.courses[0].id, 'desired_start_date': '2030-01-01', 'payment_method': 'cash',
+    }},
+    {'url': 'admin_dashboard', 'auth': 'admin', 'budget': 11},
+    {'url': 'admin_dashboard', 'name': 'фильтры', 'auth': 'admin', 'budget': 11, 'data': lambda test: {
+        'status': 'new', 'course': test.courses[0].id,
+    }},
+    {'url': 'admin_dashboard', 'name': 'поиск', 'auth': 'admin', 'budget': 12, 'data': lambda test: {'q': 'Студент'}},
+    {'url': 'bulk_status', 'auth': 'admin', 'method': 'post', 'budget': 15, 'data': lambda test: {
+        'application_ids': [app.id for app in test.applications], 'status': 'completed',
+    }},
+    {'url': 'export_applications', 'auth': 'admin', 'budget': 3, 'data': lambda test: {'format': 'csv'}},
+    # Админка: списки без N+1 и без COUNT(*) по всей таблице
+    {'url': 'admin:portal_application_changelist', 'auth': 'admin', 'budget': 4},
+    {'url': 'admin:portal_application_changelist', 'name': 'поиск', 'auth': 'admin', 'budget': 4,
+     'data': lambda test: {'q': 'Студент', 'status__exact': 'new'}},
+    {'url': 'admin:portal_application_changelist', 'name': 'list_editable', 'auth': 'admin', 'method': 'post',
+     'budget': 18, 'data': lambda test: {
+        '_save': 'Сохранить',
+        'form-TOTAL_FORMS': len(test.applications),
+        'form-INITIAL_FORMS': len(test.applications),
+        **{f'form-{i}-id': app.id for i, app in enumerate(test.applications)},
+        **{f'form-{i}-status': 'in_progress' for i in range(len(test.applications))},
+    }},
+    {'url': 'admin:portal_customuser_changelist', 'auth': 'admin', 'budget': 5},
+    {'url': 'admin:portal_course_changelist', 'auth': 'admin', 'budget': 4},
+    {'url': 'admin:portal_application_add', 'auth': 'admin', 'budget': 2},
+    {'url': 'admin:autocomplete', 'auth': 'admin', 'budget': 4, 'data': lambda test: {
+        'term': 'student', 'app_label': 'portal', 'model_name': 'application', 'field_name': 'user',
+    }},
+]
+
+# Число пользователей и заявок на каждого; курсы и даты одинаковые,
+# чтобы меняться могло только количество строк
+SIZES = [(3, 2), (30, 5)]
+
+# Служебные запросы transaction.atomic в бюджет не входят
+SAVEPOINT_SQL = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+def normalize_sql(sql):
+    """Заменяет значения на ?, чтобы запросы к разным строкам совпадали"""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+\b', '?', sql)
+    return re.sub(r'\(\?(?:, \?)*\)', '(...)', sql)
+
+
+def describe_queries(queries):
+    counts = Counter(normalize_sql(query['sql']) for query in queries)
+    lines = [f'Запросов: {len(queries)}']
+    duplicates = [(sql, count) for sql, count in counts.most_common() if count > 1]
+    if duplicates:
+        lines.append('Повторяющиеся запросы:')
+        lines.extend(f'  {count}x {sql}' for sql, count in duplicates)
+    lines.append('Все запросы:')
+    lines.extend(f'  {query["sql"]}' for query in queries)
+    return '\n'.join(lines)
+
+
+# Корзины ограничения частоты хранятся в файле и переживают запуск тестов,
+# а к основной базе не обращаются — в бюджетах они не нужны
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    PORTAL_RATE_LIMITS={},
+)
+class QueryBudgetTests(TestCase):
+    """Число SQL-запросов представлений не зависит от объема данных"""
+
+    def seed(self, users, per_user):
+        self.courses = [
+            Course.objects.create(title=f'Курс {i}', description='Описание') for i in range(3)
+        ]
+        self.admin = CustomUser.objects.create_superuser(
+            'admin_user', 'admin@example.com', 'password123',
+            full_name='Администратор', phone='89000000000',
+        )
+        students = [
+            CustomUser.objects.create_user(
+                f'student{i:03d}', f'student{i}@example.com', 'password123',
+                full_name='Студент Тестовый', phone=f'8900{i:07d}',
+            )
+            for i in range(users)
+        ]
+        self.student = students[0]
+        self.applications = Application.objects.bulk_create([
+            Application(
+                user=student, course=self.courses[n % len(self.courses)],
+                desired_start_date=date(2030, 1, 1), payment_method='cash',
+            )
+            for n, student in enumerate(students * per_user)
+        ])
+        record_rows_created([
+            {'course_id': app.course_id, 'status': app.status,
+             'created_at': app.created_at, 'payment_method': app.payment_method}
+            for app in self.applications
+        ])
+        self.student_application = self.applications[0]
+        bump_catalog_version()
+
+    def measure(self, case, users, per_user):
+        sid = transaction.savepoint()
+        try:
+            self.seed(users, per_user)
+            self.client.logout()
+            if case.get('auth'):
+                self.client.force_login(self.admin if case['auth'] == 'admin' else self.student)
+            data = case['data'](self) if 'data' in case else {}
+            caches[settings.PORTAL_CACHE_ALIAS].clear()
+            availability.index.reset()
+            request = getattr(self.client, case.get('method', 'get'))
+            with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as context:
+                response = request(reverse(case['url']), data)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            self.assertLess(response.status_code, 400, f'{case["url"]}: HTTP {response.status_code}')
+            return [
+                query for query in context.captured_queries
+                if not query['sql'].startswith(SAVEPOINT_SQL)
+            ]
+        finally:
+            transaction.savepoint_rollback(sid)
+
+    def test_query_budgets(self):
+        for case in QUERY_BUDGETS:
+            label = ' '.join(filter(None, (
+                case.get('method', 'get').upper(), case['url'], case.get('name'),
+            )))
+            with self.subTest(label):
+                small, large = [self.measure(case, users, per_user) for users, per_user in SIZES]
+                self.assertEqual(
+                    len(small), len(large),
+                    f'{label}: число запросов растет вместе с данными '
+                    f'({len(small)} → {len(large)})\n{describe_queries(large)}',
+                )
+                self.assertLessEqual(
+                    len(large), case['budget'],
+                    f'{label}: превышен бюджет {case["budget"]}\n{describe_queries(large)}',
+                )
+
+    def test_every_view_has_budget(self):
+        covered = {case['url'] for case in QUERY_BUDGETS}
+        missing = [pattern.name for pattern in urls.urlpatterns if pattern.name not in covered]
+        self.assertEqual(missing, [], 'Нет бюджета запросов для представлений')
+
+
+
+class PortalDataMixin:
+    """Пользователи, курсы и заявки для тестов поведения"""
+
+    def create_student(self, n=0):
+        return CustomUser.objects.create_user(
+            f'student{n:03d}', f'student{n}@example.com', 'password123',
+            full_name='Студент Тестовый', phone=f'8900{n:07d}',
+        )
+
+    def create_admin(self):
+        return CustomUser.objects.create_superuser(
+            'admin_user', 'admin@example.com', 'password123',
+            full_name='Администратор', phone='89000000000',
+        )
+
+    def create_application(self, user, course, **fields):
+        fields.setdefault('desired_start_date', date(2030, 1, 1))
+        fields.setdefault('payment_method', 'cash')
+        return Application.objects.create(user=user, course=course, **fields)
+
+
+class KeysetPaginationTests(PortalDataMixin, TestCase):
+    def setUp(self):
+        student = self.create_student()
+        course = Course.objects.create(title='Курс', description='Описание')
+        applications = [self.create_application(student, course) for _ in range(7)]
+        # Пары заявок с одинаковой датой: порядок внутри пары задает id
+        base = applications[0].created_at
+        for n, app in enumerate(applications):
+            Application.objects.filter(pk=app.pk).update(created_at=base - timedelta(minutes=n // 2))
+        self.expected = list(
+            Application.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+    def pages_forward(self, per_page):
+        pages, cursor = [], None
+        while True:
+            page = keyset_paginate(Application.objects.all(), after=cursor, per_page=per_page)
+            pages.append(page)
+            if not page.has_next:
+                return pages
+            cursor = page.next_cursor
+
+    def test_cursor_round_trip(self):
+        app = Application.objects.first()
+        self.assertEqual(decode_cursor(encode_cursor(app.created_at, app.id)), (app.created_at, app.id))
+        for bad in ('', 'не-курсор', encode_cursor(app.created_at, app.id)[:-3]):
+            with self.assertRaises(CursorError):
+                decode_cursor(bad)
+
+    def test_forward_pages_cover_all_rows_once(self):
+        for per_page in (1, 2, 3, 7, 10):
+            with self.subTest(per_page=per_page):
+                pages = self.pages_forward(per_page)
+                ids = [app.id for page in pages for app in page]
+                self.assertEqual(ids, self.expected)
+                self.assertFalse(pages[0].has_previous)
+                self.assertTrue(all(len(page) == per_page for page in pages[:-1]))
+
+    def test_backward_pages_match_forward_pages(self):
+        pages = self.pages_forward(2)
+        cursor = pages[-1].prev_cursor
+        for expected in reversed(pages[:-1]):
+            page = keyset_paginate(Application.objects.all(), before=cursor, per_page=2)
+            self.assertEqual([app.id for app in page], [app.id for app in expected])
+            cursor = page.prev_cursor
+        self.assertIsNone(cursor)
+
+
+class CatalogVersionTests(PortalDataMixin, TestCase):
+    def setUp(self):
+        caches[settings.PORTAL_CACHE_ALIAS].clear()
+        self.course = Course.objects.create(title='Курс', description='Описание')
+
+    def test_update_bypassing_signals_changes_version(self):
+        version = get_catalog_version()
+        # Массовый UPDATE не отправляет сигналы — версию меняет триггер
+        Course.objects.filter(pk=self.course.pk).update(is_active=False)
+        caches[settings.PORTAL_CACHE_ALIAS].clear()
+        self.assertNotEqual(get_catalog_version(), version)
+        self.assertEqual(get_catalog().active_choices(), [])
+
+    def test_closed_course_rejected_while_snapshot_is_stale(self):
+        get_catalog()
+        Course.objects.filter(pk=self.course.pk).update(is_active=False)
+        form = ApplicationForm(data={
+            'course': self.course.pk, 'desired_start_date': '2030-01-01', 'payment_method': 'cash',
+        })
+        self.assertFalse(form.is_valid())
+        self.assertIn('course', form.errors)
+
+
+class BulkStatusTests(PortalDataMixin, TestCase):
+    def setUp(self):
+        course = Course.objects.create(title='Курс', description='Описание')
+        self.students = [self.create_student(n) for n in range(2)]
+        self.applications = [
+            self.create_application(student, course) for student in self.students for _ in range(2)
+        ]
+        self.done = self.create_application(self.students[0], course, status='completed')
+        self.client.force_login(self.create_admin())
+
+    def post_json(self, ids, status):
+        return self.client.post(
+            reverse('bulk_status'),
+            json.dumps({'application_ids': ids, 'status': status}),
+            content_type='application/json',
+        )
+
+    def test_only_changed_applications_are_returned(self):
+        ids = [app.id for app in self.applications] + [self.done.id]
+        response = self.post_json(ids, 'completed')
+        self.assertEqual(response.status_code, 200)
+        updated = [row['id'] for row in response.json()['updated']]
+        self.assertCountEqual(updated, [app.id for app in self.applications])
+        self.assertEqual(Application.objects.filter(status='completed').count(), 5)
+
+    def test_stats_and_notifications_follow_the_update(self):
+        self.post_json([app.id for app in self.applications], 'in_progress')
+        totals = dict(
+            ApplicationStat.objects.values_list('status').annotate(total=Sum('count'))
+        )
+        self.assertEqual(totals.get('new'), 0)
+        self.assertEqual(totals.get('in_progress'), 4)
+        # Одно уведомление на пользователя, а не на заявку
+        self.assertEqual(Job.objects.filter(kind='status_changed').count(), 2)
+
+    def test_invalid_status_is_rejected(self):
+        response = self.post_json([self.done.id], 'unknown')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status', response.json()['errors'])
+
+
+class ExportTests(PortalDataMixin, TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(title='Курс', description='Описание')
+        self.student = self.create_student()
+        self.applications = [
+            self.create_application(self.student, self.course, feedback=feedback)
+            for feedback in ('=HYPERLINK("http://example.com")', '+1', '-1', '@SUM(A1)', 'Спасибо')
+        ]
+
+    def feedback_column(self, rows):
+        index = export_headers().index('Отзыв')
+        return [row[index] for row in rows]
+
+    def test_formulas_are_escaped(self):
+        self.assertEqual(self.feedback_column(export_rows(Application.objects.all())), [
+            'Спасибо', "'@SUM(A1)", "'-1", "'+1", '\'=HYPERLINK("http://example.com")',
+        ])
+
+    def test_xlsx_cells_are_text(self):
+        from openpyxl import load_workbook
+
+        with tempfile.TemporaryFile() as fileobj:
+            write_xlsx(Application.objects.all(), fileobj)
+            fileobj.seek(0)
+            rows = list(load_workbook(fileobj).active.iter_rows(min_row=2, values_only=True))
+        self.assertTrue(all(value.startswith("'") for value in self.feedback_column(rows)[1:]))
+
+    def test_batches_cover_all_rows_once(self):
+        reader = ExportReader(Application.objects.all(), chunk_size=2)
+        ids = [row[0] for row in reader]
+        self.assertEqual(ids, [app.id for app in reversed(self.applications)])
+
+    def test_async_csv_matches_sync_csv(self):
+        async def collect():
+            return [chunk async for chunk in aiter_csv(Application.objects.all())]
+
+        self.assertEqual(
+            ''.join(async_to_sync(collect)()),
+            ''.join(iter_csv(Application.objects.all())),
+        )
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportEnrollmentsTests(PortalDataMixin, TestCase):
+    def setUp(self):
+        Course.objects.create(title='Курс', description='Описание')
+        bump_catalog_version()
+        self.create_student(1)
+        availability.index.reset()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def run_import(self, rows):
+        path = f'{self.directory.name}/users.jsonl'
+        with open(path, 'w', encoding='utf-8') as fh:
+            for n, (username, email) in enumerate(rows):
+                fh.write(json.dumps({
+                    'username': username, 'email': email, 'full_name': 'Студент Импортный',
+                    'phone': f'8911{n:07d}', 'password': 'password123', 'course': 'Курс',
+                    'desired_start_date': '2030-01-01', 'payment_method': 'cash',
+                }) + '\n')
+        call_command('import_enrollments', path, workers=1, stdout=io.StringIO())
+        with open(f'{path}.errors.csv', encoding='utf-8') as fh:
+            return {line_no: message for line_no, message in csv.reader(fh)}
+
+    def test_duplicates_differing_in_case_are_rejected(self):
+        errors = self.run_import([
+            ('STUDENT001', 'new1@example.com'),
+            ('freshman', 'Student1@Example.com'),
+            ('newcomer', 'new2@example.com'),
+            ('NewComer', 'new3@example.com'),
+        ])
+        self.assertEqual(errors, {
+            '1': 'Логин STUDENT001 уже занят',
+            '2': 'Email Student1@Example.com уже занят',
+            '4': 'Логин NewComer уже занят',
+        })
+        self.assertTrue(CustomUser.objects.filter(username='newcomer').exists())
+        self.assertEqual(CustomUser.objects.count(), 2)
+
+    def test_imported_users_are_taken_in_availability_index(self):
+        availability.index.filters()
+        self.run_import([('imported', 'imported@example.com')])
+        self.assertTrue(availability.index.might_contain('username', 'Imported'))
+        self.assertTrue(availability.index.might_contain('email', 'imported@example.com'))
+
+
+class PasswordHashingTests(PortalDataMixin, TestCase):
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+    def setUp(self):
+        self.student = self.create_student()
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ])
+    def test_outdated_hash_is_upgraded(self):
+        self.assertTrue(async_to_sync(acheck_password)(self.student, 'password123'))
+        self.student.refresh_from_db()
+        self.assertTrue(self.student.password.startswith('pbkdf2_sha256$'))
+        self.assertFalse(async_to_sync(acheck_password)(self.student, 'wrong-password'))
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+    def test_login_goes_through_backends(self):
+        failed = []
+        handler = lambda sender, credentials, **kwargs: failed.append(credentials['username'])
+        user_login_failed.connect(handler)
+        self.addCleanup(user_login_failed.disconnect, handler)
+
+        user = async_to_sync(aauthenticate)(username=self.student.username, password='password123')
+        self.assertEqual(user, self.student)
+        self.assertEqual(user.backend, 'portal.backends.CachedModelBackend')
+        self.assertIsNone(async_to_sync(aauthenticate)(username=self.student.username, password='wrong'))
+        self.assertIsNone(async_to_sync(aauthenticate)(username='nobody', password='wrong'))
+        self.assertEqual(failed, [self.student.username, 'nobody'])
+
+    def test_pool_stats_reach_perfstats(self):
+        with tempfile.TemporaryDirectory() as directory:
+            stats = PerfStats(directory=directory)
+            stats.flush()
+            completed = hashing_executor.stats()['completed']
+            self.assertEqual(load_hashing_stats(directory)['processes'], 1)
+            out = io.StringIO()
+            call_command('perfstats', dir=directory, stdout=out)
+        self.assertIn(f'выполнено {completed}, отклонено', out.getvalue())
+
+
+class CachedUserBackendTests(PortalDataMixin, TestCase):
+    def setUp(self):
+        caches[settings.PORTAL_CACHE_ALIAS].clear()
+        self.student = self.create_student()
+        self.backend = CachedModelBackend()
+
+    @override_settings(PORTAL_CACHE_SHARED=False)
+    def test_process_cache_is_not_used_for_users(self):
+        self.assertEqual(self.backend.get_user(self.student.pk), self.student)
+        # Изменение из другого процесса: сигналы здесь не срабатывают
+        CustomUser.objects.filter(pk=self.student.pk).update(is_active=False)
+        self.assertIsNone(self.backend.get_user(self.student.pk))
+
+    @override_settings(PORTAL_CACHE_SHARED=True)
+    def test_shared_cache_serves_users(self):
+        self.backend.get_user(self.student.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.backend.get_user(self.student.pk), self.student)
+
+
+class ConditionalGetTests(PortalDataMixin, TestCase):
+    def setUp(self):
+        course = Course.objects.create(title='Курс', description='Описание')
+        self.student = self.create_student()
+        self.applications = [self.create_application(self.student, course) for _ in range(2)]
+
+    def assertChangedAfter(self, url, change):
+        # Первый ответ выдает CSRF-cookie, а она входит в ETag
+        self.client.get(reverse(url))
+        etag = self.client.get(reverse(url))['ETag']
+        self.assertEqual(self.client.get(reverse(url), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        change()
+        self.assertEqual(self.client.get(reverse(url), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def delete_without_signals(self):
+        # Как удаление из другого процесса: сигналы и кэш этого процесса не участвуют
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM portal_application WHERE id = %s', [self.applications[0].id])
+
+    def test_dashboard_etag_changes_after_delete(self):
+        self.client.force_login(self.create_admin())
+        self.assertChangedAfter('admin_dashboard', self.delete_without_signals)
+
+    def test_profile_etag_changes_after_delete(self):
+        self.client.force_login(self.student)
+        self.assertChangedAfter('profile', self.delete_without_signals)
+
+    def test_user_update_touches_applications(self):
+        before = Application.objects.get(pk=self.applications[0].pk).updated_at
+        CustomUser.objects.filter(pk=self.student.pk).update(full_name='Студент Переименованный')
+        after = Application.objects.get(pk=self.applications[0].pk).updated_at
+        self.assertGreater(after, before)
+        self.assertEqual(
+            Application.objects.aggregate(value=Max('updated_at'))['value'], after,
+        )
+
+
+@override_settings(PORTAL_EVENTS_SOCKET_DIR=None)
+class ApplicationEventsTests(PortalDataMixin, TestCase):
+    def setUp(self):
+        course = Course.objects.create(title='Курс', description='Описание')
+        self.student = self.create_student()
+        self.old, self.changed = [self.create_application(self.student, course) for _ in range(2)]
+        Application.objects.filter(pk=self.changed.pk).update(
+            status='in_progress', updated_at=self.old.updated_at + timedelta(seconds=1),
+        )
+        self.changed.refresh_from_db()
+
+    def test_missed_events_after_last_event_id(self):
+        missed = events.missed_events(self.student.pk, str(self.old.version))
+        self.assertEqual([event['data']['id'] for event in missed], [self.changed.id])
+        self.assertEqual(missed[0]['id'], self.changed.version)
+        self.assertEqual(missed[0]['data']['status'], 'in_progress')
+        self.assertEqual(events.missed_events(self.student.pk, 'garbage'), [])
+
+    def test_format_event(self):
+        self.assertEqual(
+            events.format_event({'id': 7, 'event': 'application', 'data': {'status': 'Новая'}}),
+            'id: 7\nevent: application\ndata: {"status": "Новая"}\n\n',
+        )
+
+    def test_stream_catches_up_then_delivers_published_events(self):
+        async def scenario():
+            stream = events.stream(self.student.pk, str(self.old.version))
+            try:
+                chunks = [await anext(stream), await anext(stream)]
+                waiting = asyncio.ensure_future(anext(stream))
+                await asyncio.sleep(0)
+                await sync_to_async(events.publish_applications)([self.old.id])
+                chunks.append(await asyncio.wait_for(waiting, 5))
+            finally:
+                await stream.aclose()
+            return chunks
+
+        retry, missed, published = async_to_sync(scenario)()
+        self.assertTrue(retry.startswith('retry: '))
+        self.assertIn(f'id: {self.changed.version}\n', missed)
+        self.assertIn(f'id: {self.old.version}\n', published)
+        self.assertNotIn(self.student.pk, events.broker._subscribers)
+
+
+@override_settings(PORTAL_JOB_RETRY_DELAY=30, PORTAL_JOB_MAX_ATTEMPTS=2, PORTAL_JOB_TIMEOUT=60)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.failing = False
+        jobs.register('test')(self.handler)
+        self.addCleanup(jobs.HANDLERS.pop, 'test', None)
+
+    def handler(self, payloads):
+        self.calls.append(payloads)
+        if self.failing:
+            raise RuntimeError('сбой')
+
+    def execute_failing(self, batch):
+        with self.assertLogs('portal.jobs', 'ERROR'):
+            return jobs.execute(batch)
+
+    def test_pending_key_is_deduplicated(self):
+        jobs.enqueue([jobs.new_job('test', {'n': 1}, key='same')])
+        jobs.enqueue([jobs.new_job('test', {'n': 2}, key='same'), jobs.new_job('test', {'n': 3})])
+        self.assertEqual(sorted(job.payload['n'] for job in Job.objects.all()), [1, 3])
+
+    def test_claim_takes_whole_batch(self):
+        jobs.enqueue([
+            jobs.new_job('test', {'n': 1}, batch_key='user:1'),
+            # Время еще не наступило, но уходит вместе со своей пачкой
+            jobs.new_job('test', {'n': 2}, batch_key='user:1', delay=600),
+            jobs.new_job('test', {'n': 3}, batch_key='user:2', delay=600),
+        ])
+        batches = jobs.claim('worker', limit=10)
+        self.assertEqual([[job.payload['n'] for job in batch] for batch in batches], [[1, 2]])
+        self.assertEqual(jobs.claim('worker', limit=10), [])
+        self.assertTrue(jobs.execute(batches[0]))
+        self.assertEqual(self.calls, [[{'n': 1}, {'n': 2}]])
+        self.assertEqual(list(Job.objects.values_list('payload', flat=True)), [{'n': 3}])
+
+    def test_failed_job_is_retried_then_marked_failed(self):
+        self.failing = True
+        jobs.enqueue([jobs.new_job('test', {'n': 1})])
+        self.assertFalse(self.execute_failing(jobs.claim('worker', limit=1)[0]))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.Status.PENDING, 1))
+        self.assertGreaterEqual(job.run_after, timezone.now() + timedelta(seconds=29))
+        self.assertIn('сбой', job.last_error)
+
+        Job.objects.update(run_after=timezone.now())
+        self.assertFalse(self.execute_failing(jobs.claim('worker', limit=1)[0]))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.Status.FAILED, 2))
+        self.assertEqual(jobs.claim('worker', limit=1), [])
+
+    def test_retry_dropped_when_same_job_is_queued_again(self):
+        self.failing = True
+        jobs.enqueue([jobs.new_job('test', {'n': 1}, key='same')])
+        batch = jobs.claim('worker', limit=1)[0]
+        jobs.enqueue([jobs.new_job('test', {'n': 2}, key='same')])
+        self.execute_failing(batch)
+        self.assertEqual(list(Job.objects.values_list('payload', flat=True)), [{'n': 2}])
+
+    def test_stale_running_job_is_reclaimed(self):
+        jobs.enqueue([jobs.new_job('test', {'n': 1})])
+        jobs.claim('crashed', limit=1)
+        self.assertEqual(jobs.claim('worker', limit=1), [])
+        Job.objects.update(locked_at=timezone.now() - timedelta(seconds=61))
+        (job,), = jobs.claim('worker', limit=1)
+        self.assertEqual(job.attempts, 2)
+        self.assertTrue(job.locked_by.startswith('worker:'))
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    PORTAL_RATE_LIMITS={'login': [('username', 3, 60)]},
+)
+class RateLimitTests(PortalDataMixin, TestCase):
+    def setUp(self):
+        self.student = self.create_student()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f'{directory.name}/ratelimit.sqlite3'
+        limits = override_settings(PORTAL_RATE_LIMIT_DB=self.path)
+        limits.enable()
+        self.addCleanup(limits.disable)
+        self.addCleanup(setattr, ratelimit, 'local_store', ratelimit.local_store)
+        ratelimit.local_store = ratelimit.LocalBucketStore()
+
+    def hammer(self, times):
+        return [
+            self.client.post(reverse('login'), {
+                'username': self.student.username, 'password': 'wrong-password',
+            }).status_code
+            for _ in range(times)
+        ]
+
+    def test_bucket_exhausted(self):
+        self.assertEqual(self.hammer(5), [200, 200, 200, 429, 429])
+        response = self.client.post(reverse('login'), {'username': self.student.username.upper()})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+    def test_limit_holds_while_bucket_file_is_locked(self):
+        ratelimit.get_store()._connection()
+        locker = sqlite3.connect(self.path, isolation_level=None)
+        self.addCleanup(locker.close)
+        locker.execute('BEGIN EXCLUSIVE')
+        with self.assertLogs('portal.ratelimit', 'WARNING'):
+            self.assertEqual(self.hammer(4), [200, 200, 200, 429])
+        locker.execute('ROLLBACK')
+
+
+@override_settings(PORTAL_RATE_LIMITS={})
+class AvailabilityTests(PortalDataMixin, TestCase):
+    def setUp(self):
+        availability.index.reset()
+        self.addCleanup(availability.index.reset)
+        availability.index.filters()
+
+    def check(self, **params):
+        return self.client.get(reverse('check_availability'), params).json()
+
+    @override_settings(PORTAL_AVAILABILITY_CHECK_INTERVAL=0)
+    def test_user_registered_in_another_process_is_taken(self):
+        # bulk_create не отправляет post_save — о пользователе знает только счетчик в базе
+        CustomUser.objects.bulk_create([CustomUser(
+            username='elsewhere', email='elsewhere@example.com',
+            full_name='Студент Тестовый', phone='89001234567',
+        )])
+        result = self.check(username='ElseWhere', email='ELSEWHERE@example.com')
+        self.assertFalse(result['username']['available'])
+        self.assertFalse(result['email']['available'])
+
+    @override_settings(PORTAL_AVAILABILITY_CHECK_INTERVAL=0)
+    def test_rename_in_another_process_rebuilds_filter(self):
+        student = self.create_student()
+        CustomUser.objects.filter(pk=student.pk).update(username='renamed')
+        self.assertTrue(availability.index.might_contain('username', 'renamed'))
+        # Фильтр пересобран: старого логина в нем больше нет
+        self.assertFalse(availability.index.might_contain('username', student.username))
+
+    def test_filter_miss_needs_no_query(self):
+        self.create_student()
+        with self.assertNumQueries(0):
+            result = self.check(username='freename', email='free@example.com')
+        self.assertEqual(result, {'username': {'available': True}, 'email': {'available': True}})
+
+    def test_filter_hit_is_confirmed_by_database(self):
+        student = self.create_student()
+        # Удаление не сдвигает счетчик: значение остается в фильтре, но база его не находит
+        CustomUser.objects.filter(pk=student.pk).delete()
+        self.assertTrue(availability.index.might_contain('username', student.username))
+        result = self.check(username=student.username, email=student.email)
+        self.assertEqual(result, {'username': {'available': True}, 'email': {'available': True}})
+
+
+class ArchiveTests(PortalDataMixin, TestCase):
+    def setUp(self):
+        caches[settings.PORTAL_CACHE_ALIAS].clear()
+        course = Course.objects.create(title='Курс', description='Описание')
+        self.student = self.create_student()
+        self.old = self.create_application(self.student, course, status='completed')
+        self.recent = self.create_application(self.student, course, status='completed')
+        self.active = self.create_application(self.student, course)
+        Application.objects.filter(pk=self.old.pk).update(
+            updated_at=timezone.now() - timedelta(days=400),
+        )
+
+    def archive(self):
+        call_command('archive_applications', older_than=365, pause=0, stdout=io.StringIO())
+
+    def test_archived_rows_move_out_of_application(self):
+        self.archive()
+        self.assertFalse(Application.objects.filter(pk=self.old.pk).exists())
+        self.assertCountEqual(
+            Application.objects.values_list('id', flat=True), [self.recent.id, self.active.id],
+        )
+        self.assertEqual(
+            dict(UnifiedApplication.objects.filter(user=self.student).values_list('id', 'archived')),
+            {self.old.id: True, self.recent.id: False, self.active.id: False},
+        )
+        # Статистика по-прежнему учитывает архивную заявку
+        self.assertEqual(ApplicationStat.objects.aggregate(total=Sum('count'))['total'], 3)
+
+    def test_profile_shows_archive_after_cached_page(self):
+        self.client.force_login(self.student)
+        feedback_buttons = 'data-bs-target="#feedbackModal"'
+        self.client.get(reverse('profile'))
+        page = self.client.get(reverse('profile'))
+        etag = page['ETag']
+        self.assertContains(page, feedback_buttons, count=2)
+
+        # Команда не шлет сигналов: кабинет замечает перенос по базе
+        self.archive()
+        page = self.client.get(reverse('profile'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(page.status_code, 200)
+        self.assertContains(page, feedback_buttons, count=1)
+        self.assertContains(page, f'<tr data-application-id="{self.old.id}">')
+
+
+class SliderTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        media = override_settings(MEDIA_ROOT=tmp.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.dir = os.path.join(tmp.name, 'slider')
+        os.makedirs(self.dir)
+        slider.slider_manifest.clear()
+        self.addCleanup(slider.slider_manifest.clear)
+
+    def add_image(self, name, size=(1200, 600)):
+        from PIL import Image
+        Image.new('RGB', size, 'red').save(os.path.join(self.dir, name))
+
+    def test_manifest_rebuilt_only_on_mtime_change(self):
+        self.add_image('a.jpg')
+        manifest = slider.SliderManifest(check_interval=0)
+        with mock.patch('portal.slider.build_slides', wraps=slider.build_slides) as build:
+            first = manifest.get()
+            self.assertEqual(manifest.get(), first)
+            self.assertEqual(build.call_count, 1)
+
+            # Меняется только mtime папки — список пересобирается
+            self.add_image('b.jpg')
+            stat = os.stat(self.dir)
+            os.utime(self.dir, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            slides = manifest.get()
+            self.assertEqual(build.call_count, 2)
+        self.assertEqual([s['src'] for s in slides], ['/media/slider/a.jpg', '/media/slider/b.jpg'])
+
+    def test_check_interval_skips_stat(self):
+        self.add_image('a.jpg')
+        manifest = slider.SliderManifest(check_interval=60)
+        manifest.get()
+        with mock.patch.object(manifest, '_current_mtime') as current:
+            manifest.get()
+        current.assert_not_called()
+
+    def test_variants_and_srcset(self):
+        self.add_image('a.jpg', size=(1200, 600))
+        call_command('build_slider_variants', widths=[480, 960, 1440], stdout=io.StringIO())
+
+        with open(slider.manifest_path(), encoding='utf-8') as fh:
+            entry = json.load(fh)['images']['a.jpg']
+        self.assertEqual((entry['width'], entry['height']), (1200, 600))
+        # Больше оригинала не увеличиваем: 1440 заменяется на 1200
+        self.assertEqual(
+            [(v['width'], v['height']) for v in entry['variants']],
+            [(480, 240), (960, 480), (1200, 600)],
+        )
+        for variant in entry['variants']:
+            for key in ('webp', 'jpeg'):
+                self.assertTrue(os.path.exists(os.path.join(settings.MEDIA_ROOT, variant[key])))
+
+        [slide] = slider.get_slider_images()
+        self.assertEqual(slide['src'], '/media/slider/variants/a-1200.jpg')
+        self.assertEqual((slide['width'], slide['height']), (1200, 600))
+        self.assertEqual(
+            slide['srcset_webp'],
+            '/media/slider/variants/a-480.webp 480w, '
+            '/media/slider/variants/a-960.webp 960w, '
+            '/media/slider/variants/a-1200.webp 1200w',
+        )
+        self.assertEqual(
+            slide['srcset_jpeg'].split(', ')[0], '/media/slider/variants/a-480.jpg 480w',
+        )
+
+    def test_empty_dir_uses_fallback(self):
+        slides = slider.build_slides()
+        self.assertEqual([s['src'] for s in slides], [f'/media/{p}' for p in slider.FALLBACK_IMAGES])
+        self.assertEqual(slides[0]['srcset_webp'], '')
+
+
+class SearchTests(PortalDataMixin, TestCase):
+    def setUp(self):
+        self.student = self.create_student()
+        self.course = Course.objects.create(title='Веб-дизайн', description='Вёрстка и Figma')
+        self.application = self.create_application(self.student, self.course)
+
+    def found(self, query):
+        return set(search.search_applications(Application.objects.all(), query))
+
+    def test_inserted_rows_are_found(self):
+        self.assertEqual(set(search.search_courses(Course.objects.all(), 'вёрстка figma')), {self.course})
+        self.assertEqual(set(search.search_users(CustomUser.objects.all(), 'студент')), {self.student})
+        CustomUser.objects.filter(pk=self.student.pk).update(phone='+7 (900) 123-45-67')
+        # Телефон ищется и без разделителей
+        self.assertEqual(self.found('7900123'), {self.application})
+        self.assertEqual(self.found('student000'), {self.application})
+        self.assertEqual(self.found('дизайн'), {self.application})
+        other = self.create_application(self.create_student(1), Course.objects.create(
+            title='Python', description='Основы'), feedback='Отличный преподаватель')
+        self.assertEqual(self.found('преподаватель'), {other})
+
+    def test_updates_and_deletes_reach_index(self):
+        Course.objects.filter(pk=self.course.pk).update(title='Графика')
+        self.assertEqual(self.found('дизайн'), set())
+        self.assertEqual(self.found('графика'), {self.application})
+
+        Application.objects.filter(pk=self.application.pk).update(feedback='Понравилось')
+        self.assertEqual(self.found('понравилось'), {self.application})
+        Application.objects.filter(pk=self.application.pk).update(feedback='')
+        self.assertEqual(self.found('понравилось'), set())
+
+        CustomUser.objects.filter(pk=self.student.pk).update(full_name='Иван Петров')
+        self.assertEqual(self.found('петров'), {self.application})
+        self.assertEqual(self.found('тестовый'), set())
+
+        self.course.delete()
+        self.assertEqual(set(search.search_courses(Course.objects.all(), 'графика')), set())
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM portal_search WHERE rowid % 4 <> 0')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_rebuild_repopulates_index(self):
+        Application.objects.filter(pk=self.application.pk).update(feedback='Понравилось')
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM portal_search')
+        self.assertEqual(self.found('понравилось'), set())
+
+        out = io.StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Индекс пересоздан: 3 записей', out.getvalue())
+        self.assertEqual(self.found('понравилось'), {self.application})
+        self.assertEqual(self.found('дизайн'), {self.application})
+        self.assertEqual(self.found('студент'), {self.application})
+
+    def test_ranked_page(self):
+        other = self.create_application(self.create_student(1), Course.objects.create(
+            title='Python', description='дизайн API'))
+        page = search.search_page(Application.objects.all(), 'дизайн', per_page=1)
+        # Совпадение в названии курса весит больше, чем в описании
+        self.assertEqual(list(page), [self.application])
+        self.assertTrue(page.has_next)
+        page = search.search_page(Application.objects.all(), 'дизайн', page=2, per_page=1)
+        self.assertEqual(list(page), [other])
+        self.assertFalse(page.has_next)
+
+
+@override_settings(PORTAL_PROFILING=True, PORTAL_SLOW_REQUEST_MS=0)
+class ProfilingTests(PortalDataMixin, TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        self.stats = PerfStats(directory=self.directory, flush_interval=3600)
+        patcher = mock.patch('portal.profiling.perf_stats', self.stats)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_server_timing_header(self):
+        with self.assertLogs('portal.profiling', 'WARNING'):
+            response = self.client.get(reverse('login'))
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'view;dur=', 'total;dur='):
+            self.assertIn(metric, timing)
+        self.assertIn(f'size;desc="{len(response.content)}"', timing)
+        self.assertEqual(len(self.stats.samples['login']), 1)
+
+    def test_duplicate_queries_are_logged(self):
+        student = self.create_student()
+
+        def view(request):
+            for _ in range(3):
+                list(CustomUser.objects.filter(pk=student.pk))
+            Course.objects.count()
+            return HttpResponse('ok')
+
+        middleware = ProfilingMiddleware(view)
+        request = RequestFactory().get('/slow/')
+        with self.assertLogs('portal.profiling', 'WARNING') as logs:
+            response = middleware(request)
+        self.assertIn('desc="SQL x4"', response['Server-Timing'])
+        [message] = logs.output
+        self.assertIn('Медленный запрос GET /slow/ (unresolved)', message)
+        self.assertIn('Повторяющиеся запросы:\n  3x SELECT', message)
+        self.assertEqual(message.count('x SELECT'), 1)
+
+    def test_fast_request_is_not_logged(self):
+        with override_settings(PORTAL_SLOW_REQUEST_MS=60_000), self.assertNoLogs('portal.profiling'):
+            middleware = ProfilingMiddleware(lambda request: HttpResponse('ok'))
+            middleware(RequestFactory().get('/'))
+
+    def test_load_samples_and_summarize(self):
+        self.stats.samples['home'].extend([(float(ms), 1, 0.5) for ms in range(1, 101)])
+        self.stats.flush()
+        with open(os.path.join(self.directory, 'perf-1.json'), 'w', encoding='utf-8') as fh:
+            json.dump({'samples': {'home': [[500.0, 3, 2.0]], 'login': [[10.0, 2, 1.0]]}}, fh)
+        with open(os.path.join(self.directory, 'perf-2.json'), 'w', encoding='utf-8') as fh:
+            fh.write('{broken')
+        with open(os.path.join(self.directory, 'other.json'), 'w', encoding='utf-8') as fh:
+            json.dump({'samples': {'home': [[1.0, 1, 1.0]]}}, fh)
+
+        samples = load_samples(self.directory)
+        self.assertEqual(len(samples['home']), 101)
+        self.assertEqual(samples['login'], [(10.0, 2, 1.0)])
+
+        home, login = summarize(samples)
+        self.assertEqual(home['name'], 'home')
+        self.assertEqual((home['count'], home['p50'], home['p90'], home['p99'], home['max']),
+                         (101, 51.0, 91.0, 100.0, 500.0))
+        self.assertAlmostEqual(home['queries'], 103 / 101)
+        self.assertEqual((login['p50'], login['queries'], login['sql_ms']), (10.0, 2, 1.0))
+
+        out = io.StringIO()
+        call_command('perfstats', dir=self.directory, stdout=out)
+        self.assertRegex(out.getvalue(), r'home\s+101\s+51\.0\s+91\.0\s+100\.0\s+500\.0')
+        call_command('perfstats', dir=self.directory, reset=True, stdout=io.StringIO())
+        self.assertEqual(load_samples(self.directory), {})
+
+
+class SeedBenchTests(TestCase):
+    def test_small_dataset(self):
+        call_command('seed_bench', users=50, applications=300, courses=5, stdout=io.StringIO())
+        self.assertEqual(CustomUser.objects.filter(is_superuser=False).count(), 50)
+        self.assertEqual(Course.objects.count(), 5)
+        self.assertEqual(Application.objects.count(), 300)
+        self.assertFalse(Application.objects.filter(updated_at__lt=F('created_at')).exists())
+        self.assertEqual(ApplicationStat.objects.aggregate(total=Sum('count'))['total'], 300)
+        self.assertTrue(self.client.login(username='bench_admin', password='bench-password'))
+
+
+class AssetServerTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        static_root = os.path.join(tmp.name, 'static')
+        media_root = os.path.join(tmp.name, 'media')
+        os.makedirs(os.path.join(static_root, 'css'))
+        os.makedirs(media_root)
+        self.css = b'body { color: red; }\n' * 50
+        self.write(static_root, 'css/app.css', self.css)
+        self.write(static_root, 'css/app.css.gz', b'gzip-bytes')
+        self.write(static_root, 'css/app.1a2b3c.css', self.css)
+        self.write(static_root, 'staticfiles.json', json.dumps(
+            {'paths': {'css/app.css': 'css/app.1a2b3c.css'}},
+        ).encode())
+        self.video = bytes(range(256)) * 4
+        self.write(media_root, 'video.bin', self.video)
+        self.write(tmp.name, 'secret.txt', b'secret')
+        self.server = AssetServer(static_root, '/static/', media_root, '/media/')
+
+    def write(self, root, name, data):
+        with open(os.path.join(root, name), 'wb') as fileobj:
+            fileobj.write(data)
+
+    def respond(self, path, method='GET', **headers):
+        return self.server.respond(method, path, headers)
+
+    def header(self, response, name):
+        return dict(response.headers).get(name)
+
+    def test_parse_range(self):
+        self.assertEqual(_parse_range('bytes=0-99', 1000), (0, 100))
+        self.assertEqual(_parse_range('bytes=900-', 1000), (900, 100))
+        self.assertEqual(_parse_range('bytes=-100', 1000), (900, 100))
+        self.assertEqual(_parse_range('bytes=-5000', 1000), (0, 1000))
+        self.assertEqual(_parse_range('bytes=990-5000', 1000), (990, 10))
+        self.assertIs(_parse_range('bytes=1000-', 1000), False)
+        self.assertIs(_parse_range('bytes=10-5', 1000), False)
+        self.assertIs(_parse_range('bytes=-0', 1000), False)
+        # Несколько диапазонов и мусор — отдается весь файл
+        self.assertIsNone(_parse_range('bytes=0-1,5-6', 1000))
+        self.assertIsNone(_parse_range('items=0-1', 1000))
+        self.assertIsNone(_parse_range('bytes=-', 1000))
+        self.assertIsNone(_parse_range('bytes=0-1', 0))
+
+    def test_range_request(self):
+        response = self.respond('/media/video.bin', range='bytes=100-199')
+        self.assertEqual(response.status, 206)
+        self.assertEqual((response.offset, response.length), (100, 100))
+        self.assertEqual(self.header(response, 'Content-Range'), 'bytes 100-199/1024')
+        self.assertEqual(self.header(response, 'Content-Length'), '100')
+
+        response = self.respond('/media/video.bin', range='bytes=2000-')
+        self.assertEqual(response.status, 416)
+        self.assertIsNone(response.path)
+        self.assertEqual(self.header(response, 'Content-Range'), 'bytes */1024')
+
+    def test_if_range(self):
+        etag = self.header(self.respond('/media/video.bin'), 'ETag')
+        response = self.respond('/media/video.bin', range='bytes=0-9', **{'if-range': etag})
+        self.assertEqual(response.status, 206)
+        # Файл изменился — Range игнорируется, отдается целиком
+        response = self.respond('/media/video.bin', range='bytes=0-9', **{'if-range': '"stale"'})
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.length, len(self.video))
+
+    def test_not_modified(self):
+        response = self.respond('/media/video.bin')
+        etag = self.header(response, 'ETag')
+        last_modified = self.header(response, 'Last-Modified')
+        self.assertEqual(self.respond('/media/video.bin', **{'if-none-match': f'W/{etag}'}).status, 304)
+        self.assertEqual(self.respond('/media/video.bin', **{'if-none-match': '"other"'}).status, 200)
+        self.assertEqual(self.respond('/media/video.bin', **{'if-modified-since': last_modified}).status, 304)
+        self.assertEqual(self.respond('/media/video.bin', **{
+            'if-modified-since': 'Thu, 01 Jan 1970 00:00:00 GMT',
+        }).status, 200)
+
+    def test_accept_encoding(self):
+        response = self.respond('/static/css/app.css', **{'accept-encoding': 'br;q=0, gzip, deflate'})
+        self.assertEqual(response.status, 200)
+        self.assertTrue(response.path.endswith('app.css.gz'))
+        self.assertEqual(self.header(response, 'Content-Encoding'), 'gzip')
+        self.assertEqual(self.header(response, 'Content-Length'), str(len(b'gzip-bytes')))
+        self.assertEqual(self.header(response, 'Vary'), 'Accept-Encoding')
+        gzip_etag = self.header(response, 'ETag')
+        self.assertTrue(gzip_etag.endswith('-gzip"'))
+        self.assertEqual(self.respond('/static/css/app.css', **{
+            'accept-encoding': 'gzip', 'if-none-match': gzip_etag,
+        }).status, 304)
+
+        response = self.respond('/static/css/app.css', **{'accept-encoding': 'gzip;q=0'})
+        self.assertIsNone(self.header(response, 'Content-Encoding'))
+        self.assertEqual(response.length, len(self.css))
+        self.assertEqual(self.header(response, 'Cache-Control'), REVALIDATE_CACHE_CONTROL)
+        self.assertEqual(
+            self.header(self.respond('/static/css/app.1a2b3c.css'), 'Cache-Control'),
+            IMMUTABLE_CACHE_CONTROL,
+        )
+
+    def test_unknown_paths_and_methods(self):
+        self.assertIsNone(self.respond('/media/../secret.txt'))
+        self.assertIsNone(self.respond('/media/missing.bin'))
+        self.assertIsNone(self.respond('/static/css/app.css.gz'))
+        self.assertIsNone(self.respond('/media/video.bin', method='POST'))
+        self.assertIsNone(self.respond('/profile/'))
+
+    def asgi(self, scope_extensions, **headers):
+        async def app(scope, receive, send):
+            raise AssertionError('запрос должен обработать AssetsASGIMiddleware')
+
+        messages = []
+
+        async def send(message):
+            if message['type'] == 'http.response.zerocopysend':
+                os.lseek(message['file'], message['offset'], os.SEEK_SET)
+                message['data'] = os.read(message['file'], message['count'])
+            messages.append(message)
+
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': '/media/video.bin',
+            'headers': [(name.encode(), value.encode()) for name, value in headers.items()],
+            'extensions': scope_extensions,
+        }
+        asyncio.run(AssetsASGIMiddleware(app, self.server)(scope, None, send))
+        return messages
+
+    def test_asgi_zerocopysend_gets_file_descriptor(self):
+        start, body = self.asgi({'http.response.zerocopysend': {}}, range='bytes=10-19')
+        self.assertEqual(start['status'], 206)
+        self.assertEqual(body['type'], 'http.response.zerocopysend')
+        self.assertIsInstance(body['file'], int)
+        self.assertEqual((body['offset'], body['count']), (10, 10))
+        self.assertEqual(body['data'], self.video[10:20])
+
+    def test_asgi_chunked_body(self):
+        messages = self.asgi({})
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertEqual(b''.join(m['body'] for m in messages[1:]), self.video)
+        self.assertFalse(messages[-1].get('more_body', False))
+
+
+class CompressedStaticStorageTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.source = FileSystemStorage(location=os.path.join(tmp.name, 'src'))
+        self.source.save('app.css', ContentFile(b'.a { color: red; }\n' * 100))
+        self.source.save('logo.png', ContentFile(os.urandom(512)))
+        self.source.save('tiny.js', ContentFile(b'x'))
+        self.storage = CompressedManifestStaticFilesStorage(location=os.path.join(tmp.name, 'out'))
+
+    def collect(self, dry_run=False):
+        paths = {}
+        for name in ('app.css', 'logo.png', 'tiny.js'):
+            with self.source.open(name) as fileobj:
+                self.storage.save(name, fileobj)
+            paths[name] = (self.source, name)
+        return list(self.storage.post_process(paths, dry_run=dry_run))
+
+    def test_post_process_writes_compressed_copies(self):
+        processed = self.collect()
+        self.assertEqual({name for name, _, _ in processed}, {'app.css', 'logo.png', 'tiny.js'})
+        hashed_css = self.storage.stored_name('app.css')
+        self.assertNotEqual(hashed_css, 'app.css')
+        for name in ('app.css', hashed_css):
+            with gzip.open(self.storage.path(name) + '.gz') as fileobj:
+                self.assertEqual(fileobj.read(), b'.a { color: red; }\n' * 100)
+        # Картинки не сжимаются, а копия, которая больше оригинала, не сохраняется
+        self.assertFalse(os.path.exists(self.storage.path('logo.png') + '.gz'))
+        self.assertFalse(os.path.exists(self.storage.path('tiny.js') + '.gz'))
+
+    def test_dry_run_writes_nothing(self):
+        self.collect(dry_run=True)
+        self.assertFalse(os.path.exists(self.storage.path('app.css') + '.gz'))
+
+
+class WarmupTests(TestCase):
+    def test_report_lists_phases_and_app_ready(self):
+        report = warmup.StartupReport(started=0)
+        report.phases = [('import', 0.25), ('apps', 0.1)]
+        report._last = 0.35
+        report.app_ready = [('admin', 0.002), ('portal', 0.0205)]
+        self.assertRegex(
+            str(report),
+            r'^Запуск процесса \d+: 350 мс \(import 250, apps 100\); ready\(\): portal 20\.5, admin 2\.0$',
+        )
+
+    def test_time_app_ready_wraps_and_restores(self):
+        original = PortalConfig.ready
+        sessions = type(apps.get_app_config('sessions'))
+        report = warmup.StartupReport()
+        with warmup.time_app_ready(report):
+            self.assertIsNot(PortalConfig.ready, original)
+            apps.get_app_config('portal').ready()
+            apps.get_app_config('sessions').ready()
+        self.assertEqual([label for label, _ in report.app_ready], ['portal', 'sessions'])
+        # После блока классы конфигураций прежние: свой ready() и унаследованный
+        self.assertIs(PortalConfig.ready, original)
+        self.assertNotIn('ready', sessions.__dict__)
+
+    def test_warm_up_phases(self):
+        report = warmup.StartupReport()
+        with mock.patch('os.register_at_fork') as register, \
+                mock.patch.object(warmup, '_fork_hooks_registered', False):
+            warmup.warm_up(report)
+            warmup.register_fork_hooks()
+        self.assertEqual([name for name, _ in report.phases], ['urls', 'templates', 'validators', 'database'])
+        # Хуки fork регистрируются один раз: закрыть соединения мастера и прогреть воркер
+        register.assert_called_once_with(
+            before=warmup._close_before_fork, after_in_child=warmup._warm_database_after_fork,
+        )
+
+    def test_failed_phase_does_not_stop_startup(self):
+        report = warmup.StartupReport()
+        with mock.patch.object(warmup, 'PHASES', (('broken', lambda: 1 / 0), ('ok', lambda: 1))), \
+                mock.patch.object(warmup, 'register_fork_hooks'), \
+                self.assertLogs('portal.warmup', 'ERROR'):
+            warmup.warm_up(report)
+        self.assertEqual([name for name, _ in report.phases], ['broken', 'ok'])
+
+    def test_database_warmed_in_child_after_fork(self):
+        with self.assertLogs('portal.warmup', 'INFO') as logs:
+            warmup._warm_database_after_fork()
+        self.assertIn('Прогрев базы в процессе', logs.output[0])
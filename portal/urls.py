@@ -1,15 +1,18 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
 from . import views
-from .views import CustomLoginView
 
 urlpatterns = [
     path('', views.home_view, name='home'),
     path('register/', views.register_view, name='register'),
-    path('login/', CustomLoginView.as_view(), name='login'),
+    path('register/check/', views.check_availability_view, name='check_availability'),
+    path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('profile/', views.profile_view, name='profile'),
+    path('profile/events/', views.application_events_view, name='application_events'),
     path('profile/edit/', views.edit_profile_view, name='edit_profile'),
     path('application/new/', views.create_application_view, name='create_application'),
     path('myadmin/dashboard/', views.admin_dashboard_view, name='admin_dashboard'),
+    path('myadmin/applications/status/', views.bulk_status_view, name='bulk_status'),
+    path('myadmin/applications/export/', views.export_applications_view, name='export_applications'),
 ]
\ No newline at end of file
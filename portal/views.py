@@ -1,12 +1,20 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth import login, logout, authenticate
+from django.contrib.auth import aauthenticate, alogin, logout, update_session_auth_hash
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.contrib.auth.views import LoginView
-from django.views.generic import ListView
-from .models import CustomUser, Application, Course
-import os
-from django.conf import settings
+from django.views.decorators.cache import never_cache
+from django.views.decorators.debug import sensitive_post_parameters
+from django.views.decorators.http import require_POST
+from django.http import FileResponse, HttpResponse, JsonResponse, QueryDict, StreamingHttpResponse
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.utils import timezone
+import tempfile
+from django.utils.http import url_has_allowed_host_and_scheme
+import json
+from .models import CustomUser, Application
+from . import events
 
 from .forms import (
     SimpleUserCreationForm, 
@@ -14,8 +22,27 @@ from .forms import (
     ApplicationForm,
     FeedbackForm,
     ApplicationStatusForm,
-    UserProfileForm
+    UserProfileForm,
+    ApplicationFilterForm,
+    BulkStatusForm,
+    EMAIL_TAKEN,
+    USERNAME_TAKEN,
 )
+from .availability import probably_taken
+from .cache import get_profile_applications, render_application_rows
+from .conditional import (
+    application_form_etag, conditional_page, dashboard_etag, dashboard_last_modified,
+    profile_etag, profile_last_modified, profile_state,
+)
+from .catalog import get_catalog
+from .hashing import HashingOverloaded, acheck_password, amake_password
+from .db import arun_write, run_write
+from .export import EXPORT_FORMATS, aiter_csv, iter_csv, write_xlsx
+from .pagination import CursorError, keyset_paginate
+from .ratelimit import rate_limit
+from .search import search_applications, search_page
+from .slider import get_slider_images
+from .stats import dashboard_stats
 
 def admin_required(view_func):
     decorated_view_func = user_passes_test(
@@ -25,11 +52,37 @@ def admin_required(view_func):
     return decorated_view_func
 
 
-def register_view(request):
+def _next_url(request, default):
+    """Адрес возврата из POST-параметра next, только в пределах сайта"""
+    next_url = request.POST.get('next')
+    if next_url and url_has_allowed_host_and_scheme(
+        next_url, allowed_hosts={request.get_host()}, require_https=request.is_secure()
+    ):
+        return next_url
+    return default
+
+
+def _overloaded_response():
+    response = HttpResponse('Сервер перегружен, повторите попытку через несколько секунд.', status=503)
+    response['Retry-After'] = '5'
+    return response
+
+
+@rate_limit('register')
+async def register_view(request):
+    """
+    Регистрация. Хеширование пароля выполняется в пуле portal.hashing,
+    цикл событий в это время обслуживает другие запросы.
+    """
     if request.method == 'POST':
         form = SimpleUserCreationForm(request.POST)
-        if form.is_valid():
-            user = form.save()
+        if await sync_to_async(form.is_valid)():
+            user = form.instance
+            try:
+                user.password = await amake_password(form.cleaned_data['password'])
+            except HashingOverloaded:
+                return _overloaded_response()
+            await arun_write(user.save)
             messages.success(request, 'Регистрация прошла успешно! Теперь вы можете войти.')
             return redirect('login')
         else:
@@ -37,21 +90,63 @@ def register_view(request):
     else:
         form = SimpleUserCreationForm()
     
-    return render(request, 'portal/register.html', {'form': form})
+    return await sync_to_async(render)(request, 'portal/register.html', {'form': form})
 
 
-class CustomLoginView(LoginView):
-    form_class = CustomAuthenticationForm
-    template_name = 'portal/login.html'
-    
-    def get_success_url(self):
-        user = self.request.user
-        if user.is_superuser:
-            messages.success(self.request, f'Добро пожаловать в панель администратора, {user.username}!')
-            return '/myadmin/dashboard/'
+@rate_limit('availability', methods=('GET',))
+@never_cache
+def check_availability_view(request):
+    """
+    Свободны ли логин и/или email (?username=...&email=...) — для
+    подсказок в формах регистрации и профиля. Занятые значения находятся
+    в индексе portal.availability, свободные подтверждаются базой.
+    """
+    result = {}
+    for field, message in (('username', USERNAME_TAKEN), ('email', EMAIL_TAKEN)):
+        value = request.GET.get(field)
+        if value is None:
+            continue
+        try:
+            # Валидаторы модели (формат логина, email) — без запросов к базе
+            CustomUser._meta.get_field(field).clean(value.strip(), None)
+        except ValidationError as error:
+            result[field] = {'available': False, 'message': error.messages[0]}
+            continue
+        if probably_taken(field, value):
+            result[field] = {'available': False, 'message': message}
         else:
-            messages.success(self.request, f'Добро пожаловать, {user.full_name}!')
-            return '/profile/'
+            result[field] = {'available': True}
+    return JsonResponse(result)
+
+
+@rate_limit('login')
+@sensitive_post_parameters()
+@never_cache
+async def login_view(request):
+    if request.method == 'POST':
+        form = CustomAuthenticationForm(request, data=request.POST)
+        username = request.POST.get('username')
+        password = request.POST.get('password')
+        user = None
+        if username and password:
+            try:
+                user = await aauthenticate(request, username=username, password=password)
+            except HashingOverloaded:
+                return _overloaded_response()
+        form.set_authenticated_user(user)
+        if form.is_valid():
+            user = form.get_user()
+            await alogin(request, user)
+            if user.is_superuser:
+                messages.success(request, f'Добро пожаловать в панель администратора, {user.username}!')
+                return redirect('/myadmin/dashboard/')
+            else:
+                messages.success(request, f'Добро пожаловать, {user.full_name}!')
+                return redirect('/profile/')
+    else:
+        form = CustomAuthenticationForm(request)
+
+    return await sync_to_async(render)(request, 'portal/login.html', {'form': form})
 
 
 def logout_view(request):
@@ -61,139 +156,250 @@ def logout_view(request):
 
 
 @login_required
+@conditional_page(profile_etag, profile_last_modified)
 def profile_view(request):
-    user_applications = Application.objects.filter(user=request.user)
-    
     if request.method == 'POST' and 'feedback' in request.POST:
         app_id = request.POST.get('application_id')
         application = get_object_or_404(Application, id=app_id, user=request.user)
         form = FeedbackForm(request.POST, instance=application)
         if form.is_valid():
-            form.save()
+            run_write(form.save)
             messages.success(request, 'Отзыв успешно сохранен!')
             return redirect('profile')
     
     return render(request, 'portal/profile.html', {
-        'applications': user_applications,
+        'applications_html': get_profile_applications(request.user, profile_state(request)),
         'feedback_form': FeedbackForm()
     })
 
+
+async def application_events_view(request):
+    """
+    Server-Sent Events: изменения заявок текущего пользователя
+    (статус, отзыв) для обновления личного кабинета без перезагрузки.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+    if not isinstance(request, ASGIRequest):
+        # Под WSGI открытый поток занимал бы поток сервера целиком;
+        # на 204 браузер не переподключается, страница работает как раньше
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(
+        events.stream(user.pk, request.headers.get('Last-Event-ID')),
+        content_type='text/event-stream; charset=utf-8',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Отключает буферизацию ответа в nginx
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 @login_required
-def edit_profile_view(request):
-    user = request.user
+async def edit_profile_view(request):
+    # Подменяем ленивый request.user уже загруженным, чтобы шаблон
+    # и update_session_auth_hash не читали пользователя повторно
+    user = request.user = await request.auser()
     
     if request.method == 'POST':
         form = UserProfileForm(request.POST, instance=user)
-        if form.is_valid():
+        if await sync_to_async(form.is_valid)():
             new_password = form.cleaned_data.get('new_password')
             current_password = form.cleaned_data.get('current_password')
             
-            if new_password:
-                if not user.check_password(current_password):
-                    form.add_error('current_password', 'Неверный текущий пароль')
-                    return render(request, 'portal/edit_profile.html', {'form': form})
-                
-                user.set_password(new_password)
+            try:
+                if new_password:
+                    if not await acheck_password(user, current_password):
+                        form.add_error('current_password', 'Неверный текущий пароль')
+                        return await sync_to_async(render)(request, 'portal/edit_profile.html', {'form': form})
+                    password_hash = await amake_password(new_password)
+            except HashingOverloaded:
+                return _overloaded_response()
             
             user = form.save(commit=False)
             if new_password:
-                user.set_password(new_password)
-            user.save()
+                user.password = password_hash
+            await arun_write(user.save)
             
             if new_password:
-                from django.contrib.auth import update_session_auth_hash
-                update_session_auth_hash(request, user)
+                await sync_to_async(update_session_auth_hash)(request, user)
             
             messages.success(request, 'Профиль успешно обновлен!')
             return redirect('profile')
     else:
         form = UserProfileForm(instance=user)
     
-    return render(request, 'portal/edit_profile.html', {'form': form})
+    return await sync_to_async(render)(request, 'portal/edit_profile.html', {'form': form})
 
 
+@rate_limit('create_application')
 @login_required
+@conditional_page(application_form_etag)
 def create_application_view(request):
     if request.method == 'POST':
         form = ApplicationForm(request.POST)
         if form.is_valid():
             application = form.save(commit=False)
             application.user = request.user
-            application.save()
+            run_write(application.save)
             messages.success(request, 'Заявка успешно создана! Она будет рассмотрена администратором.')
             return redirect('profile')
     else:
         form = ApplicationForm()
-    
 
-    active_courses = Course.objects.filter(is_active=True)
-    form.fields['course'].queryset = active_courses
-    
-    courses_data = [
-        {
-            'id': course.id,
-            'title': course.title,
-            'description': course.description,
-            'short_desc': course.short_description() if hasattr(course, 'short_description') else course.description[:100] + "..."
-        }
-        for course in active_courses
-    ]
-    
+    # Курсы берутся из снимка каталога — без запросов к Course
+    catalog = get_catalog()
     return render(request, 'portal/application_form.html', {
         'form': form,
-        'courses_data': courses_data,
+        'courses_data': catalog.active,
+        'courses_json': catalog.json,
     })
 
 
+DASHBOARD_PAGE_SIZE = 50
+
+
 @admin_required
+@conditional_page(dashboard_etag, dashboard_last_modified)
 def admin_dashboard_view(request):
-    all_applications = Application.objects.all()
-    
     if request.method == 'POST' and 'status' in request.POST:
         app_id = request.POST.get('application_id')
         application = get_object_or_404(Application, id=app_id)
         form = ApplicationStatusForm(request.POST, instance=application)
         if form.is_valid():
-            form.save()
+            run_write(form.save)
             messages.success(request, f'Статус заявки #{app_id} изменен.')
-            return redirect('admin_dashboard')
-    
+            return redirect(request.get_full_path())
+
+    filter_form = ApplicationFilterForm(request.GET or None)
+    applications = Application.objects.select_related('user', 'course')
+    search_query = ''
+    if filter_form.is_bound and filter_form.is_valid():
+        applications = filter_form.filter(applications)
+        search_query = filter_form.cleaned_data['q'].strip()
+
+    if search_query:
+        # Результаты поиска упорядочены по релевантности, поэтому курсор
+        # по дате не подходит — листаем номерами страниц
+        try:
+            page_number = max(1, int(request.GET.get('page', 1)))
+        except ValueError:
+            page_number = 1
+        page = search_page(applications, search_query, page_number, DASHBOARD_PAGE_SIZE)
+    else:
+        try:
+            page = keyset_paginate(
+                applications,
+                after=request.GET.get('after'),
+                before=request.GET.get('before'),
+                per_page=DASHBOARD_PAGE_SIZE,
+            )
+        except CursorError:
+            page = keyset_paginate(applications, per_page=DASHBOARD_PAGE_SIZE)
+
+    # Параметры фильтров без курсора и номера страницы — для ссылок пагинации
+    filter_query = request.GET.copy()
+    for param in ('after', 'before', 'page'):
+        filter_query.pop(param, None)
+
     return render(request, 'portal/admin_dashboard.html', {
-        'applications': all_applications,
-        'status_form': ApplicationStatusForm()
+        'rows': render_application_rows(list(page), 'dashboard'),
+        'page': page,
+        'filter_form': filter_form,
+        'filter_query': filter_query.urlencode(),
+        'search_query': search_query,
+        'status_form': ApplicationStatusForm(),
+        'stats': dashboard_stats(),
     })
 
 
+@admin_required
+@require_POST
+def bulk_status_view(request):
+    """
+    Массовая смена статуса заявок.
+
+    Принимает обычную форму (application_ids, status) или JSON
+    {"application_ids": [...], "status": "..."}; в ответ на JSON
+    возвращает только изменившиеся заявки.
+    """
+    is_json = request.content_type == 'application/json'
+    if is_json:
+        try:
+            payload = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'errors': {'__all__': ['Некорректный JSON']}}, status=400)
+        data = QueryDict(mutable=True)
+        data.setlist('application_ids', [str(pk) for pk in payload.get('application_ids', [])])
+        data['status'] = payload.get('status', '')
+    else:
+        data = request.POST
+
+    form = BulkStatusForm(data)
+    if not form.is_valid():
+        if is_json:
+            return JsonResponse({'errors': form.errors}, status=400)
+        messages.error(request, 'Выберите заявки и новый статус.')
+        return redirect(_next_url(request, 'admin_dashboard'))
+
+    status = form.cleaned_data['status']
+    applications = Application.objects.filter(id__in=form.cleaned_data['application_ids'])
+    changes = run_write(applications.set_status, status)
+
+    if is_json:
+        status_display = Application.Status(status).label
+        return JsonResponse({
+            'updated': [
+                {'id': row['id'], 'status': status, 'status_display': status_display}
+                for row in changes
+            ],
+        })
+    messages.success(request, f'Статус изменен у заявок: {len(changes)}.')
+    return redirect(_next_url(request, 'admin_dashboard'))
+
+
+@admin_required
+def export_applications_view(request):
+    """Выгрузка заявок (CSV или XLSX) с фильтрами панели администратора"""
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        export_format = 'csv'
+
+    filter_form = ApplicationFilterForm(request.GET)
+    applications = Application.objects.all()
+    if filter_form.is_valid():
+        applications = search_applications(
+            filter_form.filter(applications), filter_form.cleaned_data['q']
+        )
+
+    filename = f'applications-{timezone.localdate():%Y%m%d}.{export_format}'
+    if export_format == 'xlsx':
+        fileobj = tempfile.TemporaryFile()
+        try:
+            write_xlsx(applications, fileobj)
+        except ImportError:
+            fileobj.close()
+            messages.error(request, 'Для выгрузки в XLSX нужен пакет openpyxl.')
+            return redirect('admin_dashboard')
+        fileobj.seek(0)
+        return FileResponse(fileobj, as_attachment=True, filename=filename)
+
+    # Под ASGI синхронный итератор был бы прочитан целиком до отправки
+    content = aiter_csv(applications) if isinstance(request, ASGIRequest) else iter_csv(applications)
+    response = StreamingHttpResponse(content, content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 def home_view(request):
     """Главная страница"""
-    # Получаем список изображений для слайдера
-    slider_images = []
-    slider_path = os.path.join(settings.MEDIA_ROOT, 'slider')
-        
-    if os.path.exists(slider_path):
-        # Ищем файлы с расширениями изображений
-        image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
-        for filename in os.listdir(slider_path):
-            if any(filename.lower().endswith(ext) for ext in image_extensions):
-                # Создаем путь относительно MEDIA_URL
-                slider_images.append(f'slider/{filename}')
-        
-    # Если нет реальных изображений, используем заглушки
-    if not slider_images:
-        slider_images = [
-            'slider/image08.webp',
-            'slider/image09.webp', 
-            'slider/image10.webp',
-            'slider/image11.jpg'
-        ]
-        
-    context = {
-        'slider_images': slider_images[:4],  # Берем максимум 4 изображения
-    }
-
     if request.user.is_authenticated:
         if request.user.is_superuser:
             return redirect('admin_dashboard')
         else:
             return redirect('profile')
-    return render(request, 'portal/home.html', context)
\ No newline at end of file
+
+    # Список слайдов берется из кэша и пересобирается при изменении папки
+    context = {
+        'slider_images': get_slider_images(),
+    }
+    return render(request, 'portal/home.html', context)
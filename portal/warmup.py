@@ -0,0 +1,248 @@
+"""
+Быстрый холодный старт воркеров (korochki_project/wsgi.py и asgi.py).
+
+start() поднимает Django, замеряя фазы запуска (импорт, настройки,
+приложения, middleware), и до первого запроса выполняет прогрев
+(PORTAL_WARMUP): разбирает URL-схему и находит все имена URL,
+компилирует шаблоны портала в кэширующий загрузчик и регулярные
+выражения валидаторов моделей, открывает соединения с базой и загружает
+каталог курсов. Если сервер загружает приложение до fork (gunicorn
+--preload), все это один раз делается в мастер-процессе и достается
+воркерам готовым — кроме соединений: SQLite нельзя передавать через
+fork, поэтому перед fork они закрываются, а каждый воркер сразу после
+fork открывает свои. Отчет о времени запуска (с разбивкой ready()
+по приложениям) пишется в лог portal.warmup.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+import django
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Атрибуты валидаторов Django с лениво компилируемыми регулярными выражениями
+LAZY_REGEX_ATTRS = ('regex', 'user_regex', 'domain_regex', 'literal_regex')
+
+
+class StartupReport:
+    """Длительности фаз запуска по порядку"""
+
+    def __init__(self, started=None):
+        self.started = time.perf_counter() if started is None else started
+        self._last = self.started
+        self.phases = []
+        # Время AppConfig.ready() по приложениям, в порядке вызова
+        self.app_ready = []
+
+    def mark(self, name):
+        """Закрывает фазу name: время с прошлой отметки"""
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    @property
+    def total(self):
+        return self._last - self.started
+
+    def __str__(self):
+        parts = ', '.join(f'{name} {duration * 1000:.0f}' for name, duration in self.phases)
+        text = f'Запуск процесса {os.getpid()}: {self.total * 1000:.0f} мс ({parts})'
+        if self.app_ready:
+            ready = ', '.join(
+                f'{label} {duration * 1000:.1f}'
+                for label, duration in sorted(self.app_ready, key=lambda item: -item[1])
+            )
+            text += f'; ready(): {ready}'
+        return text
+
+
+@contextmanager
+def time_app_ready(report):
+    """
+    На время блока оборачивает ready() классов конфигураций INSTALLED_APPS,
+    чтобы django.setup() записал в report.app_ready время каждого.
+    """
+    from django.apps import AppConfig
+
+    patched = []
+    for entry in settings.INSTALLED_APPS:
+        try:
+            config_class = type(AppConfig.create(entry))
+        except Exception:
+            # Ошибку конфигурации покажет сам django.setup()
+            continue
+        if any(cls is config_class for cls, _ in patched):
+            continue
+        patched.append((config_class, config_class.__dict__.get('ready')))
+        config_class.ready = _timed(config_class.ready, report)
+    try:
+        yield
+    finally:
+        for cls, original in patched:
+            if original is None:
+                del cls.ready
+            else:
+                cls.ready = original
+
+
+def _timed(ready, report):
+    def timed_ready(self):
+        started = time.perf_counter()
+        try:
+            return ready(self)
+        finally:
+            report.app_ready.append((self.label, time.perf_counter() - started))
+    return timed_ready
+
+
+def _resolve_urls(resolver, prefix=''):
+    from django.urls import NoReverseMatch, resolve, reverse
+
+    count = 0
+    # reverse_dict строит таблицы URL и компилирует регулярные выражения
+    for name in list(resolver.reverse_dict):
+        if not isinstance(name, str):
+            continue
+        try:
+            resolve(reverse(prefix + name))
+        except NoReverseMatch:
+            # URL с параметрами: таблица уже построена, этого достаточно
+            continue
+        count += 1
+    for namespace, (_, sub_resolver) in resolver.namespace_dict.items():
+        count += _resolve_urls(sub_resolver, f'{prefix}{namespace}:')
+    return count
+
+
+def warm_urls():
+    from django.urls import get_resolver
+
+    return _resolve_urls(get_resolver())
+
+
+def template_names():
+    """Шаблоны из каталогов TEMPLATES['DIRS'] (шаблоны портала и писем)"""
+    names = []
+    for config in settings.TEMPLATES:
+        for directory in config.get('DIRS', []):
+            for root, _, files in os.walk(directory):
+                for filename in files:
+                    if filename.endswith(('.html', '.txt')):
+                        path = os.path.join(root, filename)
+                        names.append(os.path.relpath(path, directory).replace(os.sep, '/'))
+    return sorted(set(names))
+
+
+def warm_templates():
+    # Кэширующий загрузчик хранит скомпилированные шаблоны до конца процесса
+    from django.template.loader import get_template
+
+    names = template_names()
+    for name in names:
+        get_template(name)
+    return len(names)
+
+
+def warm_validators():
+    from django.apps import apps
+
+    count = 0
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            for validator in getattr(field, 'validators', ()):
+                for attr in LAZY_REGEX_ATTRS:
+                    regex = getattr(validator, attr, None)
+                    if regex is not None:
+                        regex.search('')
+                        count += 1
+    return count
+
+
+def warm_database():
+    """
+    Открывает соединения (init_command выставляет PRAGMA) и загружает
+    каталог курсов в кэш процесса.
+    """
+    from django.db import connections
+
+    from .catalog import get_catalog
+
+    for connection in connections.all():
+        connection.ensure_connection()
+    get_catalog()
+    return len(connections.all())
+
+
+def _close_before_fork():
+    from django.db import connections
+
+    connections.close_all()
+
+
+def _warm_database_after_fork():
+    started = time.perf_counter()
+    try:
+        warm_database()
+    except Exception:
+        logger.exception('Прогрев базы в процессе %s не удался', os.getpid())
+        return
+    logger.info('Прогрев базы в процессе %s: %.0f мс', os.getpid(), (time.perf_counter() - started) * 1000)
+
+
+_fork_hooks_registered = False
+
+
+def register_fork_hooks():
+    """
+    Соединения мастер-процесса закрываются перед fork, воркер открывает
+    свои сразу после него. Регистрируется один раз на процесс.
+    """
+    global _fork_hooks_registered
+    if _fork_hooks_registered or not hasattr(os, 'register_at_fork'):
+        return
+    os.register_at_fork(before=_close_before_fork, after_in_child=_warm_database_after_fork)
+    _fork_hooks_registered = True
+
+
+PHASES = (
+    ('urls', warm_urls),
+    ('templates', warm_templates),
+    ('validators', warm_validators),
+    ('database', warm_database),
+)
+
+
+def warm_up(report):
+    for name, func in PHASES:
+        try:
+            func()
+        except Exception:
+            # Прогрев не должен мешать запуску: недогретое догреется на запросах
+            logger.exception('Прогрев %s не удался', name)
+        report.mark(name)
+    register_fork_hooks()
+
+
+def start(handler_class, started=None):
+    """
+    Настраивает Django и создает обработчик (WSGIHandler или ASGIHandler),
+    как get_wsgi_application()/get_asgi_application(), но с замером фаз
+    и прогревом до первого запроса.
+    """
+    report = StartupReport(started)
+    report.mark('import')
+    settings.INSTALLED_APPS  # импорт модуля настроек
+    report.mark('settings')
+    with time_app_ready(report):
+        django.setup(set_prefix=False)
+    report.mark('apps')
+    handler = handler_class()
+    report.mark('middleware')
+    if getattr(settings, 'PORTAL_WARMUP', False):
+        warm_up(report)
+    logger.info('%s', report)
+    return handler